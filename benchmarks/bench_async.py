@@ -0,0 +1,153 @@
+"""
+Sync vs async CRUD routes under concurrent clients. Starts uvicorn once per
+mode (VEHICLE_ASYNC_DB=0 / 1) on a seeded temp database and drives it with
+N concurrent HTTP clients, each issuing a mix of list pages, uncached and
+cached single-VIN reads, and PATCHes. Prints requests/sec and p50 / p99
+latency for each mode and client count.
+
+    python benchmarks/bench_async.py --rows 20000 --clients 10 100 1000 --seconds 10
+"""
+import argparse
+import asyncio
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+import httpx
+from sqlalchemy import insert
+
+from bench_indexes import syntheticRows
+from database import makeEngine
+import models
+
+MODES = (("sync", "0"), ("async", "1"))
+
+# share of each request kind in the client mix
+MIX = (("list", 0.3), ("read", 0.4), ("cached", 0.2), ("patch", 0.1))
+
+
+def seedDatabase(path: str, rows: int) -> list[str]:
+    engine = makeEngine(f"sqlite:///{path}")
+    models.upgradeSchema(engine)
+    data = list(syntheticRows(rows))
+    with engine.begin() as conn:
+        conn.execute(insert(models.Vehicle), data)
+    engine.dispose()
+    return [row["vin"] for row in data]
+
+
+def freePort() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def startServer(path: str, asyncDb: str, port: int) -> subprocess.Popen:
+    env = {
+        **os.environ,
+        "VEHICLE_DATABASE_URL": f"sqlite:///{path}",
+        "VEHICLE_ASYNC_DB": asyncDb,
+    }
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=PROJECT_ROOT,
+        env=env,
+        # failed requests are counted by the clients; keep tracebacks out of the table
+        stderr=subprocess.DEVNULL,
+    )
+
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            httpx.get(f"http://127.0.0.1:{port}/", timeout=1)
+            return server
+        except httpx.TransportError:
+            time.sleep(0.1)
+
+    server.kill()
+    raise RuntimeError("uvicorn did not start")
+
+
+async def runClients(baseUrl: str, vins: list[str], clients: int, seconds: float) -> tuple[list[float], int, float]:
+    latencies = []
+    errors = 0
+    hot = vins[:100]
+    kinds, weights = zip(*MIX)
+    began = time.monotonic()
+    deadline = began + seconds
+
+    limits = httpx.Limits(max_connections=clients, max_keepalive_connections=clients)
+    async with httpx.AsyncClient(base_url=baseUrl, limits=limits, timeout=60) as http:
+
+        async def client(seed: int):
+            nonlocal errors
+            rng = random.Random(seed)
+            while time.monotonic() < deadline:
+                kind = rng.choices(kinds, weights)[0]
+                start = time.perf_counter()
+                try:
+                    if kind == "list":
+                        res = await http.get("/vehicle/", params={"manuName": "Toyota", "sort": "-modelYear", "limit": 20})
+                    elif kind == "read":
+                        res = await http.get(f"/vehicle/{rng.choice(vins)}")
+                    elif kind == "cached":
+                        res = await http.get(f"/vehicle/{rng.choice(hot)}")
+                    else:
+                        res = await http.patch(f"/vehicle/{rng.choice(vins)}", json={"horsePower": rng.randint(70, 700)})
+                    failed = res.status_code >= 400
+                except httpx.TransportError:
+                    failed = True
+                latencies.append(time.perf_counter() - start)
+                errors += failed
+
+        await asyncio.gather(*(client(seed) for seed in range(clients)))
+
+    # requests in flight at the deadline still finish, so time the whole run
+    return latencies, errors, time.monotonic() - began
+
+
+def percentile(values: list[float], pct: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def main_():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=20000)
+    parser.add_argument("--clients", type=int, nargs="+", default=[10, 100, 1000])
+    parser.add_argument("--seconds", type=float, default=10.0)
+    args = parser.parse_args()
+
+    print(f"{'mode':<8}{'clients':>8}{'req/s':>10}{'p50 ms':>10}{'p99 ms':>10}{'errors':>8}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for label, asyncDb in MODES:
+            # same starting data for both modes
+            path = os.path.join(tmp, f"{label}.db")
+            vins = seedDatabase(path, args.rows)
+
+            port = freePort()
+            server = startServer(path, asyncDb, port)
+            try:
+                for clients in args.clients:
+                    latencies, errors, elapsed = asyncio.run(
+                        runClients(f"http://127.0.0.1:{port}", vins, clients, args.seconds)
+                    )
+                    print(
+                        f"{label:<8}{clients:>8}{len(latencies) / elapsed:>10.0f}"
+                        f"{percentile(latencies, 50) * 1000:>10.1f}{percentile(latencies, 99) * 1000:>10.1f}{errors:>8}"
+                    )
+            finally:
+                server.terminate()
+                server.wait()
+
+
+if __name__ == "__main__":
+    main_()
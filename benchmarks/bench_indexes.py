@@ -0,0 +1,187 @@
+"""
+Compare the original one-index-per-column schema with the composite index set
+in models.Vehicle on a synthetic table.
+
+For each index set it measures insert and update throughput, then runs the
+queries GET /vehicle/ generates for common filters/sorts, printing
+EXPLAIN QUERY PLAN and the median latency of each.
+
+    python benchmarks/bench_indexes.py --rows 200000
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from sqlalchemy import create_engine, insert, text, update
+from sqlalchemy.dialects import sqlite
+
+import main
+import models
+from schemas import VehicleFilter
+from vindecoder import withCheckDigit
+
+LEGACY_INDEX_DDL = [
+    'CREATE INDEX ix_vehicles_id ON vehicles (id)',
+    'CREATE INDEX "ix_vehicles_manuName" ON vehicles ("manuName")',
+    'CREATE INDEX ix_vehicles_description ON vehicles (description)',
+    'CREATE INDEX "ix_vehicles_horsePower" ON vehicles ("horsePower")',
+    'CREATE INDEX "ix_vehicles_modelName" ON vehicles ("modelName")',
+    'CREATE INDEX "ix_vehicles_modelYear" ON vehicles ("modelYear")',
+    'CREATE INDEX "ix_vehicles_purchasePrice" ON vehicles ("purchasePrice")',
+    'CREATE INDEX "ix_vehicles_fuelType" ON vehicles ("fuelType")',
+]
+
+MAKES = {
+    "Toyota": ["Corolla", "Camry", "Prius", "RAV4", "Tacoma"],
+    "Honda": ["Civic", "Accord", "CR-V", "Pilot"],
+    "Ford": ["F-150", "Escape", "Mustang", "Explorer"],
+    "Tesla": ["Model 3", "Model Y", "Model S"],
+    "Subaru": ["Outback", "Forester", "Impreza"],
+    "Chevrolet": ["Silverado", "Malibu", "Equinox", "Bolt"],
+}
+FUELS = ["Gasoline", "Diesel", "Hybrid", "Electric"]
+WORDS = ["reliable", "tow", "package", "sunroof", "leather", "hybrid", "awd", "clean", "one-owner", "sport"]
+VIN_CHARS = "ABCDEFGHJKLMNPRSTUVWXYZ0123456789"
+
+# (label, filters, sort) as a client would pass them to GET /vehicle/
+QUERIES = [
+    ("default page (id order)", {}, None),
+    ("manuName, sort -modelYear", {"manuName": "Toyota"}, "-modelYear"),
+    ("manuName+modelName+year range", {"manuName": "Toyota", "modelName": "Corolla", "minModelYear": 2015, "maxModelYear": 2020}, None),
+    ("fuelType+price range, sort price", {"fuelType": "Hybrid", "minPurchasePrice": 20000, "maxPurchasePrice": 30000}, "purchasePrice"),
+    ("year range+horsePower range", {"minModelYear": 2020, "maxModelYear": 2022, "minHorsePower": 300}, None),
+    ("price range, sort -price", {"minPurchasePrice": 100000}, "-purchasePrice"),
+]
+
+
+def syntheticRows(count: int, seed: int = 1):
+    rng = random.Random(seed)
+    for i in range(count):
+        make = rng.choice(list(MAKES))
+        yield {
+            # unique, valid VIN (check digit included); the serial carries the row number
+            "vin": withCheckDigit("".join(rng.choice(VIN_CHARS) for _ in range(11)) + f"{i:06d}"),
+            "manuName": make,
+            "description": " ".join(rng.sample(WORDS, 3)),
+            "horsePower": rng.randint(70, 700),
+            "modelName": rng.choice(MAKES[make]),
+            "modelYear": rng.randint(1995, 2025),
+            "purchasePrice": round(rng.uniform(5000, 150000), 2),
+            "fuelType": rng.choice(FUELS),
+        }
+
+
+def buildDatabase(path: str, indexSet: str):
+    engine = create_engine(f"sqlite:///{path}")
+    # vehicles plus the tables its triggers write to
+    models.Base.metadata.create_all(engine)
+
+    if indexSet == "legacy":
+        with engine.begin() as conn:
+            for index in models.Vehicle.__table__.indexes:
+                if not index.unique:
+                    conn.execute(text(f'DROP INDEX "{index.name}"'))
+            for ddl in LEGACY_INDEX_DDL:
+                conn.execute(text(ddl))
+
+    return engine
+
+
+def timeWrites(engine, rows: int, batch: int = 10_000) -> dict:
+    table = models.Vehicle.__table__
+
+    start = time.perf_counter()
+    pending = []
+    with engine.begin() as conn:
+        for row in syntheticRows(rows):
+            pending.append(row)
+            if len(pending) == batch:
+                conn.execute(insert(table), pending)
+                pending = []
+        if pending:
+            conn.execute(insert(table), pending)
+    insertSeconds = time.perf_counter() - start
+
+    rng = random.Random(2)
+    updates = min(rows, 20_000)
+    start = time.perf_counter()
+    with engine.begin() as conn:
+        conn.execute(
+            update(table).where(table.c.id == text(":row_id")).values(
+                horsePower=text(":hp"), purchasePrice=text(":price")
+            ),
+            [
+                {"row_id": rng.randint(1, rows), "hp": rng.randint(70, 700), "price": rng.uniform(5000, 150000)}
+                for _ in range(updates)
+            ],
+        )
+    updateSeconds = time.perf_counter() - start
+
+    return {
+        "inserts/s": rows / insertSeconds,
+        "updates/s": updates / updateSeconds,
+        "file MB": os.path.getsize(engine.url.database) / 1e6,
+    }
+
+
+def timeReads(engine, repeat: int, showPlans: bool) -> dict:
+    results = {}
+    with engine.connect() as conn:
+        conn.execute(text("ANALYZE"))
+        for label, filterArgs, sort in QUERIES:
+            keys = main.parseSort(sort)
+            stmt = main.buildListQuery(VehicleFilter(**filterArgs), keys, None, columns=[models.Vehicle.__table__])
+            stmt = stmt.limit(main.LIST_DEFAULT_LIMIT)
+            sql = str(stmt.compile(dialect=sqlite.dialect(), compile_kwargs={"literal_binds": True}))
+
+            if showPlans:
+                plan = conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {sql}").fetchall()
+                print(f"    {label}")
+                for step in plan:
+                    print(f"        {step[-1]}")
+
+            timings = []
+            for _ in range(repeat):
+                start = time.perf_counter()
+                conn.exec_driver_sql(sql).fetchall()
+                timings.append(time.perf_counter() - start)
+            results[label] = statistics.median(timings) * 1000
+
+    return results
+
+
+def main_():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=200_000)
+    parser.add_argument("--repeat", type=int, default=20, help="runs per read query")
+    parser.add_argument("--no-plans", action="store_true", help="skip EXPLAIN QUERY PLAN output")
+    args = parser.parse_args()
+
+    report = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for indexSet in ("legacy", "composite"):
+            print(f"== {indexSet} indexes, {args.rows:,} rows")
+            engine = buildDatabase(os.path.join(tmp, f"{indexSet}.db"), indexSet)
+            writes = timeWrites(engine, args.rows)
+            reads = timeReads(engine, args.repeat, not args.no_plans)
+            engine.dispose()
+            report[indexSet] = (writes, reads)
+
+    print()
+    print(f"{'metric':<40}{'legacy':>14}{'composite':>14}")
+    for metric in report["legacy"][0]:
+        print(f"{metric:<40}{report['legacy'][0][metric]:>14,.1f}{report['composite'][0][metric]:>14,.1f}")
+    for label in report["legacy"][1]:
+        print(f"{label + ' (ms)':<40}{report['legacy'][1][label]:>14.3f}{report['composite'][1][label]:>14.3f}")
+
+
+if __name__ == "__main__":
+    main_()
@@ -0,0 +1,336 @@
+"""
+Load benchmark for every vehicle route, with a regression gate.
+
+For each fleet size it seeds a temp database with synthetic vehicles (valid
+VINs), then drives the same request mix through each transport:
+
+    asgi     the app in-process through httpx.ASGITransport (no network)
+    uvicorn  a real local uvicorn server over HTTP
+
+Each transport gets its own copy of the seeded file, so runs don't see each
+other's writes. Every route is measured on its own (create, reads, lists,
+search, stats, changes, export, update, patch, bulk, delete) and reported as
+requests/sec and p50 / p95 / p99 latency. Results are printed as a table and
+can be written as JSON; given a baseline JSON, the run exits 1 if any route's
+req/s drops, or its p95 grows, by more than --threshold.
+
+    python benchmarks/bench_routes.py --sizes 1000 100000 --requests 500 --output results.json
+    python benchmarks/bench_routes.py --baseline benchmarks/baseline.json
+    python benchmarks/bench_routes.py --sizes 1000000 --transports uvicorn
+
+The app's own settings (VEHICLE_ASYNC_DB, VEHICLE_GROUP_COMMIT,
+VEHICLE_DB_PROFILE, ...) are taken from the environment and recorded in the
+JSON, so a baseline is only compared against runs with the same settings
+and request counts.
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import platform
+import random
+import shutil
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+import httpx
+from sqlalchemy import insert
+
+from bench_async import freePort, percentile, startServer
+from bench_indexes import WORDS, syntheticRows
+
+TRANSPORTS = ("asgi", "uvicorn")
+
+# app settings that change the numbers; recorded with every result
+SETTINGS = ("VEHICLE_ASYNC_DB", "VEHICLE_GROUP_COMMIT", "VEHICLE_DB_PROFILE", "VEHICLE_SERVER_TIMING")
+
+# VINs read again and again by get_cached
+HOT_VINS = 50
+
+# rows per POST /vehicle/bulk request
+BULK_ROWS = 100
+
+SEED_BATCH = 10_000
+
+
+def seedDatabase(path: str, rows: int) -> None:
+    from database import makeEngine
+    import models
+
+    engine = makeEngine(f"sqlite:///{path}")
+    models.upgradeSchema(engine)
+    pending = []
+    with engine.begin() as conn:
+        for row in syntheticRows(rows):
+            pending.append(row)
+            if len(pending) == SEED_BATCH:
+                conn.execute(insert(models.Vehicle), pending)
+                pending = []
+        if pending:
+            conn.execute(insert(models.Vehicle), pending)
+    # closing the last connection checkpoints the WAL into the main file
+    engine.dispose()
+
+
+def seededVins(path: str, count: int, rng: random.Random) -> list[str]:
+    with sqlite3.connect(path) as conn:
+        rows = conn.execute("SELECT vin FROM vehicles ORDER BY random() LIMIT ?", (count,)).fetchall()
+    vins = [vin for (vin,) in rows]
+    rng.shuffle(vins)
+    return vins
+
+
+def newVehicles(count: int, seed: int) -> list[dict]:
+    # a different seed gives different random VIN prefixes than the seeded fleet
+    return list(syntheticRows(count, seed=seed))
+
+
+def buildPlan(vins: list[str], requests: int, rng: random.Random) -> list[tuple[str, list[tuple]]]:
+    """
+    (route name, [(method, url, kwargs), ...]) in run order. create runs
+    first and delete last on the same new VINs, so the fleet ends the run at
+    its seeded size.
+    """
+    created = newVehicles(requests, seed=rng.randrange(1 << 30))
+    createdVins = [row["vin"] for row in created]
+    bulkRows = newVehicles(max(1, requests // 10) * BULK_ROWS, seed=rng.randrange(1 << 30))
+    hot = vins[:HOT_VINS]
+
+    def pick(values):
+        return [rng.choice(values) for _ in range(requests)]
+
+    return [
+        ("create", [("POST", "/vehicle/", {"json": row}) for row in created]),
+        ("get", [("GET", f"/vehicle/{vin}", {}) for vin in pick(vins)]),
+        ("get_cached", [("GET", f"/vehicle/{vin}", {}) for vin in pick(hot)]),
+        ("get_fields", [("GET", f"/vehicle/{vin}", {"params": {"fields": "vin,modelYear"}}) for vin in pick(vins)]),
+        ("list", [("GET", "/vehicle/", {"params": {"limit": 50}})] * requests),
+        ("list_filtered", [
+            ("GET", "/vehicle/", {"params": {"manuName": make, "sort": "-modelYear", "limit": 50}})
+            for make in pick(["Toyota", "Honda", "Ford", "Tesla", "Subaru", "Chevrolet"])
+        ]),
+        ("search", [("GET", "/vehicle/search", {"params": {"q": word, "limit": 20}}) for word in pick(WORDS)]),
+        ("stats", [("GET", "/vehicle/stats", {})] * requests),
+        ("changes", [("GET", "/vehicle/changes", {"params": {"limit": 100}})] * requests),
+        ("export_ndjson", [
+            ("GET", "/vehicle/export", {"params": {"format": "ndjson", "fields": "vin,purchasePrice"}})
+        ] * max(3, requests // 100)),
+        ("update", [
+            ("PUT", f"/vehicle/{row['vin']}", {"json": {**row, "horsePower": rng.randint(70, 700)}})
+            for row in created
+        ]),
+        ("patch", [
+            ("PATCH", f"/vehicle/{vin}", {"json": {"purchasePrice": round(rng.uniform(5000, 150000), 2)}})
+            for vin in pick(vins)
+        ]),
+        ("bulk", [
+            ("POST", "/vehicle/bulk", {"json": bulkRows[start:start + BULK_ROWS]})
+            for start in range(0, len(bulkRows), BULK_ROWS)
+        ]),
+        ("delete", [("DELETE", f"/vehicle/{vin}", {}) for vin in createdVins]),
+    ]
+
+
+async def runRoute(http: httpx.AsyncClient, calls: list[tuple], concurrency: int) -> dict:
+    latencies = []
+    errors = 0
+    pending = iter(calls)
+
+    async def worker():
+        nonlocal errors
+        for method, url, kwargs in pending:
+            start = time.perf_counter()
+            try:
+                res = await http.request(method, url, **kwargs)
+                await res.aread()
+                failed = res.status_code >= 400
+            except httpx.TransportError:
+                failed = True
+            latencies.append(time.perf_counter() - start)
+            errors += failed
+
+    began = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - began
+
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "rps": round(len(latencies) / elapsed, 2),
+        "p50_ms": round(percentile(latencies, 50) * 1000, 3),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 3),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 3),
+    }
+
+
+async def runPlan(http: httpx.AsyncClient, plan, concurrency: int) -> dict:
+    # warm up connections, imports and the SQLite page cache
+    for _ in range(20):
+        await http.get("/vehicle/", params={"limit": 50})
+
+    return {name: await runRoute(http, calls, concurrency) for name, calls in plan}
+
+
+async def runAsgi(plan, concurrency: int) -> dict:
+    # imported here: main binds its engine to VEHICLE_DATABASE_URL on import
+    import main
+
+    async with main.lifespan(main.app):
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as http:
+            return await runPlan(http, plan, concurrency)
+
+
+async def runHttp(baseUrl: str, plan, concurrency: int) -> dict:
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=baseUrl, limits=limits, timeout=120) as http:
+        return await runPlan(http, plan, concurrency)
+
+
+def runTransport(transport: str, path: str, args) -> dict:
+    rng = random.Random(args.seed)
+    plan = buildPlan(seededVins(path, max(HOT_VINS, args.requests), rng), args.requests, rng)
+
+    if transport == "uvicorn":
+        port = freePort()
+        server = startServer(path, os.environ.get("VEHICLE_ASYNC_DB", "0"), port)
+        try:
+            return asyncio.run(runHttp(f"http://127.0.0.1:{port}", plan, args.concurrency))
+        finally:
+            server.terminate()
+            server.wait()
+
+    # in-process, but in a child interpreter so the app binds to this file
+    env = {**os.environ, "VEHICLE_DATABASE_URL": f"sqlite:///{path}"}
+    child = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), "--asgi-worker", path,
+         "--requests", str(args.requests), "--concurrency", str(args.concurrency), "--seed", str(args.seed)],
+        cwd=PROJECT_ROOT,
+        env=env,
+        stdout=subprocess.PIPE,
+        check=True,
+    )
+    return json.loads(child.stdout)
+
+
+def asgiWorker(args) -> None:
+    # uvicorn's stderr is dropped too; slow statements still count in /metrics
+    logging.getLogger("vehicles.slow_query").disabled = True
+
+    rng = random.Random(args.seed)
+    plan = buildPlan(seededVins(args.asgi_worker, max(HOT_VINS, args.requests), rng), args.requests, rng)
+    results = asyncio.run(runAsgi(plan, args.concurrency))
+    sys.stdout.write(json.dumps(results))
+
+
+def compareResults(results: dict, baseline: dict, threshold: float) -> list[str]:
+    """
+    One message per route whose req/s fell, or p95 rose, by more than
+    threshold (a fraction) against the baseline. Routes missing from either
+    side are skipped.
+    """
+    regressions = []
+    for key, old in baseline["results"].items():
+        new = results["results"].get(key)
+        if new is None:
+            continue
+        if new["rps"] < old["rps"] * (1 - threshold):
+            regressions.append(f"{key}: {new['rps']:,.0f} req/s, baseline {old['rps']:,.0f}")
+        if new["p95_ms"] > old["p95_ms"] * (1 + threshold):
+            regressions.append(f"{key}: p95 {new['p95_ms']:.2f} ms, baseline {old['p95_ms']:.2f}")
+        if new["errors"] > old["errors"]:
+            regressions.append(f"{key}: {new['errors']} errors, baseline {old['errors']}")
+    return regressions
+
+
+def runInfo(args) -> dict:
+    return {
+        "python": platform.python_version(),
+        "sqlite": sqlite3.sqlite_version,
+        "machine": platform.machine(),
+        "cpus": os.cpu_count(),
+        "requests": args.requests,
+        "concurrency": args.concurrency,
+        "seed": args.seed,
+        "settings": {name: os.environ[name] for name in SETTINGS if name in os.environ},
+    }
+
+
+def printTable(results: dict) -> None:
+    print(f"{'transport/size/route':<36}{'req/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'errors':>8}")
+    for key, row in results.items():
+        print(
+            f"{key:<36}{row['rps']:>10,.0f}{row['p50_ms']:>10.2f}"
+            f"{row['p95_ms']:>10.2f}{row['p99_ms']:>10.2f}{row['errors']:>8}"
+        )
+
+
+def main_():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 100_000], help="fleet sizes to seed")
+    parser.add_argument("--transports", nargs="+", choices=TRANSPORTS, default=list(TRANSPORTS))
+    parser.add_argument("--requests", type=int, default=500, help="requests per route")
+    parser.add_argument("--concurrency", type=int, default=8, help="requests in flight at once")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", help="write the results as JSON here")
+    parser.add_argument("--baseline", help="JSON from an earlier run to compare against")
+    # write tails swing with lock waits and fsync, so the default is loose
+    parser.add_argument("--threshold", type=float, default=0.5, help="allowed regression, as a fraction")
+    parser.add_argument("--asgi-worker", metavar="DB", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.asgi_worker:
+        asgiWorker(args)
+        return
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        # numbers are only comparable under the same app settings and load
+        for name in ("settings", "requests", "concurrency"):
+            if baseline["run"][name] != runInfo(args)[name]:
+                sys.exit(f"baseline was recorded with {name}={baseline['run'][name]}, not {runInfo(args)[name]}")
+
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for size in args.sizes:
+            template = os.path.join(tmp, f"fleet-{size}.db")
+            start = time.perf_counter()
+            seedDatabase(template, size)
+            print(f"seeded {size:,} vehicles in {time.perf_counter() - start:.1f}s", file=sys.stderr)
+
+            for transport in args.transports:
+                path = os.path.join(tmp, f"{transport}-{size}.db")
+                shutil.copyfile(template, path)
+                for route, row in runTransport(transport, path, args).items():
+                    results[f"{transport}/{size}/{route}"] = row
+
+    report = {"run": runInfo(args), "results": results}
+    printTable(results)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+            f.write("\n")
+
+    if baseline is not None:
+        regressions = compareResults(report, baseline, args.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s) past {args.threshold:.0%}:")
+            for line in regressions:
+                print(f"  {line}")
+            sys.exit(1)
+        print(f"\nno regressions past {args.threshold:.0%} against {args.baseline}")
+
+
+if __name__ == "__main__":
+    main_()
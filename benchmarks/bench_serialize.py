@@ -0,0 +1,83 @@
+"""
+Rows/sec of the GET /vehicle/ response body: the validated path (ORM
+objects -> VehicleRead -> JSON, what response_model did) against the
+trusted-read path (column tuples -> serialize.encodeRows), with and
+without a ?fields= projection. Each timing covers the SELECT plus encoding.
+
+    python benchmarks/bench_serialize.py --rows 10000 100000
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from pydantic import TypeAdapter
+from sqlalchemy import create_engine, insert, select
+from sqlalchemy.orm import Session
+
+from bench_indexes import syntheticRows
+from schemas import VehicleRead
+import models
+import serialize
+
+REPEATS = 3
+
+VEHICLE_LIST = TypeAdapter(list[VehicleRead])
+
+
+def validated(db) -> bytes:
+    vehicles = db.scalars(select(models.Vehicle).order_by(models.Vehicle.id)).all()
+    return VEHICLE_LIST.dump_json(VEHICLE_LIST.validate_python(vehicles, from_attributes=True))
+
+
+def trusted(names):
+    def run(db) -> bytes:
+        rows = db.execute(select(*serialize.readColumns(names)).order_by(models.Vehicle.id)).all()
+        return serialize.encodeRows(rows, names)
+    return run
+
+
+def bestOf(engine, work) -> float:
+    best = float("inf")
+    for _ in range(REPEATS):
+        with Session(engine) as db:
+            start = time.perf_counter()
+            work(db)
+            best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main_():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, nargs="+", default=[10_000, 100_000])
+    args = parser.parse_args()
+
+    encoder = "orjson" if serialize.orjson is not None else "json"
+    paths = (
+        ("validated (VehicleRead)", validated),
+        (f"trusted ({encoder})", trusted(serialize.READ_FIELDS)),
+        (f"trusted ({encoder}) fields=vin,purchasePrice", trusted(("vin", "purchasePrice"))),
+    )
+
+    print(f"{'rows':>8}  {'path':<42}{'rows/s':>12}{'ms':>10}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for count in args.rows:
+            engine = create_engine(f"sqlite:///{os.path.join(tmp, f'{count}.db')}")
+            models.upgradeSchema(engine)
+            with engine.begin() as conn:
+                conn.execute(insert(models.Vehicle), list(syntheticRows(count)))
+
+            for label, work in paths:
+                elapsed = bestOf(engine, work)
+                print(f"{count:>8}  {label:<42}{count / elapsed:>12,.0f}{elapsed * 1000:>10.1f}")
+
+            engine.dispose()
+
+
+if __name__ == "__main__":
+    main_()
@@ -0,0 +1,107 @@
+"""
+Write throughput as the vehicles table is split across more shard files.
+
+For each shard count it creates that many temp SQLite files, then runs
+concurrent single-row creates the way POST /vehicle/ does (BEGIN IMMEDIATE,
+INSERT ... RETURNING, commit), each routed to its VIN's shard. It prints
+writes/sec, then the median latency of a fanned-out, merged list page
+(GET /vehicle/?manuName=Toyota&sort=-modelYear) over the rows just written,
+which is what sharding costs the read side.
+
+    python benchmarks/bench_shards.py --writes 4000 --shards 1 2 4 8 --threads 8 32
+"""
+import argparse
+import itertools
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from bench_indexes import syntheticRows
+from database import beginImmediate, makeEngine
+from schemas import VehicleFilter
+import main
+import models
+import serialize
+import shards
+
+
+def buildShards(tmp: str, label: str, count: int, profile: str, threads: int) -> shards.ShardSet:
+    urls = shards.shardUrls(f"sqlite:///{os.path.join(tmp, f'{label}.db')}", count)
+    engines = [makeEngine(url, profile=profile, pool_size=max(threads, 5)) for url in urls]
+    for index, engine in enumerate(engines):
+        models.upgradeSchema(engine)
+        with engine.begin() as conn:
+            shards.seedIdSequences(conn, index)
+    return shards.ShardSet(engines)
+
+
+def timeWrites(shardSet: shards.ShardSet, threads: int, writes: int) -> tuple[float, int]:
+    rows = iter(list(syntheticRows(writes)))
+    rowsLock = threading.Lock()
+    errors = itertools.count()
+
+    def writeOne(_):
+        with rowsLock:
+            values = next(rows)
+        try:
+            with shardSet.sessionmakers[shardSet.indexFor(values["vin"])]() as db:
+                beginImmediate(db)
+                main.insertVehicleRow(db, values)
+                db.commit()
+        except Exception:
+            next(errors)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        list(pool.map(writeOne, range(writes)))
+    elapsed = time.perf_counter() - start
+
+    return writes / elapsed, next(errors)
+
+
+def timeListPage(shardSet: shards.ShardSet, repeat: int) -> float:
+    keys = main.parseSort("-modelYear")
+    names = serialize.READ_FIELDS
+    stmt = main.buildListQuery(VehicleFilter(manuName="Toyota"), keys, None, columns=main.listColumns(keys, names))
+    stmt = stmt.limit(main.LIST_DEFAULT_LIMIT + 1)
+
+    timings = []
+    for _ in range(repeat):
+        db = shards.ShardSessions(shardSet)
+        start = time.perf_counter()
+        main.fanOutPage(db, stmt, keys, main.LIST_DEFAULT_LIMIT)
+        timings.append(time.perf_counter() - start)
+        db.close()
+    return statistics.median(timings) * 1000
+
+
+def main_():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--writes", type=int, default=4000)
+    parser.add_argument("--shards", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--threads", type=int, nargs="+", default=[8, 32])
+    parser.add_argument("--profile", choices=("default", "performance"), default="performance")
+    parser.add_argument("--repeat", type=int, default=50, help="runs of the list page")
+    args = parser.parse_args()
+
+    print(f"{'shards':>6}{'threads':>8}{'writes/s':>12}{'errors':>8}{'list page ms':>14}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for count in args.shards:
+            for threads in args.threads:
+                shardSet = buildShards(tmp, f"{count}-{threads}", count, args.profile, threads)
+                rate, errors = timeWrites(shardSet, threads, args.writes)
+                pageMs = timeListPage(shardSet, args.repeat)
+                shardSet.close()
+                print(f"{count:>6}{threads:>8}{rate:>12,.0f}{errors:>8}{pageMs:>14.2f}")
+
+
+if __name__ == "__main__":
+    main_()
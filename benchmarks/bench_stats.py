@@ -0,0 +1,81 @@
+"""
+Latency of the fleet statistics read (stats.readStats over the summary
+tables) against the equivalent GROUP BY queries over vehicles, at growing
+table sizes.
+
+    python benchmarks/bench_stats.py --sizes 10000 100000 1000000
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from sqlalchemy import create_engine, insert, text
+from sqlalchemy.orm import Session
+
+from bench_indexes import syntheticRows
+from database import Base
+import models
+import stats
+
+
+def seed(engine, rows: int, batch: int = 20_000) -> float:
+    start = time.perf_counter()
+    pending = []
+    with engine.begin() as conn:
+        for row in syntheticRows(rows):
+            pending.append(row)
+            if len(pending) == batch:
+                conn.execute(insert(models.Vehicle.__table__), pending)
+                pending = []
+        if pending:
+            conn.execute(insert(models.Vehicle.__table__), pending)
+    return time.perf_counter() - start
+
+
+def median_ms(fn, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    groupBySql = [
+        text(f"SELECT {column}, COUNT(*), AVG(purchasePrice), MIN(purchasePrice), MAX(purchasePrice) "
+             f"FROM vehicles GROUP BY {column}")
+        for column in ("manuName", "modelYear", "fuelType")
+    ]
+
+    print(f"{'rows':>10}{'seed rows/s':>14}{'summary ms':>14}{'GROUP BY ms':>14}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for size in args.sizes:
+            engine = create_engine(f"sqlite:///{os.path.join(tmp, f'stats_{size}.db')}")
+            Base.metadata.create_all(engine)
+            seedSeconds = seed(engine, size)
+
+            with Session(engine) as db:
+                summaryMs = median_ms(lambda: stats.readStats(db), args.repeat)
+            with engine.connect() as conn:
+                scanMs = median_ms(lambda: [conn.execute(sql).all() for sql in groupBySql], max(3, args.repeat // 5))
+
+            assert not stats.checkStats(engine)
+            engine.dispose()
+            print(f"{size:>10,}{size / seedSeconds:>14,.0f}{summaryMs:>14.3f}{scanMs:>14.3f}")
+
+
+if __name__ == "__main__":
+    main()
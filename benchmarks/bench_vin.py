@@ -0,0 +1,71 @@
+"""
+VINs/sec for the old main.vinError (several Python-level passes, no check
+digit) against vindecoder: vinError per VIN, validateMany over a batch, and
+decode() cold and memoized.
+
+    python benchmarks/bench_vin.py --vins 200000
+"""
+import argparse
+import os
+import sys
+import time
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from bench_indexes import syntheticRows
+import vindecoder
+
+
+def legacyVinError(vinNorm: str) -> str | None:
+    # main.vinError before vindecoder
+    if len(vinNorm) == 0:
+        return "VIN cannot be empty"
+    if len(vinNorm) != 17:
+        return "VIN must be exactly 17 characters"
+    illegal_chars = {"I", "O", "Q"}
+    if any(ch in illegal_chars for ch in vinNorm):
+        return "VIN cannot contain the letters I, O, or Q"
+    if not vinNorm.isalnum():
+        return "VIN must contain only A-Z and 0-9 characters"
+    return None
+
+
+def timed(work) -> float:
+    start = time.perf_counter()
+    work()
+    return time.perf_counter() - start
+
+
+def main_():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--vins", type=int, default=200_000)
+    args = parser.parse_args()
+
+    vins = [row["vin"] for row in syntheticRows(args.vins)]
+    assert not any(vindecoder.validateMany(vins))
+
+    # a working set that fits decode()'s cache, read repeatedly
+    hot = vins[:10_000] * max(1, len(vins) // 10_000)
+
+    cases = (
+        ("legacy vinError (no check digit)", lambda: [legacyVinError(vin) for vin in vins]),
+        ("vindecoder.vinError, format only", lambda: [vindecoder.vinError(vin, False) for vin in vins]),
+        ("vindecoder.vinError", lambda: [vindecoder.vinError(vin) for vin in vins]),
+        ("vindecoder.validateMany", lambda: vindecoder.validateMany(vins)),
+        ("vindecoder.decode (cold)", lambda: [vindecoder.decode(vin) for vin in vins]),
+        ("vindecoder.decode (memoized, 10k hot)", lambda: [vindecoder.decode(vin) for vin in hot]),
+    )
+
+    print(f"{'validator':<40}{'VINs/s':>14}")
+    for label, work in cases:
+        if label.endswith("(cold)"):
+            vindecoder.decode.cache_clear()
+        elapsed = timed(work)
+        count = len(hot) if "hot" in label else len(vins)
+        print(f"{label:<40}{count / elapsed:>14,.0f}")
+
+
+if __name__ == "__main__":
+    main_()
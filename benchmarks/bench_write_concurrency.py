@@ -0,0 +1,87 @@
+"""
+Single-row create throughput under concurrent writers for each SQLite setup:
+the "default" PRAGMA profile, the "performance" profile, and "performance"
+with the group-commit writer. Every write is the same INSERT ... RETURNING
+statement POST /vehicle/ issues, committed per request (or per group).
+
+    python benchmarks/bench_write_concurrency.py --writes 4000 --threads 1 8 32 64
+"""
+import argparse
+import itertools
+import os
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from sqlalchemy.orm import sessionmaker
+
+from bench_indexes import syntheticRows
+from database import Base, beginImmediate, makeEngine
+from writer import GroupCommitWriter
+import main
+
+SETUPS = (
+    ("default", "default", False),
+    ("performance", "performance", False),
+    ("performance+group", "performance", True),
+)
+
+
+def runSetup(path: str, profile: str, groupCommit: bool, threads: int, writes: int) -> tuple[float, int]:
+    engine = makeEngine(f"sqlite:///{path}", profile=profile, pool_size=max(threads, 5))
+    Base.metadata.create_all(engine)
+    SessionLocal = sessionmaker(bind=engine, autoflush=False)
+    writer = GroupCommitWriter(engine) if groupCommit else None
+
+    rows = iter(list(syntheticRows(writes)))
+    rowsLock = threading.Lock()
+    errors = itertools.count()
+
+    def writeOne(_):
+        with rowsLock:
+            values = next(rows)
+        try:
+            if writer is not None:
+                writer.submit(lambda conn: main.insertVehicleRow(conn, values)).result()
+            else:
+                with SessionLocal() as db:
+                    beginImmediate(db)
+                    main.insertVehicleRow(db, values)
+                    db.commit()
+        except Exception:
+            next(errors)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        list(pool.map(writeOne, range(writes)))
+    elapsed = time.perf_counter() - start
+
+    if writer is not None:
+        writer.close()
+    engine.dispose()
+    return writes / elapsed, next(errors)
+
+
+def main_():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--writes", type=int, default=4000)
+    parser.add_argument("--threads", type=int, nargs="+", default=[1, 8, 32, 64])
+    args = parser.parse_args()
+
+    print(f"{'setup':<20}{'threads':>8}{'writes/s':>12}{'errors':>8}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for label, profile, groupCommit in SETUPS:
+            for threads in args.threads:
+                path = os.path.join(tmp, f"{label}-{threads}.db")
+                rate, errors = runSetup(path, profile, groupCommit, threads, args.writes)
+                print(f"{label:<20}{threads:>8}{rate:>12,.0f}{errors:>8}")
+
+
+if __name__ == "__main__":
+    main_()
@@ -0,0 +1,105 @@
+import threading
+import time
+from collections import OrderedDict
+
+
+class LRUCache:
+    """
+    Thread-safe in-process LRU cache with a per-entry TTL.
+
+    Reads that miss go to the DB and then call set(). To avoid putting back a
+    value that a concurrent write has already invalidated, callers grab
+    token = cache.token() before reading from the DB and pass it to set();
+    the value is dropped if the key was invalidated after the token was taken.
+
+    The cache is per process: with several workers, a write only invalidates
+    the copy held by the worker that served it, so keep the TTL short.
+    """
+
+    def __init__(self, maxSize: int = 10_000, ttl: float = 60.0):
+        self.maxSize = maxSize
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+        # invalidation bookkeeping used by token()/set()
+        self._epoch = 0
+        self._invalidated = OrderedDict()
+        self._invalidatedFloor = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            expiresAt, value = entry
+            if expiresAt <= time.monotonic():
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def token(self) -> int:
+        with self._lock:
+            return self._epoch
+
+    def set(self, key, value, token: int | None = None) -> bool:
+        with self._lock:
+            if token is not None:
+                if token < self._invalidatedFloor or self._invalidated.get(key, -1) >= token:
+                    return False
+
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+
+            while len(self._entries) > self.maxSize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+            return True
+
+    def invalidate(self, key) -> None:
+        with self._lock:
+            if self._entries.pop(key, None) is not None:
+                self.invalidations += 1
+
+            self._invalidated[key] = self._epoch
+            self._invalidated.move_to_end(key)
+            self._epoch += 1
+
+            # remember only recent invalidations; anything older forces a
+            # refusal for tokens taken before it
+            while len(self._invalidated) > self.maxSize:
+                _, epoch = self._invalidated.popitem(last=False)
+                self._invalidatedFloor = max(self._invalidatedFloor, epoch + 1)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._invalidated.clear()
+            self._invalidatedFloor = self._epoch
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "invalidations": self.invalidations,
+                "size": len(self._entries),
+                "maxSize": self.maxSize,
+                "ttl": self.ttl,
+            }
@@ -0,0 +1,140 @@
+"""
+Change feed over models.VehicleChange for incremental replication.
+
+readChanges() is the feed query (a range seek on the seq primary key, never
+a scan of vehicles). ChangeNotifier lets long-poll and SSE consumers sleep
+until this process commits a write instead of re-querying in a loop.
+"""
+import asyncio
+import threading
+import time
+
+from sqlalchemy import delete, event, func, select, update
+
+import models
+
+VEHICLE_FIELDS = (
+    "id", "vin", "manuName", "description", "horsePower", "modelName", "modelYear", "purchasePrice", "fuelType",
+)
+
+
+class ChangeNotifier:
+    """
+    Wakes async waiters when a commit happens in this process.
+
+    Waiters subscribe *before* querying, so a commit that lands between
+    their query and their wait still wakes them. Writes made by other
+    processes aren't seen; callers also re-check on a short interval.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._waiters = []
+
+    def subscribe(self) -> asyncio.Future:
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        with self._lock:
+            self._waiters.append((loop, future))
+        return future
+
+    def unsubscribe(self, future: asyncio.Future) -> None:
+        with self._lock:
+            self._waiters = [(loop, f) for loop, f in self._waiters if f is not future]
+
+    async def wait(self, future: asyncio.Future, timeout: float) -> bool:
+        """
+        True if notified, False on timeout. Consumes the subscription.
+        """
+        try:
+            await asyncio.wait_for(asyncio.shield(future), timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+        finally:
+            self.unsubscribe(future)
+
+    def notify(self) -> None:
+        """
+        Safe to call from any thread (e.g. the threadpool running a sync route).
+        """
+        with self._lock:
+            waiters, self._waiters = self._waiters, []
+        for loop, future in waiters:
+            loop.call_soon_threadsafe(_resolve, future)
+
+    def watch(self, sessionFactory) -> None:
+        event.listen(sessionFactory, "after_commit", lambda session: self.notify())
+
+
+def _resolve(future: asyncio.Future) -> None:
+    if not future.done():
+        future.set_result(None)
+
+
+class CursorExpired(Exception):
+    """
+    The consumer's cursor is older than pruned tombstones; it must resync.
+    """
+
+
+def prunedThrough(db) -> int:
+    return db.scalar(select(models.VehicleChangeHorizon.prunedThrough)) or 0
+
+
+def readChanges(db, since: int, limit: int) -> tuple[list[dict], bool]:
+    """
+    Changes with seq > since, oldest first. Returns (changes, hasMore).
+    Upserts carry the vehicle's current row; deletes carry vehicle=None.
+    """
+    if since and since < prunedThrough(db):
+        raise CursorExpired()
+
+    change = models.VehicleChange
+    vehicle = models.Vehicle
+    rows = db.execute(
+        select(change.seq, change.op, change.vin, change.changedAt, *(getattr(vehicle, f) for f in VEHICLE_FIELDS))
+        .select_from(change)
+        .outerjoin(vehicle, (vehicle.vin == change.vin) & (change.op == "upsert"))
+        .where(change.seq > since)
+        .order_by(change.seq)
+        .limit(limit + 1)
+    ).all()
+
+    changes = []
+    for row in rows[:limit]:
+        changes.append({
+            "seq": row.seq,
+            "op": row.op,
+            "vin": row[2],
+            "changedAt": row.changedAt,
+            "vehicle": dict(zip(VEHICLE_FIELDS, row[4:])) if row.op == "upsert" else None,
+        })
+
+    return changes, len(rows) > limit
+
+
+def pruneTombstones(bind, olderThanSeconds: float) -> int:
+    """
+    Delete tombstones older than the given age and advance the horizon so
+    consumers behind it are told to resync. Returns the number pruned.
+    """
+    cutoff = time.time() - olderThanSeconds
+    change = models.VehicleChange
+    horizon = models.VehicleChangeHorizon
+
+    with bind.begin() as conn:
+        highest = conn.scalar(
+            select(func.max(change.seq)).where(change.op == "delete", change.changedAt < cutoff)
+        )
+        if highest is None:
+            return 0
+
+        pruned = conn.execute(
+            delete(change).where(change.op == "delete", change.seq <= highest)
+        ).rowcount
+
+        if conn.execute(update(horizon).where(horizon.id == 1).values(prunedThrough=highest)).rowcount == 0:
+            conn.execute(horizon.__table__.insert().values(id=1, prunedThrough=highest))
+
+    return pruned
@@ -1,20 +1,284 @@
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker, declarative_base
+import asyncio
+import os
+import time
 
-DATABASE_URL = "sqlite:///./vehicles.db"
+from sqlalchemy import create_engine, event, make_url
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import Session, sessionmaker, declarative_base
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool, StaticPool
 
-engine = create_engine(
-    DATABASE_URL,
-    connect_args={"check_same_thread": False}  # needed for SQLite in FastAPI
-)
+import metrics
+from shards import ShardSessions, ShardSet, shardUrls
+from writer import GroupCommitWriter
+
+DATABASE_URL = os.environ.get("VEHICLE_DATABASE_URL", "sqlite:///./vehicles.db")
+
+# PRAGMAs applied to every new connection. "default" leaves SQLite's own
+# settings (rollback journal, synchronous=FULL, 2 MiB cache, no mmap);
+# "performance" is what the service runs with.
+SQLITE_PROFILES = {
+    "default": {},
+    "performance": {
+        # readers no longer block on a writer (and vice versa)
+        "journal_mode": "WAL",
+        # durable across app crashes; only an OS crash can lose the last commits
+        "synchronous": "NORMAL",
+        # negative = KiB: 64 MiB page cache per connection
+        "cache_size": -65536,
+        "mmap_size": 256 * 1024 * 1024,
+        # wait for the write lock instead of failing with "database is locked"
+        "busy_timeout": 5000,
+        "temp_store": "MEMORY",
+    },
+}
+
+DB_PROFILE = os.environ.get("VEHICLE_DB_PROFILE", "performance")
+
+# sized for Starlette's threadpool (40 threads) running the sync routes
+DB_POOL_SIZE = int(os.environ.get("VEHICLE_DB_POOL_SIZE", "40"))
+DB_MAX_OVERFLOW = int(os.environ.get("VEHICLE_DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = float(os.environ.get("VEHICLE_DB_POOL_TIMEOUT", "30"))
+
+# serve the CRUD routes with async def handlers on an aiosqlite engine
+# instead of sync handlers on Starlette's threadpool (see main.py)
+ASYNC_DB = os.environ.get("VEHICLE_ASYNC_DB", "0") == "1"
+
+# coalesce concurrent single-row writes into one transaction (see writer.py)
+GROUP_COMMIT = os.environ.get("VEHICLE_GROUP_COMMIT", "0") == "1"
+GROUP_COMMIT_WINDOW_MS = float(os.environ.get("VEHICLE_GROUP_COMMIT_WINDOW_MS", "2"))
+GROUP_COMMIT_MAX_BATCH = int(os.environ.get("VEHICLE_GROUP_COMMIT_MAX_BATCH", "256"))
+
+
+# split vehicles across this many SQLite files by VIN hash (see shards.py);
+# 1 keeps the single DATABASE_URL file
+SHARDS = int(os.environ.get("VEHICLE_SHARDS", "1"))
+SHARD_KEY = os.environ.get("VEHICLE_SHARD_KEY", "vin")
+
+if SHARDS > 1 and (ASYNC_DB or GROUP_COMMIT):
+    raise ValueError("VEHICLE_SHARDS can't be combined with VEHICLE_ASYNC_DB or VEHICLE_GROUP_COMMIT")
+
+
+# statements at least this slow are counted and logged with their SQL
+SLOW_QUERY_MS = float(os.environ.get("VEHICLE_SLOW_QUERY_MS", "100"))
+
+
+def parsePragmas(text: str | None) -> dict:
+    """
+    "synchronous=FULL,cache_size=-20000" -> {"synchronous": "FULL", "cache_size": "-20000"}
+    """
+    pragmas = {}
+    for item in (text or "").split(","):
+        if "=" in item:
+            name, value = item.split("=", 1)
+            pragmas[name.strip()] = value.strip()
+    return pragmas
+
+
+class TimedQueuePool(QueuePool):
+    """
+    QueuePool that reports how long each checkout waited for a connection.
+    """
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            metrics.pool_wait.observe(time.perf_counter() - start)
+
+
+class TimedAsyncQueuePool(AsyncAdaptedQueuePool):
+    """
+    TimedQueuePool for the aiosqlite engine.
+    """
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            metrics.pool_wait.observe(time.perf_counter() - start)
+
+
+def _engineSettings(url: str, profile: str, pragmas: dict | None, engineArgs: dict, poolclass) -> dict:
+    if url.endswith(("sqlite://", ":memory:")):
+        # one shared connection, or every checkout would see an empty DB
+        engineArgs.setdefault("poolclass", StaticPool)
+    else:
+        engineArgs.setdefault("poolclass", poolclass)
+        engineArgs.setdefault("pool_size", DB_POOL_SIZE)
+        engineArgs.setdefault("max_overflow", DB_MAX_OVERFLOW)
+        engineArgs.setdefault("pool_timeout", DB_POOL_TIMEOUT)
+
+    return {**SQLITE_PROFILES[profile], **(pragmas or {})}
+
+
+def _configureSqlite(engine, settings: dict) -> None:
+    @event.listens_for(engine, "connect")
+    def applyPragmas(dbapi_connection, connection_record):
+        dbapi_connection.isolation_level = None
+        cursor = dbapi_connection.cursor()
+        for name, value in settings.items():
+            cursor.execute(f"PRAGMA {name}={value}")
+        cursor.close()
+
+    @event.listens_for(engine, "begin")
+    def beginTransaction(conn):
+        conn.exec_driver_sql(conn.get_execution_options().get("sqlite_begin", "BEGIN"))
+
+
+def _instrument(engine) -> None:
+    """
+    Time every statement (metrics.recordStatement), counting it against the
+    current request and logging it if slower than SLOW_QUERY_MS.
+    """
+    slowSeconds = SLOW_QUERY_MS / 1000
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def startTimer(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("statement_start", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def stopTimer(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info["statement_start"].pop()
+        metrics.recordStatement(statement, elapsed, slowSeconds)
+
+    @event.listens_for(engine, "handle_error")
+    def dropTimer(exception_context):
+        conn = exception_context.connection
+        if conn is not None and conn.info.get("statement_start"):
+            conn.info["statement_start"].pop()
+
+
+def makeEngine(url: str = DATABASE_URL, profile: str = DB_PROFILE, pragmas: dict | None = None, **engineArgs):
+    """
+    Engine with the given PRAGMA profile (plus overrides) applied on connect.
+
+    pysqlite's own transaction handling is switched off and BEGIN is emitted
+    explicitly (the SQLAlchemy-documented recipe), which is what makes
+    SAVEPOINTs, and therefore group commit, work.
+    """
+    settings = _engineSettings(url, profile, pragmas, engineArgs, TimedQueuePool)
+
+    engine = create_engine(
+        url,
+        connect_args={"check_same_thread": False},  # needed for SQLite in FastAPI
+        **engineArgs,
+    )
+    _configureSqlite(engine, settings)
+    _instrument(engine)
+
+    return engine
+
+
+def makeAsyncEngine(url: str = DATABASE_URL, profile: str = DB_PROFILE, pragmas: dict | None = None, **engineArgs):
+    """
+    makeEngine() for the async routes: the same database, profile and BEGIN
+    handling, driven through aiosqlite (optional dependency).
+    """
+    url = make_url(url).set(drivername="sqlite+aiosqlite").render_as_string(hide_password=False)
+    settings = _engineSettings(url, profile, pragmas, engineArgs, TimedAsyncQueuePool)
+
+    engine = create_async_engine(url, **engineArgs)
+    _configureSqlite(engine.sync_engine, settings)
+    _instrument(engine.sync_engine)
+
+    return engine
+
+
+engine = makeEngine(pragmas=parsePragmas(os.environ.get("VEHICLE_DB_PRAGMAS")))
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 Base = declarative_base()
 
+
+class AsyncBackingSession(Session):
+    """
+    The sync Session inside every AsyncSessionLocal session. Session events
+    for the async path (e.g. ChangeNotifier.watch) are registered on it.
+    """
+
+
+async_engine = makeAsyncEngine(pragmas=parsePragmas(os.environ.get("VEHICLE_DB_PRAGMAS"))) if ASYNC_DB else None
+
+AsyncSessionLocal = (
+    async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False, sync_session_class=AsyncBackingSession)
+    if ASYNC_DB else None
+)
+
+shard_set = (
+    ShardSet(
+        [makeEngine(url, pragmas=parsePragmas(os.environ.get("VEHICLE_DB_PRAGMAS"))) for url in shardUrls(DATABASE_URL, SHARDS)],
+        SHARD_KEY,
+    )
+    if SHARDS > 1 else None
+)
+
+group_writer = (
+    GroupCommitWriter(engine, windowSeconds=GROUP_COMMIT_WINDOW_MS / 1000, maxBatch=GROUP_COMMIT_MAX_BATCH)
+    if GROUP_COMMIT else None
+)
+
 def get_db():
+    if shard_set is not None:
+        # routes pick the shard once they know the VIN (main.vinSession)
+        shards = ShardSessions(shard_set)
+        try:
+            yield shards
+        finally:
+            shards.close()
+        return
+
     db = SessionLocal()
     try:
         yield db
     finally:
         db.close()
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+def beginImmediate(db) -> None:
+    """
+    Start the session's next transaction with BEGIN IMMEDIATE so it takes the
+    write lock up front. A plain (deferred) BEGIN first takes a read snapshot,
+    and in WAL mode upgrading it fails at once with "database is locked" if
+    another writer committed in between - busy_timeout can't help there.
+    """
+    if not db.in_transaction():
+        db.connection(execution_options={"sqlite_begin": "BEGIN IMMEDIATE"})
+
+def runWrite(db, work):
+    """
+    Run work(conn) - a few Core statements - in a committed transaction and
+    return its result. With group commit on, the work is handed to
+    group_writer and shares a transaction with concurrent writes; otherwise
+    it runs on the request's session. Exceptions raised by work propagate
+    and its statements are rolled back either way.
+    """
+    if group_writer is not None:
+        return group_writer.submit(work).result()
+
+    beginImmediate(db)
+    result = work(db)
+    db.commit()
+    return result
+
+async def runWriteAsync(db, work):
+    """
+    runWrite() for an AsyncSession. work(conn) is the same sync function: it
+    runs through run_sync, or on group_writer's thread, so the event loop is
+    never blocked and no threadpool worker is held.
+    """
+    if group_writer is not None:
+        return await asyncio.wrap_future(group_writer.submit(work))
+
+    def inTransaction(session):
+        beginImmediate(session)
+        return work(session)
+
+    result = await db.run_sync(inTransaction)
+    await db.commit()
+    return result
@@ -0,0 +1,276 @@
+"""
+Streaming export of the vehicles table to CSV, NDJSON, Arrow IPC or Parquet.
+
+Rows are read straight from the DB in EXPORT_BATCH_SIZE batches (no ORM
+objects, no VehicleRead validation) and encoded batch by batch, so memory
+stays bounded by the batch size whatever the table size. Arrow/Parquet need
+pyarrow and zstd compression needs zstandard; both are optional.
+"""
+import csv
+import heapq
+import io
+import itertools
+import json
+import zlib
+
+from sqlalchemy import Float, Integer, select
+
+import models
+
+EXPORT_FORMATS = ("csv", "ndjson", "arrow", "parquet")
+EXPORT_COMPRESSIONS = ("gzip", "zstd")
+EXPORT_BATCH_SIZE = 5000
+
+# every column an export may project; version is internal and not exported
+EXPORT_COLUMNS = (
+    "id", "vin", "manuName", "description", "horsePower", "modelName", "modelYear", "purchasePrice", "fuelType",
+)
+
+MEDIA_TYPES = {
+    "csv": "text/csv",
+    "ndjson": "application/x-ndjson",
+    "arrow": "application/vnd.apache.arrow.stream",
+    "parquet": "application/vnd.apache.parquet",
+}
+
+FILE_EXTENSIONS = {"csv": "csv", "ndjson": "ndjson", "arrow": "arrows", "parquet": "parquet"}
+
+
+class ExportError(ValueError):
+    """
+    Bad export options (unknown format, compression or field).
+    """
+
+
+class ExportUnavailable(ExportError):
+    """
+    The requested format/compression needs an optional package that isn't installed.
+    """
+
+
+def parseFields(fields: str | None) -> list[str]:
+    if not fields:
+        return list(EXPORT_COLUMNS)
+
+    columns = [name.strip() for name in fields.split(",") if name.strip()]
+    unknown = [name for name in columns if name not in EXPORT_COLUMNS]
+    if unknown or not columns:
+        raise ExportError(f"Unknown export fields: {', '.join(unknown) or fields!r}")
+
+    return list(dict.fromkeys(columns))
+
+
+def _requirePyarrow():
+    try:
+        import pyarrow
+    except ImportError:
+        raise ExportUnavailable("arrow and parquet exports need the optional 'pyarrow' package") from None
+    return pyarrow
+
+
+def _requireZstandard():
+    try:
+        import zstandard
+    except ImportError:
+        raise ExportUnavailable("zstd compression needs the optional 'zstandard' package") from None
+    return zstandard
+
+
+def checkOptions(format: str, compression: str | None) -> None:
+    """
+    Fail before any bytes are sent if the export can't be produced.
+    """
+    if format not in EXPORT_FORMATS:
+        raise ExportError(f"format must be one of {', '.join(EXPORT_FORMATS)}")
+    if compression is not None and compression not in EXPORT_COMPRESSIONS:
+        raise ExportError(f"compression must be one of {', '.join(EXPORT_COMPRESSIONS)}")
+
+    if format in ("arrow", "parquet"):
+        _requirePyarrow()
+    if compression == "zstd":
+        _requireZstandard()
+
+
+def iterRowBatches(bind, columns: list[str], batchSize: int = EXPORT_BATCH_SIZE):
+    """
+    Yield lists of row tuples in id order, batchSize at a time, from a
+    streaming cursor.
+    """
+    table = models.Vehicle.__table__
+    stmt = select(*(table.c[name] for name in columns)).order_by(table.c.id)
+
+    with bind.connect() as conn:
+        result = conn.execution_options(yield_per=batchSize).execute(stmt)
+        for batch in result.partitions():
+            yield batch
+
+
+def _prefetched(batches, executor):
+    # read the next batch on executor while the caller handles this one
+    iterator = iter(batches)
+    future = executor.submit(next, iterator, None)
+    while (batch := future.result()) is not None:
+        future = executor.submit(next, iterator, None)
+        yield batch
+
+
+def iterMergedRowBatches(binds, columns: list[str], batchSize: int = EXPORT_BATCH_SIZE, executor=None):
+    """
+    iterRowBatches() over several shards, k-way merged back into one id order.
+    id rides along at the end of each row for the merge and is dropped again.
+    With an executor, every shard reads its next batch concurrently.
+    """
+    streams = []
+    for bind in binds:
+        batches = iterRowBatches(bind, [*columns, "id"], batchSize)
+        if executor is not None:
+            batches = _prefetched(batches, executor)
+        streams.append(itertools.chain.from_iterable(batches))
+
+    merged = heapq.merge(*streams, key=lambda row: row[-1])
+
+    while batch := [row[:-1] for row in itertools.islice(merged, batchSize)]:
+        yield batch
+
+
+def _iterCsv(batches, columns):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    for batch in batches:
+        writer.writerows(batch)
+        yield buffer.getvalue().encode()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode()
+
+
+def _iterNdjson(batches, columns):
+    for batch in batches:
+        yield "".join(json.dumps(dict(zip(columns, row))) + "\n" for row in batch).encode()
+
+
+def _arrowSchema(pa, columns):
+    table = models.Vehicle.__table__
+    fields = []
+    for name in columns:
+        columnType = table.c[name].type
+        if isinstance(columnType, Integer):
+            arrowType = pa.int64()
+        elif isinstance(columnType, Float):
+            arrowType = pa.float64()
+        else:
+            arrowType = pa.string()
+        fields.append(pa.field(name, arrowType, nullable=table.c[name].nullable))
+    return pa.schema(fields)
+
+
+def _recordBatch(pa, schema, batch):
+    arrays = [pa.array(values, type=field.type) for values, field in zip(zip(*batch), schema)]
+    return pa.RecordBatch.from_arrays(arrays, schema=schema)
+
+
+class _DrainableSink(io.RawIOBase):
+    """
+    Write-only file object whose contents are handed out (and released)
+    after every batch.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._chunks = []
+        self._position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def _iterArrow(batches, columns):
+    pa = _requirePyarrow()
+    import pyarrow.ipc
+
+    schema = _arrowSchema(pa, columns)
+    sink = _DrainableSink()
+    with pyarrow.ipc.new_stream(sink, schema) as writer:
+        for batch in batches:
+            writer.write_batch(_recordBatch(pa, schema, batch))
+            yield sink.drain()
+    yield sink.drain()
+
+
+def _iterParquet(batches, columns):
+    pa = _requirePyarrow()
+    import pyarrow.parquet
+
+    schema = _arrowSchema(pa, columns)
+    sink = _DrainableSink()
+    # one row group per batch; the footer is written on close
+    with pyarrow.parquet.ParquetWriter(sink, schema) as writer:
+        for batch in batches:
+            writer.write_batch(_recordBatch(pa, schema, batch))
+            yield sink.drain()
+    yield sink.drain()
+
+
+ENCODERS = {"csv": _iterCsv, "ndjson": _iterNdjson, "arrow": _iterArrow, "parquet": _iterParquet}
+
+
+def _compress(chunks, compression: str):
+    if compression == "gzip":
+        compressor = zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    else:
+        compressor = _requireZstandard().ZstdCompressor().compressobj()
+
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def encodeBatches(batches, format: str, columns: list[str], compression: str | None = None):
+    """
+    Encode an iterable of row batches as a stream of bytes chunks.
+    """
+    chunks = (chunk for chunk in ENCODERS[format](batches, columns) if chunk)
+    return _compress(chunks, compression) if compression else chunks
+
+
+def iterExport(bind, format: str, columns: list[str], compression: str | None = None, executor=None):
+    """
+    bind is an engine, or a list of shard engines (see shards.py) read
+    through executor.
+    """
+    checkOptions(format, compression)
+    if isinstance(bind, list):
+        batches = iterMergedRowBatches(bind, columns, executor=executor)
+    else:
+        batches = iterRowBatches(bind, columns)
+    return encodeBatches(batches, format, columns, compression)
+
+
+def exportToFile(bind, path: str, format: str, columns: list[str], compression: str | None = None, executor=None) -> int:
+    """
+    Write an export to a local file; returns the number of bytes written.
+    bind and executor are as for iterExport (a list of shard engines is merged).
+    """
+    written = 0
+    with open(path, "wb") as out:
+        for chunk in iterExport(bind, format, columns, compression, executor):
+            out.write(chunk)
+            written += len(chunk)
+    return written
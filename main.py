@@ -1,25 +1,140 @@
-from fastapi import FastAPI, Depends, HTTPException, status
+import asyncio
+import base64
+import binascii
+import csv
+import itertools
+import json
+import math
+import os
+import re
+
+from fastapi import APIRouter, FastAPI, Depends, HTTPException, Query, Request, Response, status
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from pydantic import ValidationError
+from sqlalchemy import and_, delete, or_, select, text, tuple_, update
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from contextlib import asynccontextmanager
 
-from database import Base, engine, get_db
+from cache import LRUCache
+from database import (
+    ASYNC_DB, AsyncBackingSession, AsyncSessionLocal, SessionLocal, async_engine, beginImmediate, engine, get_async_db,
+    get_db, group_writer, runWrite, runWriteAsync, shard_set,
+)
 import models
-from schemas import VehicleCreate, VehicleUpdate, VehicleRead
+from schemas import (
+    BulkResult, ChangeFeed, FleetStats, StatsConsistency, VehicleCreate, VehicleFilter, VehiclePatch, VehicleRead,
+    VehicleSearchHit, VehicleUpdate,
+)
+import changes
+import export
+import metrics
+import serialize
+import shards
+import stats
+import vindecoder
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    Base.metadata.create_all(bind=engine)
+    if shard_set is None:
+        models.upgradeSchema(engine)
+    else:
+        for index, shardEngine in enumerate(shard_set.engines):
+            models.upgradeSchema(shardEngine)
+            with shardEngine.begin() as conn:
+                shards.seedIdSequences(conn, index)
     yield
+    if group_writer is not None:
+        group_writer.close()
+    if async_engine is not None:
+        await async_engine.dispose()
+    if shard_set is not None:
+        shard_set.close()
 
 
 app = FastAPI(lifespan=lifespan)
 
+# add a Server-Timing header (SQL time / statement count / handler time) to every response
+SERVER_TIMING = os.environ.get("VEHICLE_SERVER_TIMING", "0") == "1"
+
+app.add_middleware(metrics.TimingMiddleware, serverTiming=SERVER_TIMING)
+
+# the CRUD routes exist twice: sync handlers on a Session (run in Starlette's
+# threadpool) and async handlers on an AsyncSession. VEHICLE_ASYNC_DB picks
+# which set is mounted, at the end of this module.
+sync_routes = APIRouter()
+async_routes = APIRouter()
+
+# page size used by GET /vehicle/ when the client doesn't pass ?limit=
+LIST_DEFAULT_LIMIT = 100
+LIST_MAX_LIMIT = 1000
+
+# rows fetched from the DB per round trip while streaming NDJSON
+STREAM_CHUNK_SIZE = 500
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+# columns sent back by INSERT/UPDATE ... RETURNING
+VEHICLE_COLUMNS = tuple(models.Vehicle.__table__.c)
+
+# read-through cache for GET /vehicle/{vin}: normalized VIN -> (etag, JSON body, row)
+VIN_CACHE_SIZE = 10_000
+VIN_CACHE_TTL = 60.0
+
+vehicle_cache = LRUCache(maxSize=VIN_CACHE_SIZE, ttl=VIN_CACHE_TTL)
+
+# GET /vehicle/changes and /vehicle/changes/stream
+CHANGES_DEFAULT_LIMIT = 100
+CHANGES_MAX_LIMIT = 1000
+CHANGES_MAX_WAIT = 30.0
+# waiters also re-check the DB this often, to see writes from other processes
+CHANGES_POLL_INTERVAL = 1.0
+SSE_HEARTBEAT = 15.0
+
+change_notifier = changes.ChangeNotifier()
+change_notifier.watch(SessionLocal)
+change_notifier.watch(AsyncBackingSession)
+if group_writer is not None:
+    group_writer.listeners.append(change_notifier.notify)
+
+def cacheMetrics() -> list[str]:
+    # vehicle_cache counters for /metrics
+    counts = vehicle_cache.stats()
+    lines = []
+    for name in ("hits", "misses", "evictions", "expirations", "invalidations"):
+        lines += [f"# TYPE vehicle_cache_{name}_total counter", f"vehicle_cache_{name}_total {counts[name]}"]
+    lines += ["# TYPE vehicle_cache_entries gauge", f"vehicle_cache_entries {counts['size']}"]
+    return lines
+
+metrics.addCollector(cacheMetrics)
+
+if group_writer is not None:
+    metrics.addCollector(lambda: [
+        "# TYPE group_commit_batches_total counter", f"group_commit_batches_total {group_writer.batches}",
+        "# TYPE group_commit_jobs_total counter", f"group_commit_jobs_total {group_writer.jobs}",
+    ])
+
+# rows per duplicate-check query and per INSERT transaction in POST /vehicle/bulk
+BULK_CHUNK_SIZE = 1000
+
+# new VINs (create, bulk) must carry a correct position-9 check digit.
+# Lookups by VIN only check the format, so rows stored before this still resolve.
+VIN_CHECK_DIGIT = os.environ.get("VEHICLE_VIN_CHECK_DIGIT", "1") == "1"
+# reject writes whose manuName / modelYear contradict the VIN's WMI / year code
+VIN_CROSS_CHECK = os.environ.get("VEHICLE_VIN_CROSS_CHECK", "0") == "1"
+
 # HELPER FUNCTIONS
 
 def normalizeVin(vin: str) -> str:
     return vin.strip().upper()
 
-def validateVin(vin: str) -> str:
+def validateVin(vin: str, verifyCheckDigit: bool = False) -> str:
+    """
+    Normalize a VIN and enforce the FMVSS 115 format (see vindecoder); new
+    VINs also pass verifyCheckDigit=VIN_CHECK_DIGIT.
+    """
     if vin is None:
         raise HTTPException(
             status_code = status.HTTP_422_UNPROCESSABLE_CONTENT,
@@ -28,37 +143,47 @@ def validateVin(vin: str) -> str:
     
     vinNorm = normalizeVin(vin)
 
-    if len(vinNorm) == 0:
+    error = vindecoder.vinError(vinNorm, verifyCheckDigit)
+    if error:
         raise HTTPException(
             status_code=status.HTTP_422_UNPROCESSABLE_CONTENT,
-            detail={"vin: [VIN cannot be empty]"},
+            detail={"vin": [error]},
         )
 
-    # based on the rules set in the United States
-    # must be exactly 17 characters
-    if len(vinNorm) != 17:
-        raise HTTPException(
-            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
-            detail={"vin": ["VIN must be exactly 17 characters"]},
-        )
+    return vinNorm
 
-    # illegal char: I, O, Q
-    illegal_chars = {"I", "O", "Q"}
-    if any(ch in illegal_chars for ch in vinNorm):
-        raise HTTPException(
-            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
-            detail={"vin": ["VIN cannot contain the letters I, O, or Q"]},
-        )
+def crossCheckVin(vinNorm: str, values: dict) -> None:
+    """
+    With VIN_CROSS_CHECK on, 422 if manuName / modelYear (when present in
+    values) contradict the decoded VIN.
+    """
+    if not VIN_CROSS_CHECK:
+        return
+
+    errors = vindecoder.crossCheck(vinNorm, values.get("manuName"), values.get("modelYear"))
+    if errors:
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_CONTENT, detail=errors)
+
+def vinSession(db, vinNorm: str) -> Session:
+    """
+    The session that holds vinNorm: db itself, or in sharded mode (where
+    get_db yields shards.ShardSessions) the session of the VIN's shard.
+    """
+    if isinstance(db, shards.ShardSessions):
+        return db.forVin(vinNorm)
+    return db
+
+def shardEngines():
+    # every database file vehicles live in
+    return shard_set.engines if shard_set is not None else [engine]
 
-    # VIN must be alphanumeric (letters + numbers only)
-    if not vinNorm.isalnum():
+def requireSingleDatabase(feature: str) -> None:
+    if shard_set is not None:
         raise HTTPException(
-            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
-            detail={"vin": ["VIN must contain only A-Z and 0-9 characters"]},
+            status_code=status.HTTP_501_NOT_IMPLEMENTED,
+            detail=f"{feature} is not available with VEHICLE_SHARDS > 1",
         )
 
-    return vinNorm
-
 def get_vehicle_or_404(vin: str, db: Session):
     """
     Validate + normalize VIN, then retrieve the vehicle or return 404.
@@ -79,83 +204,1102 @@ def get_vehicle_or_404(vin: str, db: Session):
     
     return vehicle
 
+async def get_vehicle_or_404_async(vin: str, db: AsyncSession):
+    """
+    get_vehicle_or_404() for the async routes.
+    """
+    vinNorm = validateVin(vin)
+
+    vehicle = await db.scalar(select(models.Vehicle).where(models.Vehicle.vin == vinNorm))
+
+    if not vehicle:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Vehicle with VIN {vinNorm} not found",
+        )
+
+    return vehicle
+
+def vehicleEtag(vehicle, names: tuple[str, ...] = serialize.READ_FIELDS) -> str:
+    # strong validator: ids are never reused and version bumps on every write;
+    # a ?fields= projection is a different representation, so it gets its own tag
+    if names == serialize.READ_FIELDS:
+        return f'"{vehicle.id}-{vehicle.version}"'
+    return f'"{vehicle.id}-{vehicle.version}.{".".join(names)}"'
+
+def serializeVehicle(row) -> tuple[str, bytes, tuple]:
+    """
+    vehicle_cache entry for a readVehicleStmt row: (etag, full JSON body, row).
+    The row is kept so ?fields= projections can be served from the cache too.
+    """
+    return vehicleEtag(row), serialize.encodeRow(row, serialize.READ_FIELDS), row
+
+def parseReadFields(fields: str | None) -> tuple[str, ...]:
+    try:
+        return serialize.parseFields(fields)
+    except serialize.FieldsError as exc:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_CONTENT,
+            detail={"fields": [str(exc)]},
+        )
+
+def readVehicleStmt(vinNorm: str):
+    # READ_FIELDS first, in order, so the row can be encoded as-is; version for the ETag
+    columns = serialize.readColumns(serialize.READ_FIELDS, "version")
+    return select(*columns).where(models.Vehicle.vin == vinNorm)
+
+def vehicleNotFound(vinNorm: str) -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_404_NOT_FOUND,
+        detail=f"Vehicle with VIN {vinNorm} not found",
+    )
+
+def vehicleResponse(request: Request, entry: tuple, names: tuple[str, ...]) -> Response:
+    """
+    200 (or 304 on a matching If-None-Match) for a vehicle_cache entry,
+    projected to `names`.
+    """
+    etag, body, row = entry
+    if names != serialize.READ_FIELDS:
+        etag = vehicleEtag(row, names)
+        body = serialize.encodeRow([getattr(row, name) for name in names], names)
+
+    if etagMatches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+
+    return Response(content=body, media_type="application/json", headers={"ETag": etag})
+
+def etagMatches(ifNoneMatch: str | None, etag: str) -> bool:
+    """
+    If-None-Match uses the weak comparison (RFC 9110 13.1.2).
+    """
+    if not ifNoneMatch:
+        return False
+    if ifNoneMatch.strip() == "*":
+        return True
+
+    candidates = (tag.strip().removeprefix("W/") for tag in ifNoneMatch.split(","))
+    return etag in candidates
+
+# WRITE HELPERS
+# Each takes a Session or Connection, issues one statement and leaves the
+# commit to database.runWrite (which may group it with concurrent writes).
+
+def insertVehicleRow(conn, values: dict) -> dict:
+    # one statement: the unique index on vin does the duplicate check
+    row = conn.execute(
+        sqlite_insert(models.Vehicle)
+        .values(**values)
+        .on_conflict_do_nothing(index_elements=["vin"])
+        .returning(*VEHICLE_COLUMNS)
+    ).first()
+
+    # no duplicate VIN
+    if row is None:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_CONTENT,
+            detail={"vin": ["VIN already exists"]},
+        )
+
+    return row._asdict()
+
+def updateVehicleRow(conn, vinNorm: str, values: dict) -> dict:
+    """
+    UPDATE ... RETURNING in one statement; bumps version. Raises 404 if no row matched.
+    """
+    row = conn.execute(
+        update(models.Vehicle)
+        .where(models.Vehicle.vin == vinNorm)
+        .values(**values, version=models.Vehicle.version + 1)
+        .returning(*VEHICLE_COLUMNS)
+    ).first()
+
+    if row is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Vehicle with VIN {vinNorm} not found",
+        )
+
+    return row._asdict()
+
+def deleteVehicleRow(conn, vinNorm: str) -> None:
+    deleted = conn.execute(
+        delete(models.Vehicle)
+        .where(models.Vehicle.vin == vinNorm)
+        .returning(models.Vehicle.id)
+    ).first()
+
+    if deleted is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Vehicle with VIN {vinNorm} not found",
+        )
+
+# LIST QUERY HELPERS
+
+# columns GET /vehicle/ can sort on; id is always appended as the tie-breaker,
+# in the direction of the last key so an index can still supply the order
+SORTABLE_FIELDS = (
+    "id", "vin", "manuName", "modelName", "modelYear", "horsePower", "purchasePrice", "fuelType",
+)
+
+def parseSort(sort: str | None) -> list[tuple[str, bool]]:
+    """
+    Parse `?sort=manuName,-modelYear` into [(column, descending), ...].
+    """
+    keys = []
+    for part in (sort or "").split(","):
+        part = part.strip()
+        if not part:
+            continue
+
+        name = part.lstrip("+-")
+        if name not in SORTABLE_FIELDS or name in (key for key, _ in keys):
+            raise HTTPException(
+                status_code=status.HTTP_422_UNPROCESSABLE_CONTENT,
+                detail={"sort": [f"Cannot sort by {name!r}"]},
+            )
+        keys.append((name, part.startswith("-")))
+
+    if "id" not in (key for key, _ in keys):
+        keys.append(("id", keys[-1][1] if keys else False))
+
+    return keys
+
+def sortSpec(keys: list[tuple[str, bool]]) -> str:
+    return ",".join(("-" if descending else "") + name for name, descending in keys)
+
+def filterClauses(filters: VehicleFilter) -> list:
+    table = models.Vehicle.__table__
+    clauses = []
+
+    for name in ("manuName", "modelName", "fuelType"):
+        value = getattr(filters, name)
+        if value is not None:
+            clauses.append(table.c[name] == value)
+
+    for name in ("modelYear", "horsePower", "purchasePrice"):
+        suffix = name[0].upper() + name[1:]
+        low = getattr(filters, f"min{suffix}")
+        high = getattr(filters, f"max{suffix}")
+        if low is not None:
+            clauses.append(table.c[name] >= low)
+        if high is not None:
+            clauses.append(table.c[name] <= high)
+
+    return clauses
+
+def orderByClauses(keys: list[tuple[str, bool]]) -> list:
+    table = models.Vehicle.__table__
+    return [table.c[name].desc() if descending else table.c[name] for name, descending in keys]
+
+def keysetClause(keys: list[tuple[str, bool]], after: list):
+    """
+    Rows strictly after `after` in the given sort order.
+
+    Uses a row-value comparison when every key sorts the same way (SQLite can
+    seek an index with it), otherwise the expanded OR-of-prefixes form.
+    Assumes sort columns are not NULL, which the API never writes.
+    """
+    table = models.Vehicle.__table__
+    columns = [table.c[name] for name, _ in keys]
+
+    directions = {descending for _, descending in keys}
+    if len(directions) == 1:
+        if directions.pop():
+            return tuple_(*columns) < tuple_(*after)
+        return tuple_(*columns) > tuple_(*after)
+
+    alternatives = []
+    for i, (column, (_, descending)) in enumerate(zip(columns, keys)):
+        prefix = [columns[j] == after[j] for j in range(i)]
+        step = column < after[i] if descending else column > after[i]
+        alternatives.append(and_(*prefix, step))
+
+    return or_(*alternatives)
+
+def encodeCursor(keys: list[tuple[str, bool]], row) -> str:
+    """
+    Opaque keyset cursor: url-safe base64 of the sort spec plus the sort-key
+    values of the last row the client has seen.
+    """
+    payload = {"sort": sortSpec(keys), "after": [getattr(row, name) for name, _ in keys]}
+    raw = json.dumps(payload, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+# SQLite INTEGER range; larger ints fail to bind
+SQLITE_INT_MIN, SQLITE_INT_MAX = -2**63, 2**63 - 1
+
+def cursorValueFits(name: str, value) -> bool:
+    """
+    Whether a decoded cursor value can be bound against its sort column:
+    client-edited cursors must fail as 422, not reach SQLite.
+    """
+    pythonType = models.Vehicle.__table__.c[name].type.python_type
+    if isinstance(value, bool):
+        return False
+    if pythonType is int:
+        return isinstance(value, int) and SQLITE_INT_MIN <= value <= SQLITE_INT_MAX
+    if pythonType is float:
+        return isinstance(value, (int, float)) and math.isfinite(value)
+    return isinstance(value, pythonType)
+
+def decodeCursor(cursor: str, keys: list[tuple[str, bool]]) -> list:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded))
+        after = payload["after"]
+        valid = (
+            payload["sort"] == sortSpec(keys)
+            and isinstance(after, list)
+            and len(after) == len(keys)
+            and all(cursorValueFits(name, value) for (name, _), value in zip(keys, after))
+        )
+    except (binascii.Error, ValueError, TypeError, KeyError):
+        valid = False
+
+    if not valid:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_CONTENT,
+            detail={"cursor": ["Invalid pagination cursor for this sort order"]},
+        )
+
+    return after
+
+def buildListQuery(filters: VehicleFilter, keys: list[tuple[str, bool]], after: list | None, columns=None):
+    """
+    SELECT for GET /vehicle/: filters, keyset predicate and ORDER BY, without LIMIT.
+    Selects the mapped Vehicle unless `columns` is given (plain row tuples).
+    """
+    stmt = select(*columns) if columns is not None else select(models.Vehicle)
+
+    clauses = filterClauses(filters)
+    if after is not None:
+        clauses.append(keysetClause(keys, after))
+    if clauses:
+        stmt = stmt.where(*clauses)
+
+    return stmt.order_by(*orderByClauses(keys))
+
+def wantsNdjson(request: Request, format: str | None) -> bool:
+    if format is not None:
+        return format == "ndjson"
+    return NDJSON_MEDIA_TYPE in request.headers.get("accept", "")
+
+def iterVehiclesNdjson(stmt, names: tuple[str, ...]):
+    """
+    Stream vehicles as NDJSON, pulling STREAM_CHUNK_SIZE rows per DB round trip.
+
+    Runs with its own session because the body is produced after the route
+    (and its get_db session) has already returned.
+    """
+    stmt = stmt.execution_options(yield_per=STREAM_CHUNK_SIZE)
+
+    with SessionLocal() as db:
+        result = db.execute(stmt)
+        for rows in result.partitions():
+            yield serialize.encodeNdjson(rows, names)
+
+async def iterVehiclesNdjsonAsync(stmt, names: tuple[str, ...]):
+    """
+    iterVehiclesNdjson() on an AsyncSession, for the async list route.
+    """
+    stmt = stmt.execution_options(yield_per=STREAM_CHUNK_SIZE)
+
+    async with AsyncSessionLocal() as db:
+        result = await db.stream(stmt)
+        async for rows in result.partitions():
+            yield serialize.encodeNdjson(rows, names)
+
+def iterVehiclesNdjsonSharded(stmt, keys: list[tuple[str, bool]], names: tuple[str, ...], limit: int | None):
+    """
+    iterVehiclesNdjson() across every shard: each shard streams its rows in
+    sort order and the streams are k-way merged. stmt must select the sort
+    keys (listColumns) so rows can be compared.
+    """
+    stmt = stmt.execution_options(yield_per=STREAM_CHUNK_SIZE)
+    sessions = [factory() for factory in shard_set.sessionmakers]
+    try:
+        merged = shards.mergeSorted([session.execute(stmt) for session in sessions], keys)
+        if limit is not None:
+            merged = itertools.islice(merged, limit)
+        while rows := list(itertools.islice(merged, STREAM_CHUNK_SIZE)):
+            yield serialize.encodeNdjson(rows, names)
+    finally:
+        for session in sessions:
+            session.close()
+
+def fanOutPage(db: shards.ShardSessions, stmt, keys: list[tuple[str, bool]], pageSize: int) -> list:
+    """
+    Run a list query (already limited to pageSize + 1) on every shard in
+    parallel; the first pageSize + 1 rows of the merged results are the page.
+    """
+    results = db.map(lambda session: session.execute(stmt).all())
+    return list(itertools.islice(shards.mergeSorted(results, keys), pageSize + 1))
+
+def listColumns(keys: list[tuple[str, bool]], names: tuple[str, ...]) -> list:
+    # the sort keys ride along (unsent) so the next cursor can be built
+    return serialize.readColumns(names, *(name for name, _ in keys))
+
+def pageResponse(request: Request, keys: list[tuple[str, bool]], rows: list, pageSize: int, names: tuple[str, ...]) -> Response:
+    """
+    Trim the pageSize + 1 rows a list query fetched to one page and encode it;
+    if there was an extra row, advertise the next page in Link / X-Next-Cursor.
+    """
+    headers = {}
+    if len(rows) > pageSize:
+        rows = rows[:pageSize]
+        nextCursor = encodeCursor(keys, rows[-1])
+        nextUrl = request.url.include_query_params(cursor=nextCursor, limit=pageSize)
+        headers["Link"] = f'<{nextUrl}>; rel="next"'
+        headers["X-Next-Cursor"] = nextCursor
+
+    return Response(content=serialize.encodeRows(rows, names), media_type="application/json", headers=headers)
+
+# SEARCH HELPERS
+
+SEARCH_DEFAULT_LIMIT = 20
+SEARCH_MAX_LIMIT = 100
+
+# bm25() weights in vehicles_fts column order: description, manuName, modelName
+SEARCH_SQL = text("""
+    SELECT v.id, v.vin, v.manuName, v.description, v.horsePower, v.modelName,
+           v.modelYear, v.purchasePrice, v.fuelType,
+           bm25(vehicles_fts, 1.0, 3.0, 3.0) AS rank,
+           snippet(vehicles_fts, -1, '<mark>', '</mark>', '…', 12) AS snippet
+    FROM vehicles_fts
+    JOIN vehicles AS v ON v.id = vehicles_fts.rowid
+    WHERE vehicles_fts MATCH :match
+    ORDER BY rank, v.id
+    LIMIT :limit OFFSET :offset
+""")
+
+def buildMatchQuery(q: str) -> str:
+    """
+    Turn free text like "hybrid corolla tow" into an FTS5 query where every
+    word must match as a prefix. Quoting each token keeps user input from
+    being parsed as FTS5 operators.
+    """
+    tokens = re.findall(r"\w+", q)
+    if not tokens:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_CONTENT,
+            detail={"q": ["Search query must contain at least one word"]},
+        )
+
+    return " ".join(f'"{token}"*' for token in tokens)
+
+# CHANGE FEED HELPERS
+
+def readChangesPage(since: int, limit: int):
+    with SessionLocal() as db:
+        try:
+            return changes.readChanges(db, since, limit)
+        except changes.CursorExpired:
+            raise HTTPException(
+                status_code=status.HTTP_410_GONE,
+                detail={"since": ["Cursor is older than pruned tombstones; resync from since=0"]},
+            )
+
+async def waitForChanges(since: int, limit: int, wait: float):
+    """
+    Long-poll: return as soon as there is at least one change after `since`,
+    or an empty page once `wait` seconds pass. Sleeps on change_notifier
+    between checks rather than querying in a tight loop.
+    """
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + wait
+
+    while True:
+        future = change_notifier.subscribe()
+        try:
+            page, hasMore = await run_in_threadpool(readChangesPage, since, limit)
+        except BaseException:
+            change_notifier.unsubscribe(future)
+            raise
+
+        remaining = deadline - loop.time()
+        if page or remaining <= 0:
+            change_notifier.unsubscribe(future)
+            return page, hasMore
+
+        await change_notifier.wait(future, min(remaining, CHANGES_POLL_INTERVAL))
+
+def sseEvent(change: dict) -> str:
+    return f"id: {change['seq']}\nevent: {change['op']}\ndata: {json.dumps(change)}\n\n"
+
+async def iterChangeEvents(request: Request, since: int, lifetime: float):
+    loop = asyncio.get_running_loop()
+    closeAt = loop.time() + lifetime
+    lastSent = loop.time()
+
+    # tell EventSource clients how long to wait before reconnecting
+    yield "retry: 1000\n\n"
+
+    while loop.time() < closeAt and not await request.is_disconnected():
+        future = change_notifier.subscribe()
+        try:
+            page, hasMore = await run_in_threadpool(readChangesPage, since, CHANGES_MAX_LIMIT)
+        except HTTPException as exc:
+            change_notifier.unsubscribe(future)
+            yield f"event: error\ndata: {json.dumps(exc.detail)}\n\n"
+            return
+
+        for change in page:
+            yield sseEvent(change)
+            since = change["seq"]
+            lastSent = loop.time()
+
+        if hasMore:
+            change_notifier.unsubscribe(future)
+            continue
+
+        if loop.time() - lastSent >= SSE_HEARTBEAT:
+            yield ": keep-alive\n\n"
+            lastSent = loop.time()
+
+        timeout = min(CHANGES_POLL_INTERVAL, max(0.0, closeAt - loop.time()))
+        await change_notifier.wait(future, timeout)
+
+# BULK INGEST HELPERS
+
+def parseBulkRow(index: int, data) -> tuple[dict | None, dict]:
+    """
+    Validate one bulk row (a parsed dict, None if it couldn't be parsed, or
+    the UnicodeDecodeError of a line that isn't UTF-8). Returns (insertable
+    values, result) where the values are None if the row is invalid.
+    """
+    if isinstance(data, UnicodeDecodeError):
+        error = f"row: not valid UTF-8 (byte 0x{data.object[data.start]:02x} at offset {data.start})"
+        return None, {"index": index, "vin": None, "status": "invalid", "errors": [error]}
+
+    vin = data.get("vin") if isinstance(data, dict) else None
+    # only echoed back as given when it's a string (BulkRowResult.vin)
+    vin = vin if isinstance(vin, str) else None
+
+    try:
+        vehicle_in = VehicleCreate.model_validate(data)
+    except ValidationError as exc:
+        errors = [
+            f"{'.'.join(str(part) for part in err['loc']) or 'row'}: {err['msg']}"
+            for err in exc.errors()
+        ]
+        return None, {"index": index, "vin": vin, "status": "invalid", "errors": errors}
+
+    values = vehicle_in.model_dump()
+    # would fail the whole chunk's executemany with OverflowError
+    errors = [
+        f"{name}: Integer is outside SQLite's 64-bit range"
+        for name, value in values.items()
+        if isinstance(value, int) and not SQLITE_INT_MIN <= value <= SQLITE_INT_MAX
+    ]
+    if errors:
+        return None, {"index": index, "vin": vin, "status": "invalid", "errors": errors}
+
+    # the VIN itself is checked per chunk, in screenBulkVins
+    vinNorm = normalizeVin(vehicle_in.vin)
+    values["vin"] = vinNorm
+    return values, {"index": index, "vin": vinNorm, "status": "created"}
+
+def screenBulkVins(chunk: list[tuple[dict, dict]]) -> list[tuple[dict, dict]]:
+    """
+    Validate a chunk's VINs in one vindecoder.validateMany call; rows with a
+    bad VIN (or, with VIN_CROSS_CHECK, contradicting fields) are marked
+    invalid and dropped from the returned chunk.
+    """
+    errors = vindecoder.validateMany([values["vin"] for values, _ in chunk], VIN_CHECK_DIGIT)
+
+    valid = []
+    for (values, result), error in zip(chunk, errors):
+        if error is None and VIN_CROSS_CHECK:
+            mismatches = vindecoder.crossCheck(values["vin"], values["manuName"], values["modelYear"])
+            error = "; ".join(msg for msgs in mismatches.values() for msg in msgs) or None
+
+        if error is None:
+            valid.append((values, result))
+        else:
+            result["status"] = "invalid"
+            result["errors"] = [f"vin: {error}"]
+
+    return valid
+
+def ingestChunk(db: Session, chunk: list[tuple[dict, dict]]) -> None:
+    """
+    Insert one chunk of validated rows in a single transaction.
+
+    Duplicates are found with one set-based SELECT; the INSERT itself is
+    batched and uses ON CONFLICT DO NOTHING ... RETURNING so a VIN that slips
+    in concurrently is reported as a duplicate instead of failing the chunk.
+    Each row's result dict is updated in place.
+    """
+    if not chunk:
+        return
+
+    if isinstance(db, shards.ShardSessions):
+        # one transaction per shard, all shards at once
+        parts = {}
+        for item in chunk:
+            parts.setdefault(db.shardSet.indexFor(item[0]["vin"]), []).append(item)
+        db.shardSet.map(lambda index: ingestChunk(db.forShard(index), parts.get(index, [])))
+        return
+
+    beginImmediate(db)
+
+    vins = [values["vin"] for values, _ in chunk]
+    existing = set(
+        db.scalars(select(models.Vehicle.vin).where(models.Vehicle.vin.in_(vins)))
+    )
+
+    toInsert = []
+    for values, result in chunk:
+        if values["vin"] in existing:
+            result["status"] = "duplicate"
+            continue
+        # repeated VIN inside the same upload
+        existing.add(values["vin"])
+        toInsert.append((values, result))
+
+    if not toInsert:
+        # release the write lock taken by beginImmediate
+        db.rollback()
+        return
+
+    stmt = (
+        sqlite_insert(models.Vehicle)
+        .on_conflict_do_nothing(index_elements=["vin"])
+        .returning(models.Vehicle.vin)
+    )
+    inserted = set(db.scalars(stmt, [values for values, _ in toInsert]))
+    db.commit()
+
+    for values, result in toInsert:
+        if values["vin"] not in inserted:
+            result["status"] = "duplicate"
+        else:
+            vehicle_cache.invalidate(values["vin"])
+
+async def iterBodyLines(request: Request):
+    """
+    Yield (line, error) for each line of a streamed body. A line that isn't
+    valid UTF-8 is decoded with replacement characters and comes with its
+    UnicodeDecodeError, so only that row is rejected. Lines are split on the
+    raw bytes: b"\n" never occurs inside a multi-byte UTF-8 sequence.
+    """
+    buffer = b""
+    async for chunk in request.stream():
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            yield decodeBodyLine(line)
+    if buffer:
+        yield decodeBodyLine(buffer)
+
+def decodeBodyLine(line: bytes) -> tuple[str, UnicodeDecodeError | None]:
+    try:
+        return line.decode("utf-8"), None
+    except UnicodeDecodeError as exc:
+        return line.decode("utf-8", errors="replace"), exc
+
+async def iterNdjsonRows(request: Request):
+    async for line, error in iterBodyLines(request):
+        if not line.strip():
+            continue
+        if error is not None:
+            yield error
+            continue
+        try:
+            yield json.loads(line)
+        except ValueError:
+            yield None
+
+async def iterCsvRows(request: Request):
+    header = None
+    record = None
+    recordError = None
+    async for line, error in iterBodyLines(request):
+        # a quoted field may contain newlines: keep reading until quotes balance
+        record = line if record is None else record + "\n" + line
+        recordError = recordError or error
+        if record.count('"') % 2:
+            continue
+
+        text, record = record.rstrip("\r"), None
+        error, recordError = recordError, None
+        if not text.strip():
+            continue
+
+        fields = next(csv.reader([text]))
+        if header is None:
+            header = [name.strip() for name in fields]
+            continue
+
+        if error is not None:
+            yield error
+            continue
+        yield {name: (value if value != "" else None) for name, value in zip(header, fields)}
+
+    if record is not None:
+        # unterminated quote on the last record
+        yield None
+
+async def iterJsonArrayRows(request: Request):
+    try:
+        rows = json.loads(await request.body())
+    except ValueError:
+        rows = None
+
+    if not isinstance(rows, list):
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_CONTENT,
+            detail={"body": ["Expected a JSON array of vehicles"]},
+        )
+
+    for row in rows:
+        yield row
+
 # ROUTES
 
 @app.get("/")
 def root():
     return {"message": "Apollo Coding Excerise"}
 
-@app.get("/vehicle/", response_model=list[VehicleRead])
-def list_vehicles(db: Session = Depends(get_db)):
-    vehicles = db.query(models.Vehicle).all()
-    return vehicles
+@sync_routes.get("/vehicle/", response_model=list[VehicleRead])
+def list_vehicles(
+    request: Request,
+    filters: VehicleFilter = Depends(),
+    sort: str | None = None,
+    limit: int | None = Query(None, ge=1, le=LIST_MAX_LIMIT),
+    cursor: str | None = None,
+    format: str | None = Query(None, pattern="^(json|ndjson)$"),
+    fields: str | None = None,
+    db: Session = Depends(get_db),
+):
+    """
+    Filtered, keyset-paginated list.
+
+    `sort` is a comma-separated list of columns, `-` for descending
+    (e.g. `manuName,-modelYear`); id is always the final tie-breaker.
+    The next page is advertised through a `Link: <...>; rel="next"` header
+    (and `X-Next-Cursor`), so the body stays a plain list. With
+    `?format=ndjson` or `Accept: application/x-ndjson` the rows are streamed
+    instead, unbounded unless `limit` is given.
+
+    Rows are trusted reads: selected as column tuples and encoded straight
+    to JSON (see serialize.py), limited to `?fields=a,b` when given.
+    """
+    keys = parseSort(sort)
+    after = decodeCursor(cursor, keys) if cursor else None
+    names = parseReadFields(fields)
+
+    if wantsNdjson(request, format) and isinstance(db, shards.ShardSessions):
+        stmt = buildListQuery(filters, keys, after, columns=listColumns(keys, names))
+        if limit is not None:
+            stmt = stmt.limit(limit)
+        chunks = iterVehiclesNdjsonSharded(stmt, keys, names, limit)
+        return StreamingResponse(chunks, media_type=NDJSON_MEDIA_TYPE)
+
+    if wantsNdjson(request, format):
+        stmt = buildListQuery(filters, keys, after, columns=serialize.readColumns(names))
+        if limit is not None:
+            stmt = stmt.limit(limit)
+        return StreamingResponse(iterVehiclesNdjson(stmt, names), media_type=NDJSON_MEDIA_TYPE)
+
+    pageSize = limit or LIST_DEFAULT_LIMIT
+    stmt = buildListQuery(filters, keys, after, columns=listColumns(keys, names)).limit(pageSize + 1)
+    if isinstance(db, shards.ShardSessions):
+        rows = fanOutPage(db, stmt, keys, pageSize)
+    else:
+        rows = db.execute(stmt).all()
+
+    return pageResponse(request, keys, rows, pageSize, names)
 
 
-@app.post("/vehicle/", response_model=VehicleRead, status_code=status.HTTP_201_CREATED)
+@sync_routes.post("/vehicle/", response_model=VehicleRead, status_code=status.HTTP_201_CREATED)
 def create_vehicle(vehicle_in: VehicleCreate, db: Session = Depends(get_db)):
-    vinNorm = validateVin(vehicle_in.vin)
+    vinNorm = validateVin(vehicle_in.vin, verifyCheckDigit=VIN_CHECK_DIGIT)
 
-    # no duplicate VIN
-    existing = db.query(models.Vehicle).filter(models.Vehicle.vin == vinNorm).first()
-    if existing:
+    values = vehicle_in.model_dump()
+    values["vin"] = vinNorm
+    crossCheckVin(vinNorm, values)
+
+    row = runWrite(vinSession(db, vinNorm), lambda conn: insertVehicleRow(conn, values))
+    vehicle_cache.invalidate(vinNorm)
+
+    return row
+
+@app.post("/vehicle/bulk", response_model=BulkResult)
+async def bulk_create_vehicles(request: Request, db: Session = Depends(get_db)):
+    """
+    Create many vehicles from a JSON array, NDJSON or CSV (with header) body.
+
+    NDJSON and CSV bodies are read as a stream. Rows are validated one by one
+    and inserted in BULK_CHUNK_SIZE transactions; a bad row is reported and
+    skipped instead of failing the batch.
+    """
+    contentType = request.headers.get("content-type", "").split(";")[0].strip().lower()
+    if contentType in ("", "application/json"):
+        rows = iterJsonArrayRows(request)
+    elif contentType in (NDJSON_MEDIA_TYPE, "application/ndjson", "application/jsonl"):
+        rows = iterNdjsonRows(request)
+    elif contentType in ("text/csv", "application/csv"):
+        rows = iterCsvRows(request)
+    else:
+        raise HTTPException(
+            status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+            detail="Use application/json, application/x-ndjson or text/csv",
+        )
+
+    results = []
+    chunk = []
+    index = 0
+    async for data in rows:
+        values, result = parseBulkRow(index, data)
+        results.append(result)
+        index += 1
+
+        if values is not None:
+            chunk.append((values, result))
+        if len(chunk) >= BULK_CHUNK_SIZE:
+            await run_in_threadpool(ingestChunk, db, screenBulkVins(chunk))
+            chunk = []
+
+    if chunk:
+        await run_in_threadpool(ingestChunk, db, screenBulkVins(chunk))
+
+    counts = {"created": 0, "duplicate": 0, "invalid": 0}
+    for result in results:
+        counts[result["status"]] += 1
+
+    return {**counts, "results": results}
+
+@app.get("/vehicle/export")
+def export_vehicles(
+    format: str = Query("csv", pattern="^(csv|ndjson|arrow|parquet)$"),
+    fields: str | None = None,
+    compression: str | None = Query(None, pattern="^(gzip|zstd)$"),
+):
+    """
+    Stream the whole vehicles table as CSV, NDJSON, Arrow IPC stream or
+    Parquet, optionally projected with `?fields=vin,modelYear` and
+    compressed (Content-Encoding gzip or zstd).
+    """
+    try:
+        columns = export.parseFields(fields)
+        if shard_set is not None:
+            chunks = export.iterExport(shard_set.engines, format, columns, compression, shard_set.executor)
+        else:
+            chunks = export.iterExport(engine, format, columns, compression)
+    except export.ExportUnavailable as exc:
+        raise HTTPException(status_code=status.HTTP_501_NOT_IMPLEMENTED, detail=str(exc))
+    except export.ExportError as exc:
         raise HTTPException(
             status_code=status.HTTP_422_UNPROCESSABLE_CONTENT,
-            detail={"vin": ["VIN already exists"]},
+            detail={"export": [str(exc)]},
         )
 
-    vehicle = models.Vehicle(
-        vin=vinNorm,
-        manuName=vehicle_in.manuName,
-        description=vehicle_in.description,
-        horsePower=vehicle_in.horsePower,
-        modelName=vehicle_in.modelName,
-        modelYear=vehicle_in.modelYear,
-        purchasePrice=vehicle_in.purchasePrice,
-        fuelType=vehicle_in.fuelType,
+    headers = {
+        "Content-Disposition": f'attachment; filename="vehicles.{export.FILE_EXTENSIONS[format]}"',
+    }
+    if compression:
+        headers["Content-Encoding"] = compression
+
+    return StreamingResponse(chunks, media_type=export.MEDIA_TYPES[format], headers=headers)
+
+@app.get("/vehicle/changes", response_model=ChangeFeed)
+async def vehicle_changes(
+    since: int = Query(0, ge=0),
+    limit: int = Query(CHANGES_DEFAULT_LIMIT, ge=1, le=CHANGES_MAX_LIMIT),
+    wait: float = Query(0, ge=0, le=CHANGES_MAX_WAIT),
+):
+    """
+    Changes after the `since` cursor, oldest first; pass back `nextSince`.
+    Each VIN appears once with its latest state (deletes as tombstones).
+    With `wait` > 0 the request long-polls until something changes.
+    A 410 means the cursor fell behind pruned tombstones: resync from 0.
+    Each shard keeps its own seq, so there is no feed in sharded mode (501).
+    """
+    requireSingleDatabase("The change feed")
+    page, hasMore = await waitForChanges(since, limit, wait)
+    nextSince = page[-1]["seq"] if page else since
+    return {"changes": page, "nextSince": nextSince, "hasMore": hasMore}
+
+@app.get("/vehicle/changes/stream")
+async def vehicle_changes_stream(
+    request: Request,
+    since: int = Query(0, ge=0),
+    timeout: float = Query(300, gt=0, le=3600),
+):
+    """
+    Server-sent events version of /vehicle/changes. Each event's id is its
+    seq, so a reconnecting EventSource resumes via Last-Event-ID. The stream
+    closes after `timeout` seconds; clients simply reconnect.
+    """
+    requireSingleDatabase("The change feed")
+    lastEventId = request.headers.get("last-event-id", "")
+    if lastEventId.isdigit():
+        since = int(lastEventId)
+
+    return StreamingResponse(
+        iterChangeEvents(request, since, timeout),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
     )
 
-    db.add(vehicle)
-    db.commit()
-    db.refresh(vehicle)
+@app.get("/vehicle/search", response_model=list[VehicleSearchHit])
+def search_vehicles(
+    request: Request,
+    response: Response,
+    q: str = Query(..., min_length=1),
+    limit: int = Query(SEARCH_DEFAULT_LIMIT, ge=1, le=SEARCH_MAX_LIMIT),
+    offset: int = Query(0, ge=0),
+    db: Session = Depends(get_db),
+):
+    """
+    Full-text search over description, manuName and modelName, best match
+    first (BM25). `snippet` highlights the matched words with <mark>.
 
-    return vehicle
+    Sharded, every shard returns its best offset + limit + 1 hits and they
+    are merged by rank. BM25 weighs terms by each shard's own statistics,
+    so ranks across shards are close to, not exactly, single-file ranks.
+    """
+    match = buildMatchQuery(q)
+    if isinstance(db, shards.ShardSessions):
+        params = {"match": match, "limit": offset + limit + 1, "offset": 0}
+        results = db.map(lambda session: session.execute(SEARCH_SQL, params).all())
+        merged = shards.mergeSorted(results, [("rank", False), ("id", False)])
+        rows = list(itertools.islice(merged, offset, offset + limit + 1))
+    else:
+        rows = db.execute(SEARCH_SQL, {"match": match, "limit": limit + 1, "offset": offset}).all()
 
-@app.get("/vehicle/{vin}", response_model=VehicleRead)
-def get_vehicle(vin: str, db: Session = Depends(get_db)):
-    return get_vehicle_or_404(vin, db)
+    if len(rows) > limit:
+        rows = rows[:limit]
+        nextUrl = request.url.include_query_params(offset=offset + limit, limit=limit)
+        response.headers["Link"] = f'<{nextUrl}>; rel="next"'
 
-@app.put("/vehicle/{vin}", response_model=VehicleRead)
-def update_vehicle(vin: str, vehicle_in: VehicleUpdate, db: Session = Depends(get_db)):
-    vehicle = get_vehicle_or_404(vin, db)
+    return [row._asdict() for row in rows]
 
-    # Body VIN must match URL VIN
-    bodyVin = validateVin(vehicle_in.vin)
-    urlVin = validateVin(vin)
-    if bodyVin != urlVin:
+@app.get("/vehicle/stats", response_model=FleetStats)
+def vehicle_stats(db: Session = Depends(get_db)):
+    """
+    Count and purchasePrice avg/min/max overall, by manufacturer, model year
+    and fuel type, plus a horsePower histogram. Served from summary tables
+    kept current by triggers, so cost doesn't grow with the fleet.
+    Sharded, each shard's summary rows are read in parallel and added up.
+    """
+    if isinstance(db, shards.ShardSessions):
+        return stats.statsResponse(stats.mergeSummaryRows(db.map(stats.readSummaryRows)))
+    return stats.readStats(db)
+
+@app.get("/vehicle/stats/consistency", response_model=StatsConsistency)
+def vehicle_stats_consistency():
+    """
+    Compare the summary tables with a full GROUP BY over vehicles (full scan).
+    """
+    mismatches = [
+        {**mismatch, "shard": index} if shard_set is not None else mismatch
+        for index, bind in enumerate(shardEngines())
+        for mismatch in stats.checkStats(bind)
+    ]
+    return {"consistent": not mismatches, "mismatches": mismatches}
+
+@app.post("/vehicle/stats/recompute", status_code=status.HTTP_204_NO_CONTENT)
+def vehicle_stats_recompute():
+    """
+    Rebuild the summary tables from vehicles (full scan).
+    """
+    for bind in shardEngines():
+        stats.recomputeStats(bind)
+    return None
+
+@app.get("/cache/stats")
+def cache_stats():
+    return vehicle_cache.stats()
+
+@app.get("/metrics", include_in_schema=False)
+def prometheus_metrics():
+    """
+    Prometheus text format: per-route latency, SQL statements and time per
+    request, statement latency by type, pool checkout wait, slow queries and
+    the read-cache counters.
+    """
+    return Response(content=metrics.render(), media_type=metrics.CONTENT_TYPE)
+
+@sync_routes.get(
+    "/vehicle/{vin}",
+    response_model=VehicleRead,
+    responses={status.HTTP_304_NOT_MODIFIED: {"description": "ETag matched If-None-Match"}},
+)
+def get_vehicle(vin: str, request: Request, fields: str | None = None, db: Session = Depends(get_db)):
+    """
+    Served from vehicle_cache when possible; the session is only used on a
+    miss, so a hit (or a 304) never touches the DB. Misses are trusted reads
+    (column tuple -> JSON bytes); `?fields=a,b` projects the response.
+    """
+    vinNorm = validateVin(vin)
+    names = parseReadFields(fields)
+
+    entry = vehicle_cache.get(vinNorm)
+    if entry is None:
+        token = vehicle_cache.token()
+        row = vinSession(db, vinNorm).execute(readVehicleStmt(vinNorm)).first()
+        if row is None:
+            raise vehicleNotFound(vinNorm)
+        entry = serializeVehicle(row)
+        vehicle_cache.set(vinNorm, entry, token)
+
+    return vehicleResponse(request, entry, names)
+
+def checkBodyVin(bodyVin: str | None, urlVin: str) -> None:
+    # Body VIN must match URL VIN (urlVin is already validated)
+    if bodyVin is not None and normalizeVin(bodyVin) != urlVin:
         raise HTTPException(
-            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            status_code=status.HTTP_422_UNPROCESSABLE_CONTENT,
             detail={"vin": ["VIN in body must match VIN in URL"]},
         )
 
+@sync_routes.put("/vehicle/{vin}", response_model=VehicleRead)
+def update_vehicle(vin: str, vehicle_in: VehicleUpdate, db: Session = Depends(get_db)):
+    urlVin = validateVin(vin)
+    checkBodyVin(vehicle_in.vin, urlVin)
+
     # update fields in db
-    vehicle.manuName = vehicle_in.manuName
-    vehicle.description = vehicle_in.description
-    vehicle.horsePower = vehicle_in.horsePower
-    vehicle.modelName = vehicle_in.modelName
-    vehicle.modelYear = vehicle_in.modelYear
-    vehicle.purchasePrice = vehicle_in.purchasePrice
-    vehicle.fuelType = vehicle_in.fuelType
+    values = vehicle_in.model_dump(exclude={"vin"})
+    crossCheckVin(urlVin, values)
+    row = runWrite(vinSession(db, urlVin), lambda conn: updateVehicleRow(conn, urlVin, values))
+    vehicle_cache.invalidate(urlVin)
 
-    db.commit()
-    db.refresh(vehicle)
+    return row
 
-    return vehicle
+@sync_routes.patch("/vehicle/{vin}", response_model=VehicleRead)
+def patch_vehicle(vin: str, vehicle_in: VehiclePatch, db: Session = Depends(get_db)):
+    """
+    Partial update: only the fields present in the body are written.
+    """
+    urlVin = validateVin(vin)
+    checkBodyVin(vehicle_in.vin, urlVin)
+
+    values = vehicle_in.model_dump(exclude_unset=True, exclude={"vin"})
+    crossCheckVin(urlVin, values)
+    if not values:
+        return get_vehicle_or_404(urlVin, vinSession(db, urlVin))
 
-@app.delete("/vehicle/{vin}", status_code = status.HTTP_204_NO_CONTENT)
+    row = runWrite(vinSession(db, urlVin), lambda conn: updateVehicleRow(conn, urlVin, values))
+    vehicle_cache.invalidate(urlVin)
+
+    return row
+
+@sync_routes.delete("/vehicle/{vin}", status_code = status.HTTP_204_NO_CONTENT)
 def delete_vehicle(vin: str, db: Session = Depends(get_db)):
-    vehicle = get_vehicle_or_404(vin, db)
-    
-    db.delete(vehicle)
-    db.commit()
+    vinNorm = validateVin(vin)
+
+    runWrite(vinSession(db, vinNorm), lambda conn: deleteVehicleRow(conn, vinNorm))
+    vehicle_cache.invalidate(vinNorm)
+
+    return None
+
+
+# ASYNC ROUTES
+# Same behaviour as the sync CRUD routes above; the handlers await the
+# database instead of blocking a threadpool worker.
+
+@async_routes.get("/vehicle/", response_model=list[VehicleRead])
+async def list_vehicles_async(
+    request: Request,
+    filters: VehicleFilter = Depends(),
+    sort: str | None = None,
+    limit: int | None = Query(None, ge=1, le=LIST_MAX_LIMIT),
+    cursor: str | None = None,
+    format: str | None = Query(None, pattern="^(json|ndjson)$"),
+    fields: str | None = None,
+    db: AsyncSession = Depends(get_async_db),
+):
+    keys = parseSort(sort)
+    after = decodeCursor(cursor, keys) if cursor else None
+    names = parseReadFields(fields)
+
+    if wantsNdjson(request, format):
+        stmt = buildListQuery(filters, keys, after, columns=serialize.readColumns(names))
+        if limit is not None:
+            stmt = stmt.limit(limit)
+        return StreamingResponse(iterVehiclesNdjsonAsync(stmt, names), media_type=NDJSON_MEDIA_TYPE)
+
+    pageSize = limit or LIST_DEFAULT_LIMIT
+    stmt = buildListQuery(filters, keys, after, columns=listColumns(keys, names)).limit(pageSize + 1)
+    rows = (await db.execute(stmt)).all()
+
+    return pageResponse(request, keys, rows, pageSize, names)
+
+@async_routes.post("/vehicle/", response_model=VehicleRead, status_code=status.HTTP_201_CREATED)
+async def create_vehicle_async(vehicle_in: VehicleCreate, db: AsyncSession = Depends(get_async_db)):
+    vinNorm = validateVin(vehicle_in.vin, verifyCheckDigit=VIN_CHECK_DIGIT)
+
+    values = vehicle_in.model_dump()
+    values["vin"] = vinNorm
+    crossCheckVin(vinNorm, values)
+
+    row = await runWriteAsync(db, lambda conn: insertVehicleRow(conn, values))
+    vehicle_cache.invalidate(vinNorm)
+
+    return row
+
+@async_routes.get(
+    "/vehicle/{vin}",
+    response_model=VehicleRead,
+    responses={status.HTTP_304_NOT_MODIFIED: {"description": "ETag matched If-None-Match"}},
+)
+async def get_vehicle_async(
+    vin: str, request: Request, fields: str | None = None, db: AsyncSession = Depends(get_async_db)
+):
+    vinNorm = validateVin(vin)
+    names = parseReadFields(fields)
+
+    entry = vehicle_cache.get(vinNorm)
+    if entry is None:
+        token = vehicle_cache.token()
+        row = (await db.execute(readVehicleStmt(vinNorm))).first()
+        if row is None:
+            raise vehicleNotFound(vinNorm)
+        entry = serializeVehicle(row)
+        vehicle_cache.set(vinNorm, entry, token)
+
+    return vehicleResponse(request, entry, names)
+
+@async_routes.put("/vehicle/{vin}", response_model=VehicleRead)
+async def update_vehicle_async(vin: str, vehicle_in: VehicleUpdate, db: AsyncSession = Depends(get_async_db)):
+    urlVin = validateVin(vin)
+    checkBodyVin(vehicle_in.vin, urlVin)
+
+    values = vehicle_in.model_dump(exclude={"vin"})
+    crossCheckVin(urlVin, values)
+    row = await runWriteAsync(db, lambda conn: updateVehicleRow(conn, urlVin, values))
+    vehicle_cache.invalidate(urlVin)
+
+    return row
+
+@async_routes.patch("/vehicle/{vin}", response_model=VehicleRead)
+async def patch_vehicle_async(vin: str, vehicle_in: VehiclePatch, db: AsyncSession = Depends(get_async_db)):
+    urlVin = validateVin(vin)
+    checkBodyVin(vehicle_in.vin, urlVin)
+
+    values = vehicle_in.model_dump(exclude_unset=True, exclude={"vin"})
+    crossCheckVin(urlVin, values)
+    if not values:
+        return await get_vehicle_or_404_async(urlVin, db)
+
+    row = await runWriteAsync(db, lambda conn: updateVehicleRow(conn, urlVin, values))
+    vehicle_cache.invalidate(urlVin)
+
+    return row
+
+@async_routes.delete("/vehicle/{vin}", status_code = status.HTTP_204_NO_CONTENT)
+async def delete_vehicle_async(vin: str, db: AsyncSession = Depends(get_async_db)):
+    vinNorm = validateVin(vin)
+
+    await runWriteAsync(db, lambda conn: deleteVehicleRow(conn, vinNorm))
+    vehicle_cache.invalidate(vinNorm)
+
+    return None
+
 
-    return None
\ No newline at end of file
+# mounted last so /vehicle/{vin} doesn't shadow /vehicle/export, /vehicle/search, ...
+app.include_router(async_routes if ASYNC_DB else sync_routes)
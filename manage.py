@@ -0,0 +1,198 @@
+"""
+Maintenance commands for the vehicle database.
+
+    python manage.py upgrade           # bring an existing DB up to the current schema
+    python manage.py rebuild-search    # repopulate the full-text index from vehicles
+    python manage.py check-stats       # compare summary tables with the vehicles table
+    python manage.py recompute-stats   # rebuild summary tables from the vehicles table
+    python manage.py export --format parquet --out vehicles.parquet
+    python manage.py prune-tombstones --days 30
+    python manage.py reshard --shards 4   # split vehicles.db into vehicles.shard0.db ... shard3.db
+
+With VEHICLE_SHARDS > 1 every command except reshard works on the shard
+files, like the app does.
+"""
+import argparse
+import os
+import sys
+
+from sqlalchemy import make_url
+from sqlalchemy.exc import SQLAlchemyError
+
+from database import DATABASE_URL, SHARD_KEY, SHARDS, makeEngine
+import changes
+import export
+import models
+import shards
+import stats
+
+
+def databaseUrls(args) -> list[str]:
+    """
+    The files the app reads: the shard files when VEHICLE_SHARDS > 1
+    (vehicles.db itself is left over from before `reshard`).
+    """
+    return shards.shardUrls(args.database_url, SHARDS) if SHARDS > 1 else [args.database_url]
+
+
+def openEngines(args, create: bool = False) -> list:
+    """
+    One engine per database file. Commands that only read or repair an
+    existing database refuse a missing file instead of creating an empty one.
+    """
+    urls = databaseUrls(args)
+    if not create:
+        missing = [url for url in urls if not os.path.exists(make_url(url).database or "")]
+        if missing:
+            sys.exit(f"{args.command} failed: no database at {', '.join(missing)}")
+    return [makeEngine(url) for url in urls]
+
+
+def forEachDatabase(args, work, create: bool = False):
+    """
+    Run work(engine, url) on every database file; SQLAlchemy errors end the
+    command with a message instead of a traceback.
+    """
+    try:
+        for engine, url in zip(openEngines(args, create), databaseUrls(args)):
+            work(engine, url)
+    except SQLAlchemyError as exc:
+        sys.exit(f"{args.command} failed: {exc}")
+
+
+def cmd_upgrade(args):
+    def upgrade(engine, url):
+        models.upgradeSchema(engine)
+        print(f"Schema up to date: {url}")
+
+    forEachDatabase(args, upgrade, create=True)
+
+
+def cmd_rebuild_search(args):
+    def rebuild(engine, url):
+        models.upgradeSchema(engine)
+        models.rebuildSearchIndex(engine)
+        print(f"Search index rebuilt: {url}")
+
+    forEachDatabase(args, rebuild)
+
+
+def cmd_check_stats(args):
+    mismatches = []
+
+    def check(engine, url):
+        for mismatch in stats.checkStats(engine):
+            if SHARDS > 1:
+                mismatch["shard"] = url
+            print(mismatch)
+            mismatches.append(mismatch)
+
+    forEachDatabase(args, check)
+    print("Summary tables consistent" if not mismatches else f"{len(mismatches)} mismatching groups")
+    sys.exit(1 if mismatches else 0)
+
+
+def cmd_recompute_stats(args):
+    def recompute(engine, url):
+        models.upgradeSchema(engine)
+        stats.recomputeStats(engine)
+        print(f"Summary tables rebuilt: {url}")
+
+    forEachDatabase(args, recompute)
+
+
+def cmd_export(args):
+    engines = openEngines(args)
+    # shards are merged by id on ShardSet's thread pool, like GET /vehicle/export
+    shardSet = shards.ShardSet(engines, SHARD_KEY) if SHARDS > 1 else None
+    try:
+        columns = export.parseFields(args.fields)
+        if shardSet is not None:
+            written = export.exportToFile(engines, args.out, args.format, columns, args.compression, shardSet.executor)
+        else:
+            written = export.exportToFile(engines[0], args.out, args.format, columns, args.compression)
+    except (export.ExportError, SQLAlchemyError) as exc:
+        sys.exit(f"export failed: {exc}")
+    finally:
+        if shardSet is not None:
+            shardSet.close()
+    print(f"Wrote {written:,} bytes to {args.out}")
+
+
+def cmd_prune_tombstones(args):
+    def prune(engine, url):
+        pruned = changes.pruneTombstones(engine, args.days * 86400)
+        print(f"Pruned {pruned:,} tombstones older than {args.days} days: {url}")
+
+    forEachDatabase(args, prune)
+
+
+def _removeSqliteFiles(paths):
+    for path in paths:
+        for suffix in ("", "-wal", "-shm", "-journal"):
+            if os.path.exists(path + suffix):
+                os.remove(path + suffix)
+
+
+def cmd_reshard(args):
+    sourceUrls = shards.shardUrls(args.database_url, args.from_shards) if args.from_shards > 1 else [args.database_url]
+    targetUrls = shards.shardUrls(args.to or args.database_url, args.shards)
+    if set(sourceUrls) & set(targetUrls):
+        sys.exit("source and target files overlap; reshard --to a different base URL")
+
+    missing = [url for url in sourceUrls if not os.path.exists(make_url(url).database or "")]
+    if missing:
+        sys.exit(f"reshard failed: no database at {', '.join(missing)}")
+
+    # shard files this run creates are removed again if it fails
+    created = [make_url(url).database for url in targetUrls if not os.path.exists(make_url(url).database)]
+
+    sources = [makeEngine(url) for url in sourceUrls]
+    targets = [makeEngine(url) for url in targetUrls]
+    try:
+        counts = shards.reshard(sources, targets, args.key)
+    except (ValueError, SQLAlchemyError) as exc:
+        for engine in sources + targets:
+            engine.dispose()
+        _removeSqliteFiles(created)
+        sys.exit(f"reshard failed: {exc}")
+
+    for url, count in zip(targetUrls, counts):
+        print(f"{count:>10,}  {url}")
+    print(f"Copied {sum(counts):,} vehicles into {len(targetUrls)} shards; start the app with VEHICLE_SHARDS={args.shards}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", default=DATABASE_URL)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    commands.add_parser("upgrade", help="create/alter tables and indexes").set_defaults(func=cmd_upgrade)
+    commands.add_parser("rebuild-search", help="rebuild the vehicles_fts index").set_defaults(func=cmd_rebuild_search)
+    commands.add_parser("check-stats", help="verify the stats summary tables").set_defaults(func=cmd_check_stats)
+    commands.add_parser("recompute-stats", help="rebuild the stats summary tables").set_defaults(func=cmd_recompute_stats)
+
+    exportParser = commands.add_parser("export", help="write the vehicles table to a file")
+    exportParser.add_argument("--format", choices=export.EXPORT_FORMATS, default="csv")
+    exportParser.add_argument("--fields", help="comma-separated columns (default: all)")
+    exportParser.add_argument("--compression", choices=export.EXPORT_COMPRESSIONS)
+    exportParser.add_argument("--out", required=True)
+    exportParser.set_defaults(func=cmd_export)
+
+    pruneParser = commands.add_parser("prune-tombstones", help="drop old delete markers from the change feed")
+    pruneParser.add_argument("--days", type=float, default=30)
+    pruneParser.set_defaults(func=cmd_prune_tombstones)
+
+    reshardParser = commands.add_parser("reshard", help="copy vehicles into N VIN-hashed shard files")
+    reshardParser.add_argument("--shards", type=int, required=True)
+    reshardParser.add_argument("--from-shards", type=int, default=1, help="the source is already split into this many shards")
+    reshardParser.add_argument("--to", help="base URL of the new shards (default: --database-url)")
+    reshardParser.add_argument("--key", choices=shards.SHARD_KEYS, default=SHARD_KEY)
+    reshardParser.set_defaults(func=cmd_reshard)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
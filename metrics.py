@@ -0,0 +1,228 @@
+"""
+In-process metrics in the Prometheus text exposition format.
+
+TimingMiddleware times every request and opens a RequestStats for it in a
+ContextVar; the SQLAlchemy cursor hooks in database.py add each statement's
+count and time to it (the context follows the request into the threadpool
+and into AsyncSession.run_sync). Collectors registered with addCollector()
+contribute extra samples at scrape time, e.g. the read-cache counters.
+"""
+import logging
+import threading
+import time
+from contextvars import ContextVar
+
+# seconds
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# statements per request
+STATEMENT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+slow_query_log = logging.getLogger("vehicles.slow_query")
+
+
+def _labelText(labelNames: tuple[str, ...], values: tuple, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(labelNames, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+class Counter:
+    def __init__(self, name: str, help: str, labelNames: tuple[str, ...] = ()):
+        self.name = name
+        self.help = help
+        self.labelNames = labelNames
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labels, amount: float = 1) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def clear(self) -> None:
+        with self._lock:
+            self._values.clear()
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for labels, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_labelText(self.labelNames, labels)} {value}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name: str, help: str, labelNames: tuple[str, ...] = (), buckets: tuple = LATENCY_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labelNames = labelNames
+        self.buckets = buckets
+        # labels -> [per-bucket counts..., +Inf count, sum]
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *labels) -> None:
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [0] * (len(self.buckets) + 2)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+                    break
+            else:
+                series[len(self.buckets)] += 1
+            series[-1] += value
+
+    def clear(self) -> None:
+        with self._lock:
+            self._series.clear()
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for labels, series in sorted(self._series.items()):
+                cumulative = 0
+                for bound, count in zip((*self.buckets, "+Inf"), series):
+                    cumulative += count
+                    le = f'le="{bound}"'
+                    lines.append(f"{self.name}_bucket{_labelText(self.labelNames, labels, le)} {cumulative}")
+                lines.append(f"{self.name}_sum{_labelText(self.labelNames, labels)} {series[-1]}")
+                lines.append(f"{self.name}_count{_labelText(self.labelNames, labels)} {cumulative}")
+        return lines
+
+
+request_duration = Histogram(
+    "http_request_duration_seconds", "Request latency by route", ("method", "route", "status"),
+)
+request_statements = Histogram(
+    "http_request_db_statements", "SQL statements issued per request", ("method", "route"), STATEMENT_BUCKETS,
+)
+request_db_seconds = Histogram(
+    "http_request_db_seconds", "Time spent executing SQL per request", ("method", "route"),
+)
+statement_duration = Histogram(
+    "db_statement_duration_seconds", "SQL statement execution time by statement type", ("operation",),
+)
+pool_wait = Histogram(
+    "db_pool_checkout_wait_seconds", "Time spent waiting for a pooled connection",
+)
+slow_queries = Counter(
+    "db_slow_queries_total", "Statements slower than the slow-query threshold", ("operation",),
+)
+
+METRICS = [request_duration, request_statements, request_db_seconds, statement_duration, pool_wait, slow_queries]
+
+# callables returning extra exposition lines at scrape time
+_collectors = []
+
+
+def addCollector(collector) -> None:
+    _collectors.append(collector)
+
+
+def render() -> str:
+    lines = []
+    for metric in METRICS:
+        lines.extend(metric.render())
+    for collector in _collectors:
+        lines.extend(collector())
+    return "\n".join(lines) + "\n"
+
+
+def reset() -> None:
+    """
+    Drop every recorded sample (tests).
+    """
+    for metric in METRICS:
+        metric.clear()
+
+
+# PER-REQUEST STATEMENT STATS
+
+class RequestStats:
+    __slots__ = ("statements", "dbSeconds")
+
+    def __init__(self):
+        self.statements = 0
+        self.dbSeconds = 0.0
+
+
+current_request: ContextVar[RequestStats | None] = ContextVar("current_request", default=None)
+
+
+def statementOperation(statement: str) -> str:
+    # "SELECT", "INSERT", ... ; BEGIN / SAVEPOINT / PRAGMA land in their own buckets too
+    return statement.lstrip().split(None, 1)[0].upper() if statement.strip() else "OTHER"
+
+
+def recordStatement(statement: str, seconds: float, slowSeconds: float) -> None:
+    """
+    Called by the after_cursor_execute hook for every statement.
+    """
+    operation = statementOperation(statement)
+    statement_duration.observe(seconds, operation)
+
+    stats = current_request.get()
+    if stats is not None:
+        stats.statements += 1
+        stats.dbSeconds += seconds
+
+    if seconds >= slowSeconds:
+        slow_queries.inc(operation)
+        slow_query_log.warning("slow query (%.1f ms): %s", seconds * 1000, " ".join(statement.split()))
+
+
+# MIDDLEWARE
+
+class TimingMiddleware:
+    """
+    Pure ASGI middleware (no BaseHTTPMiddleware buffering): records request
+    latency and per-request SQL stats by route template, and with
+    serverTiming=True adds a Server-Timing header (db time, statement count
+    and handler time) to every response.
+    """
+
+    def __init__(self, app, serverTiming: bool = False):
+        self.app = app
+        self.serverTiming = serverTiming
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats()
+        token = current_request.set(stats)
+        start = time.perf_counter()
+        statusCode = 500
+
+        async def sendWithTiming(message):
+            nonlocal statusCode
+            if message["type"] == "http.response.start":
+                statusCode = message["status"]
+                if self.serverTiming:
+                    handler = (time.perf_counter() - start) * 1000
+                    value = (
+                        f'db;dur={stats.dbSeconds * 1000:.2f};desc="{stats.statements} statements", '
+                        f"app;dur={handler:.2f}"
+                    )
+                    message = {**message, "headers": [*message.get("headers", []), (b"server-timing", value.encode())]}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, sendWithTiming)
+        finally:
+            current_request.reset(token)
+            # the route template, not the raw path, keeps label cardinality bounded
+            route = getattr(scope.get("route"), "path", "unmatched")
+            method = scope["method"]
+            request_duration.observe(time.perf_counter() - start, method, route, statusCode)
+            request_statements.observe(stats.statements, method, route)
+            request_db_seconds.observe(stats.dbSeconds, method, route)
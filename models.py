@@ -1,18 +1,325 @@
-from sqlalchemy import Column, Integer, String, Float
+from sqlalchemy import DDL, Column, Index, Integer, String, Float, Table, event, inspect, text
+from sqlalchemy.schema import CreateTable
 from database import Base
 
 class Vehicle(Base):
     __tablename__ = "vehicles"
+    # Indexes follow the GET /vehicle/ filters and sorts rather than one per
+    # column: equality filters lead, range/sort columns follow.
+    # Benchmarked in benchmarks/bench_indexes.py.
+    __table_args__ = (
+        Index("ix_vehicles_manu_model_year", "manuName", "modelName", "modelYear"),
+        Index("ix_vehicles_manu_year", "manuName", "modelYear"),
+        Index("ix_vehicles_fuel_price", "fuelType", "purchasePrice"),
+        Index("ix_vehicles_year_hp", "modelYear", "horsePower"),
+        Index("ix_vehicles_purchasePrice", "purchasePrice"),
+        # (group key, purchasePrice) lets the stats triggers re-read a
+        # group's min/max with one index seek; fuel_price covers fuelType
+        Index("ix_vehicles_manu_price", "manuName", "purchasePrice"),
+        Index("ix_vehicles_year_price", "modelYear", "purchasePrice"),
+        # never reuse ids of deleted rows, so (id, version) identifies one row state
+        {"sqlite_autoincrement": True},
+    )
 
-    id = Column(Integer, primary_key=True, index=True)
+    id = Column(Integer, primary_key=True)
     
     # uniquely identified VIN
     vin = Column(String(32), unique=True, index=True, nullable=False)
 
-    manuName = Column(String, index = True)
-    description = Column(String, index = True)
-    horsePower = Column(Integer, index = True)
-    modelName = Column(String, index = True)
-    modelYear = Column(Integer, index = True)
-    purchasePrice = Column(Float, index = True)
-    fuelType = Column(String, index = True)
\ No newline at end of file
+    manuName = Column(String)
+    description = Column(String)
+    horsePower = Column(Integer)
+    modelName = Column(String)
+    modelYear = Column(Integer)
+    purchasePrice = Column(Float)
+    fuelType = Column(String)
+
+    # bumped on every update; used for ETags
+    version = Column(Integer, nullable=False, default=1, server_default="1")
+
+
+# single-column indexes from the original schema that the composite
+# indexes above replace (the primary key already indexes id)
+LEGACY_INDEXES = (
+    "ix_vehicles_id",
+    "ix_vehicles_manuName",
+    "ix_vehicles_description",
+    "ix_vehicles_horsePower",
+    "ix_vehicles_modelName",
+    "ix_vehicles_modelYear",
+    "ix_vehicles_fuelType",
+)
+
+
+# Full-text index over description/manuName/modelName for GET /vehicle/search.
+# External-content FTS5 table (the text lives only in vehicles), kept in sync
+# by triggers so every write path - ORM, Core, bulk - updates it in the same
+# transaction.
+SEARCH_INDEX_DDL = (
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS vehicles_fts USING fts5(
+        description, manuName, modelName,
+        content='vehicles', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2',
+        prefix='2 3'
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS vehicles_fts_ai AFTER INSERT ON vehicles BEGIN
+        INSERT INTO vehicles_fts (rowid, description, manuName, modelName)
+        VALUES (new.id, new.description, new.manuName, new.modelName);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS vehicles_fts_ad AFTER DELETE ON vehicles BEGIN
+        INSERT INTO vehicles_fts (vehicles_fts, rowid, description, manuName, modelName)
+        VALUES ('delete', old.id, old.description, old.manuName, old.modelName);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS vehicles_fts_au
+    AFTER UPDATE OF description, manuName, modelName ON vehicles BEGIN
+        INSERT INTO vehicles_fts (vehicles_fts, rowid, description, manuName, modelName)
+        VALUES ('delete', old.id, old.description, old.manuName, old.modelName);
+        INSERT INTO vehicles_fts (rowid, description, manuName, modelName)
+        VALUES (new.id, new.description, new.manuName, new.modelName);
+    END
+    """,
+)
+
+for statement in SEARCH_INDEX_DDL:
+    event.listen(Vehicle.__table__, "after_create", DDL(statement))
+event.listen(Vehicle.__table__, "before_drop", DDL("DROP TABLE IF EXISTS vehicles_fts"))
+
+
+# Fleet statistics for GET /vehicle/stats, kept in one summary table per
+# dimension so reads never scan vehicles. Triggers update them in the same
+# transaction as the write; stats.recomputeStats() rebuilds them from scratch.
+HP_BUCKET_WIDTH = 50
+
+# (table suffix, group key as SQL over a vehicles row alias, key type, tracks purchasePrice)
+STATS_DIMENSIONS = (
+    ("total", "'all'", String, True),
+    ("manufacturer", "{row}.manuName", String, True),
+    ("model_year", "{row}.modelYear", Integer, True),
+    ("fuel_type", "{row}.fuelType", String, True),
+    ("horse_power", f"({{row}}.horsePower / {HP_BUCKET_WIDTH}) * {HP_BUCKET_WIDTH}", Integer, False),
+)
+
+def _statsTable(suffix: str, keyType, withPrice: bool) -> Table:
+    columns = [
+        Column("groupKey", keyType, primary_key=True),
+        Column("vehicleCount", Integer, nullable=False),
+    ]
+    if withPrice:
+        columns += [
+            Column("priceCount", Integer, nullable=False),
+            Column("priceSum", Float, nullable=False),
+            Column("priceMin", Float),
+            Column("priceMax", Float),
+        ]
+    return Table(f"vehicle_stats_{suffix}", Base.metadata, *columns)
+
+STATS_TABLES = {
+    suffix: _statsTable(suffix, keyType, withPrice)
+    for suffix, _, keyType, withPrice in STATS_DIMENSIONS
+}
+
+def _statsAddSql(table: str, key: str, withPrice: bool) -> str:
+    newKey = key.format(row="new")
+    if not withPrice:
+        return f"""
+        INSERT INTO {table} (groupKey, vehicleCount)
+        SELECT {newKey}, 1 WHERE {newKey} IS NOT NULL
+        ON CONFLICT (groupKey) DO UPDATE SET vehicleCount = vehicleCount + 1;"""
+
+    return f"""
+        INSERT INTO {table} (groupKey, vehicleCount, priceCount, priceSum, priceMin, priceMax)
+        SELECT {newKey}, 1, new.purchasePrice IS NOT NULL, IFNULL(new.purchasePrice, 0),
+               new.purchasePrice, new.purchasePrice
+        WHERE {newKey} IS NOT NULL
+        ON CONFLICT (groupKey) DO UPDATE SET
+            vehicleCount = vehicleCount + 1,
+            priceCount = priceCount + excluded.priceCount,
+            priceSum = priceSum + excluded.priceSum,
+            priceMin = CASE WHEN priceMin IS NULL OR excluded.priceMin < priceMin
+                            THEN IFNULL(excluded.priceMin, priceMin) ELSE priceMin END,
+            priceMax = CASE WHEN priceMax IS NULL OR excluded.priceMax > priceMax
+                            THEN IFNULL(excluded.priceMax, priceMax) ELSE priceMax END;"""
+
+def _statsRemoveSql(table: str, key: str, withPrice: bool) -> str:
+    oldKey = key.format(row="old")
+    priceSql = ""
+    if withPrice:
+        # min/max can't be "subtracted": re-read the group only when the
+        # removed row held the extreme value (an index seek, see Vehicle)
+        groupRows = f"FROM vehicles AS v WHERE {key.format(row='v')} = {oldKey}"
+        priceSql = f""",
+            priceCount = priceCount - (old.purchasePrice IS NOT NULL),
+            priceSum = priceSum - IFNULL(old.purchasePrice, 0),
+            priceMin = CASE WHEN old.purchasePrice <= priceMin
+                            THEN (SELECT MIN(v.purchasePrice) {groupRows}) ELSE priceMin END,
+            priceMax = CASE WHEN old.purchasePrice >= priceMax
+                            THEN (SELECT MAX(v.purchasePrice) {groupRows}) ELSE priceMax END"""
+
+    return f"""
+        UPDATE {table} SET vehicleCount = vehicleCount - 1{priceSql}
+        WHERE groupKey = {oldKey};
+        DELETE FROM {table} WHERE groupKey = {oldKey} AND vehicleCount <= 0;"""
+
+def _statsTriggerDdl() -> tuple[str, ...]:
+    add = "".join(
+        _statsAddSql(STATS_TABLES[suffix].name, key, withPrice)
+        for suffix, key, _, withPrice in STATS_DIMENSIONS
+    )
+    remove = "".join(
+        _statsRemoveSql(STATS_TABLES[suffix].name, key, withPrice)
+        for suffix, key, _, withPrice in STATS_DIMENSIONS
+    )
+    return (
+        f"CREATE TRIGGER IF NOT EXISTS vehicles_stats_ai AFTER INSERT ON vehicles BEGIN{add}\nEND",
+        f"CREATE TRIGGER IF NOT EXISTS vehicles_stats_ad AFTER DELETE ON vehicles BEGIN{remove}\nEND",
+        "CREATE TRIGGER IF NOT EXISTS vehicles_stats_au "
+        "AFTER UPDATE OF manuName, modelYear, fuelType, horsePower, purchasePrice ON vehicles "
+        f"BEGIN{remove}{add}\nEND",
+    )
+
+STATS_TRIGGER_DDL = _statsTriggerDdl()
+
+for statement in STATS_TRIGGER_DDL:
+    event.listen(Vehicle.__table__, "after_create", DDL(statement))
+
+
+class VehicleChange(Base):
+    """
+    Compacted change log for GET /vehicle/changes: one row per VIN holding
+    its latest change. Every write moves the VIN to a new, higher seq, so a
+    consumer that has applied everything up to seq N only needs rows > N.
+    Deletes leave an op='delete' tombstone.
+    """
+    __tablename__ = "vehicle_changes"
+    __table_args__ = {"sqlite_autoincrement": True}
+
+    seq = Column(Integer, primary_key=True)
+    vin = Column(String(32), unique=True, nullable=False)
+    op = Column(String(8), nullable=False)
+    # unix epoch seconds
+    changedAt = Column(Float, nullable=False)
+
+
+class VehicleChangeHorizon(Base):
+    """
+    Single row: highest seq of any pruned tombstone. A consumer whose cursor
+    is below it may have missed a delete and must resync from scratch.
+    """
+    __tablename__ = "vehicle_changes_horizon"
+
+    id = Column(Integer, primary_key=True)
+    prunedThrough = Column(Integer, nullable=False, default=0)
+
+
+EPOCH_NOW_SQL = "(julianday('now') - 2440587.5) * 86400.0"
+
+def _changeLogSql(vin: str, op: str, when: str = "1") -> str:
+    return f"""
+        DELETE FROM vehicle_changes WHERE vin = {vin} AND {when};
+        INSERT INTO vehicle_changes (vin, op, changedAt)
+        SELECT {vin}, '{op}', {EPOCH_NOW_SQL} WHERE {when};"""
+
+CHANGE_TRIGGER_DDL = (
+    "CREATE TRIGGER IF NOT EXISTS vehicles_changes_ai AFTER INSERT ON vehicles BEGIN"
+    f"{_changeLogSql('new.vin', 'upsert')}\nEND",
+    # a VIN is never rewritten through the API, but tombstone the old one if it is
+    "CREATE TRIGGER IF NOT EXISTS vehicles_changes_au AFTER UPDATE ON vehicles BEGIN"
+    f"{_changeLogSql('old.vin', 'delete', 'old.vin != new.vin')}"
+    f"{_changeLogSql('new.vin', 'upsert')}\nEND",
+    "CREATE TRIGGER IF NOT EXISTS vehicles_changes_ad AFTER DELETE ON vehicles BEGIN"
+    f"{_changeLogSql('old.vin', 'delete')}\nEND",
+)
+
+for statement in CHANGE_TRIGGER_DDL:
+    event.listen(Vehicle.__table__, "after_create", DDL(statement))
+
+
+def rebuildSearchIndex(bind):
+    """
+    Re-read every row of vehicles into vehicles_fts (for databases that
+    predate the search index, or after bulk edits made with triggers off).
+    """
+    with bind.begin() as conn:
+        for statement in SEARCH_INDEX_DDL:
+            conn.execute(text(statement))
+        conn.execute(text("INSERT INTO vehicles_fts (vehicles_fts) VALUES ('rebuild')"))
+
+
+def _rebuildWithAutoincrement(conn):
+    """
+    Copy a vehicles table created before sqlite_autoincrement into one
+    declared AUTOINCREMENT, keeping ids. Without it SQLite hands a deleted
+    row's id to the next insert, which then gets the same "{id}-{version}"
+    ETag as the deleted row. Inserting the copied ids seeds sqlite_sequence
+    with max(id).
+    """
+    ddl = str(CreateTable(Vehicle.__table__).compile(dialect=conn.dialect))
+    conn.execute(text(ddl.replace("CREATE TABLE vehicles ", "CREATE TABLE vehicles_rebuild ", 1)))
+
+    names = ", ".join(f'"{column.name}"' for column in Vehicle.__table__.columns)
+    conn.execute(text(f"INSERT INTO vehicles_rebuild ({names}) SELECT {names} FROM vehicles ORDER BY id"))
+    # also drops the old table's indexes and triggers; upgradeSchema recreates them
+    conn.execute(text("DROP TABLE vehicles"))
+    conn.execute(text("ALTER TABLE vehicles_rebuild RENAME TO vehicles"))
+
+
+def upgradeSchema(bind):
+    """
+    Bring an existing database file (e.g. vehicles.db) up to the current
+    schema: create missing tables and indexes, add columns introduced later,
+    rebuild a vehicles table without AUTOINCREMENT, drop the legacy
+    single-column indexes and build the search index, summary tables and
+    change log.
+    """
+    inspector = inspect(bind)
+    hadSearchIndex = inspector.has_table("vehicles_fts")
+    hadStats = all(inspector.has_table(table.name) for table in STATS_TABLES.values())
+    hadChanges = inspector.has_table(VehicleChange.__tablename__)
+    rebuilt = False
+    if inspector.has_table("vehicles"):
+        columns = {column["name"] for column in inspector.get_columns("vehicles")}
+
+        with bind.begin() as conn:
+            if "version" not in columns:
+                conn.execute(text("ALTER TABLE vehicles ADD COLUMN version INTEGER NOT NULL DEFAULT 1"))
+
+            tableSql = conn.execute(text("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = 'vehicles'")).scalar()
+            rebuilt = "AUTOINCREMENT" not in tableSql.upper()
+            if rebuilt:
+                _rebuildWithAutoincrement(conn)
+
+            for name in LEGACY_INDEXES:
+                conn.execute(text(f'DROP INDEX IF EXISTS "{name}"'))
+
+    Base.metadata.create_all(bind=bind)
+
+    # create_all skips tables that already exist, including their indexes
+    for index in Vehicle.__table__.indexes:
+        index.create(bind=bind, checkfirst=True)
+
+    with bind.begin() as conn:
+        # a rebuilt table lost its search triggers along with the old one
+        searchDdl = SEARCH_INDEX_DDL if hadSearchIndex and rebuilt else ()
+        for statement in searchDdl + STATS_TRIGGER_DDL + CHANGE_TRIGGER_DDL:
+            conn.execute(text(statement))
+
+        if not hadChanges:
+            # existing rows become the initial state of the change feed
+            conn.execute(text(
+                "INSERT INTO vehicle_changes (vin, op, changedAt) "
+                f"SELECT vin, 'upsert', {EPOCH_NOW_SQL} FROM vehicles ORDER BY id"
+            ))
+
+    if not hadSearchIndex:
+        rebuildSearchIndex(bind)
+    if not hadStats:
+        # imported here: stats imports this module
+        from stats import recomputeStats
+        recomputeStats(bind)
@@ -1,4 +1,6 @@
-from pydantic import BaseModel, Field, constr, conint, confloat
+from typing import Literal
+
+from pydantic import BaseModel, Field, constr, conint, confloat, model_validator
 
 class VehicleBase(BaseModel):
     vin: constr(strip_whitespace=True, min_length=1, max_length=32)
@@ -17,8 +19,107 @@ class VehicleCreate(VehicleBase):
 class VehicleUpdate(VehicleBase):
     pass
 
+class VehiclePatch(BaseModel):
+    """
+    Partial update: every field is optional, but only description may be null.
+    """
+    vin: constr(strip_whitespace=True, min_length=1, max_length=32) | None = None
+
+    manuName: constr(strip_whitespace=True, min_length=1) | None = None
+    description: str | None = None
+    horsePower: conint(ge=0) | None = None
+    modelName: constr(strip_whitespace=True, min_length=1) | None = None
+    modelYear: conint(ge=1886, le=2100) | None = None
+    purchasePrice: confloat(ge=0) | None = None
+    fuelType: constr(strip_whitespace=True, min_length=1) | None = None
+
+    @model_validator(mode="after")
+    def rejectNullRequiredFields(self):
+        for name in self.model_fields_set:
+            if name != "description" and getattr(self, name) is None:
+                raise ValueError(f"{name} cannot be null")
+        return self
+
 class VehicleRead(VehicleBase):
     id: int
 
     class Config:
-        from_attribute = True
+        from_attributes = True
+
+
+class VehicleSearchHit(VehicleRead):
+    rank: float
+    snippet: str
+
+
+class VehicleFilter(BaseModel):
+    """
+    Query-string filters for GET /vehicle/; min/max bounds are inclusive.
+    """
+    manuName: str | None = None
+    modelName: str | None = None
+    fuelType: str | None = None
+    minModelYear: int | None = None
+    maxModelYear: int | None = None
+    minHorsePower: int | None = None
+    maxHorsePower: int | None = None
+    minPurchasePrice: float | None = None
+    maxPurchasePrice: float | None = None
+
+
+class BulkRowResult(BaseModel):
+    index: int
+    vin: str | None = None
+    status: Literal["created", "duplicate", "invalid"]
+    errors: list[str] | None = None
+
+class BulkResult(BaseModel):
+    created: int
+    duplicate: int
+    invalid: int
+    results: list[BulkRowResult]
+
+
+class PriceStats(BaseModel):
+    count: int
+    avgPurchasePrice: float | None = None
+    minPurchasePrice: float | None = None
+    maxPurchasePrice: float | None = None
+
+class ManufacturerStats(PriceStats):
+    manuName: str
+
+class ModelYearStats(PriceStats):
+    modelYear: int
+
+class FuelTypeStats(PriceStats):
+    fuelType: str
+
+class HorsePowerBucket(BaseModel):
+    minHorsePower: int
+    maxHorsePower: int
+    count: int
+
+class FleetStats(BaseModel):
+    total: PriceStats
+    byManufacturer: list[ManufacturerStats]
+    byModelYear: list[ModelYearStats]
+    byFuelType: list[FuelTypeStats]
+    horsePowerHistogram: list[HorsePowerBucket]
+
+class StatsConsistency(BaseModel):
+    consistent: bool
+    mismatches: list[dict]
+
+
+class VehicleChangeOut(BaseModel):
+    seq: int
+    op: Literal["upsert", "delete"]
+    vin: str
+    changedAt: float
+    vehicle: VehicleRead | None = None
+
+class ChangeFeed(BaseModel):
+    changes: list[VehicleChangeOut]
+    nextSince: int
+    hasMore: bool
@@ -0,0 +1,82 @@
+"""
+Trusted-read serialization for GET /vehicle/ and GET /vehicle/{vin}.
+
+Rows read back from our own table were validated by VehicleCreate /
+VehicleUpdate on the way in, so the read routes select plain column tuples
+and encode them straight to JSON bytes instead of building ORM objects and
+checking each one against VehicleRead. The field list is taken from
+VehicleRead, so the output has the same shape. orjson is used when
+installed (optional); otherwise the stdlib json module.
+"""
+import json
+
+import models
+from schemas import VehicleRead
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# every field a read may return, in VehicleRead order
+READ_FIELDS = tuple(VehicleRead.model_fields)
+
+
+class FieldsError(ValueError):
+    """
+    ?fields= names a field VehicleRead doesn't have.
+    """
+
+
+def parseFields(fields: str | None) -> tuple[str, ...]:
+    """
+    "vin, modelYear" -> ("vin", "modelYear"); None/empty -> READ_FIELDS.
+    """
+    if not fields:
+        return READ_FIELDS
+
+    names = [name.strip() for name in fields.split(",") if name.strip()]
+    unknown = [name for name in names if name not in READ_FIELDS]
+    if unknown or not names:
+        raise FieldsError(f"Unknown fields: {', '.join(unknown) or fields!r}")
+
+    return tuple(dict.fromkeys(names))
+
+
+def readColumns(names, *extra: str) -> list:
+    """
+    Table columns for names, followed by any of extra (e.g. the sort keys a
+    cursor needs) not already among them. Encoders only emit the first
+    len(names) values of each row.
+    """
+    table = models.Vehicle.__table__
+    return [table.c[name] for name in dict.fromkeys((*names, *extra))]
+
+
+if orjson is not None:
+    def dumps(obj) -> bytes:
+        return orjson.dumps(obj)
+
+    def dumpLines(objs) -> bytes:
+        return b"".join(orjson.dumps(obj, option=orjson.OPT_APPEND_NEWLINE) for obj in objs)
+else:
+    def dumps(obj) -> bytes:
+        return json.dumps(obj, separators=(",", ":")).encode()
+
+    def dumpLines(objs) -> bytes:
+        return "".join(json.dumps(obj, separators=(",", ":")) + "\n" for obj in objs).encode()
+
+
+def encodeRow(row, names) -> bytes:
+    return dumps(dict(zip(names, row)))
+
+
+def encodeRows(rows, names) -> bytes:
+    """
+    JSON array of objects, one per row tuple.
+    """
+    return dumps([dict(zip(names, row)) for row in rows])
+
+
+def encodeNdjson(rows, names) -> bytes:
+    return dumpLines(dict(zip(names, row)) for row in rows)
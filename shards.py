@@ -0,0 +1,244 @@
+"""
+Optional VIN-hash sharding of the vehicles table across several SQLite files.
+
+With VEHICLE_SHARDS=N (see database.py) every vehicle lives in exactly one of
+N database files, picked by a CRC32 of its normalized VIN (or of its WMI,
+the first three characters, with VEHICLE_SHARD_KEY=wmi). Each file has its
+own write lock, so writes to different shards don't queue behind each other.
+
+Single-VIN reads and writes go to one shard. List, export, search and stats
+run on every shard in a thread pool and merge the already-sorted results
+(heapq.merge), so they return the same order as one file would.
+
+Every shard's AUTOINCREMENT sequence starts at shard << ID_SHARD_BITS, so ids
+(and the id-version ETags built from them) stay unique across shards.
+"""
+import contextvars
+import heapq
+import os
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from operator import attrgetter
+
+from sqlalchemy import make_url, text
+from sqlalchemy.orm import sessionmaker
+
+SHARD_KEYS = ("vin", "wmi")
+
+# ids in shard k start above k << ID_SHARD_BITS (about 10^12 per shard)
+ID_SHARD_BITS = 40
+
+# AUTOINCREMENT tables whose ids must not collide between shards
+SEQUENCE_TABLES = ("vehicles",)
+
+
+def shardIndex(vinNorm: str, count: int, key: str = "vin") -> int:
+    """
+    The shard a normalized VIN belongs to. crc32, unlike hash(), is the same
+    in every process.
+    """
+    routingKey = vinNorm[:3] if key == "wmi" else vinNorm
+    return zlib.crc32(routingKey.encode()) % count
+
+
+def shardUrls(url: str, count: int) -> list[str]:
+    """
+    sqlite:///./vehicles.db -> sqlite:///./vehicles.shard0.db, ...shard1.db, ...
+    """
+    parsed = make_url(url)
+    if not parsed.database or parsed.database == ":memory:":
+        raise ValueError("sharding needs a file-backed SQLite URL")
+
+    root, ext = os.path.splitext(parsed.database)
+    return [
+        parsed.set(database=f"{root}.shard{index}{ext or '.db'}").render_as_string(hide_password=False)
+        for index in range(count)
+    ]
+
+
+def seedIdSequences(conn, index: int, floor: int = 0) -> None:
+    """
+    Make shard `index` hand out new ids from its own block: index <<
+    ID_SHARD_BITS, or with a floor (the highest id copied in by reshard)
+    the index-th block above it. Never lowers a sequence.
+    """
+    firstBlock = (floor >> ID_SHARD_BITS) + 1 if floor else 0
+    start = (firstBlock + index) << ID_SHARD_BITS
+    for table in SEQUENCE_TABLES:
+        current = conn.execute(text("SELECT seq FROM sqlite_sequence WHERE name = :name"), {"name": table}).scalar()
+        if current is None:
+            conn.execute(text("INSERT INTO sqlite_sequence (name, seq) VALUES (:name, :seq)"), {"name": table, "seq": start})
+        elif current < start:
+            conn.execute(text("UPDATE sqlite_sequence SET seq = :seq WHERE name = :name"), {"name": table, "seq": start})
+
+
+class ShardSet:
+    """
+    The shard engines plus the thread pool fan-out queries run on.
+    """
+
+    def __init__(self, engines, key: str = "vin", workers: int | None = None):
+        if key not in SHARD_KEYS:
+            raise ValueError(f"VEHICLE_SHARD_KEY must be one of {', '.join(SHARD_KEYS)}")
+
+        self.engines = list(engines)
+        self.key = key
+        self.sessionmakers = [sessionmaker(bind=engine, autocommit=False, autoflush=False) for engine in self.engines]
+        self.executor = ThreadPoolExecutor(
+            max_workers=workers or min(32, 4 * len(self.engines)), thread_name_prefix="shard",
+        )
+
+    def __len__(self) -> int:
+        return len(self.engines)
+
+    def indexFor(self, vinNorm: str) -> int:
+        return shardIndex(vinNorm, len(self.engines), self.key)
+
+    def map(self, work) -> list:
+        """
+        [work(0), work(1), ...] run concurrently, one call per shard. Each
+        call runs in a copy of the caller's context, so per-request metrics
+        still see its statements.
+        """
+        futures = [
+            self.executor.submit(contextvars.copy_context().run, work, index)
+            for index in range(len(self.engines))
+        ]
+        return [future.result() for future in futures]
+
+    def close(self) -> None:
+        self.executor.shutdown(wait=False)
+        for engine in self.engines:
+            engine.dispose()
+
+
+class ShardSessions:
+    """
+    What get_db yields in sharded mode: one Session per shard, opened on
+    first use and closed with the request. A shard's session is only ever
+    used by one thread at a time.
+    """
+
+    def __init__(self, shardSet: ShardSet):
+        self.shardSet = shardSet
+        self._sessions = {}
+
+    def forShard(self, index: int):
+        session = self._sessions.get(index)
+        if session is None:
+            session = self._sessions[index] = self.shardSet.sessionmakers[index]()
+        return session
+
+    def forVin(self, vinNorm: str):
+        return self.forShard(self.shardSet.indexFor(vinNorm))
+
+    def map(self, work) -> list:
+        """
+        ShardSet.map() handing work(session) each shard's session.
+        """
+        return self.shardSet.map(lambda index: work(self.forShard(index)))
+
+    def close(self) -> None:
+        for session in self._sessions.values():
+            session.close()
+        self._sessions.clear()
+
+
+# K-WAY MERGE
+
+class _Descending:
+    """
+    Wraps a sort value so it orders in reverse (for mixed-direction sorts).
+    """
+    __slots__ = ("value",)
+
+    def __init__(self, value):
+        self.value = value
+
+    def __lt__(self, other):
+        return other.value < self.value
+
+    def __eq__(self, other):
+        return self.value == other.value
+
+
+def mergeSorted(iterables, keys: list[tuple[str, bool]]):
+    """
+    Lazily merge row iterables that are each sorted by keys, [(attribute,
+    descending), ...], into one sorted stream. Keys must end in a unique
+    column (id) so no two rows compare equal.
+    """
+    names = [name for name, _ in keys]
+    directions = {descending for _, descending in keys}
+
+    if len(directions) == 1:
+        return heapq.merge(*iterables, key=attrgetter(*names), reverse=directions.pop())
+
+    def sortKey(row):
+        return tuple(
+            _Descending(getattr(row, name)) if descending else getattr(row, name)
+            for name, descending in keys
+        )
+
+    return heapq.merge(*iterables, key=sortKey)
+
+
+# RESHARDING
+
+RESHARD_BATCH_SIZE = 5000
+
+
+def reshard(sourceBinds, targetBinds, key: str = "vin", batchSize: int = RESHARD_BATCH_SIZE) -> list[int]:
+    """
+    Copy every vehicle from sourceBinds (one database, or the shards of an
+    older layout) into targetBinds by VIN hash, keeping ids and versions.
+    Sources are brought up to the current schema first. The targets must
+    be empty; their summary tables, search index and change
+    log are filled by the usual triggers. Returns the row count per target.
+    """
+    # models imports database, which imports this module
+    import export
+    import models
+
+    table = models.Vehicle.__table__
+    columns = [column.name for column in table.columns]
+
+    # a source that predates later columns (e.g. version) is upgraded first
+    for bind in sourceBinds:
+        models.upgradeSchema(bind)
+
+    for bind in targetBinds:
+        models.upgradeSchema(bind)
+        with bind.connect() as conn:
+            if conn.execute(text("SELECT 1 FROM vehicles LIMIT 1")).first() is not None:
+                raise ValueError(f"target shard {bind.url} already has vehicles")
+
+    highestId = 0
+    counts = [0] * len(targetBinds)
+    connections = [bind.connect() for bind in targetBinds]
+    try:
+        for conn in connections:
+            conn.begin()
+
+        for source in sourceBinds:
+            for batch in export.iterRowBatches(source, columns, batchSize):
+                byShard = [[] for _ in targetBinds]
+                for row in batch:
+                    values = dict(zip(columns, row))
+                    byShard[shardIndex(values["vin"], len(targetBinds), key)].append(values)
+                    highestId = max(highestId, values["id"])
+
+                for index, rows in enumerate(byShard):
+                    if rows:
+                        connections[index].execute(table.insert(), rows)
+                        counts[index] += len(rows)
+
+        # new ids start in blocks above every copied id
+        for index, conn in enumerate(connections):
+            seedIdSequences(conn, index, highestId)
+            conn.commit()
+    finally:
+        for conn in connections:
+            conn.close()
+
+    return counts
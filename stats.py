@@ -0,0 +1,158 @@
+"""
+Fleet statistics served from the summary tables in models.STATS_TABLES.
+
+The tables are maintained by triggers (see models.py); this module reads
+them, rebuilds them from vehicles and checks the two agree.
+"""
+import math
+
+from sqlalchemy import select, text
+
+import models
+
+
+def _aggregateSql(key: str, withPrice: bool) -> str:
+    groupKey = key.format(row="v")
+    priceSql = (
+        ", COUNT(v.purchasePrice), IFNULL(SUM(v.purchasePrice), 0),"
+        " MIN(v.purchasePrice), MAX(v.purchasePrice)"
+        if withPrice else ""
+    )
+    return (
+        f"SELECT {groupKey} AS groupKey, COUNT(*){priceSql} "
+        f"FROM vehicles AS v WHERE {groupKey} IS NOT NULL GROUP BY groupKey"
+    )
+
+
+def recomputeStats(bind) -> None:
+    """
+    Full-recompute fallback: rebuild every summary table from vehicles in
+    one transaction.
+    """
+    with bind.begin() as conn:
+        for suffix, key, _, withPrice in models.STATS_DIMENSIONS:
+            table = models.STATS_TABLES[suffix]
+            columns = ", ".join(column.name for column in table.columns)
+            conn.execute(table.delete())
+            conn.execute(text(f"INSERT INTO {table.name} ({columns}) {_aggregateSql(key, withPrice)}"))
+
+
+def _sameValue(a, b) -> bool:
+    if isinstance(a, float) or isinstance(b, float):
+        if a is None or b is None:
+            return a is b
+        # priceSum accumulates float error over incremental updates
+        return math.isclose(a, b, rel_tol=1e-9, abs_tol=1e-6)
+    return a == b
+
+
+def checkStats(bind) -> list[dict]:
+    """
+    Compare every summary table with a fresh GROUP BY over vehicles.
+    Returns the mismatching groups (empty when consistent). This scans the
+    whole table, so it is an offline/admin check, not a request-path one.
+    """
+    mismatches = []
+    with bind.connect() as conn:
+        for suffix, key, _, withPrice in models.STATS_DIMENSIONS:
+            table = models.STATS_TABLES[suffix]
+            stored = {row[0]: tuple(row[1:]) for row in conn.execute(select(table))}
+            actual = {row[0]: tuple(row[1:]) for row in conn.execute(text(_aggregateSql(key, withPrice)))}
+
+            for groupKey in stored.keys() | actual.keys():
+                expected = actual.get(groupKey)
+                found = stored.get(groupKey)
+                if expected is None or found is None or not all(map(_sameValue, expected, found)):
+                    mismatches.append({
+                        "dimension": suffix,
+                        "groupKey": groupKey,
+                        "stored": list(found) if found is not None else None,
+                        "actual": list(expected) if expected is not None else None,
+                    })
+
+    return mismatches
+
+
+def _priceGroup(row: dict) -> dict:
+    return {
+        "count": row["vehicleCount"],
+        "avgPurchasePrice": row["priceSum"] / row["priceCount"] if row["priceCount"] else None,
+        "minPurchasePrice": row["priceMin"],
+        "maxPurchasePrice": row["priceMax"],
+    }
+
+
+def readSummaryRows(db) -> dict:
+    """
+    {table suffix: [summary row dicts ordered by groupKey]} for every summary table.
+    """
+    return {
+        suffix: [row._asdict() for row in db.execute(select(table).order_by(table.c.groupKey))]
+        for suffix, table in models.STATS_TABLES.items()
+    }
+
+
+def _extreme(pick, a, b):
+    return b if a is None else a if b is None else pick(a, b)
+
+
+def mergeSummaryRows(shardRows: list[dict]) -> dict:
+    """
+    Combine readSummaryRows() from several shards: counts and sums add up,
+    min/max take the extremes.
+    """
+    merged = {}
+    for suffix in models.STATS_TABLES:
+        groups = {}
+        for rows in shardRows:
+            for row in rows[suffix]:
+                group = groups.get(row["groupKey"])
+                if group is None:
+                    groups[row["groupKey"]] = dict(row)
+                    continue
+                group["vehicleCount"] += row["vehicleCount"]
+                if "priceCount" in row:
+                    group["priceCount"] += row["priceCount"]
+                    group["priceSum"] += row["priceSum"]
+                    group["priceMin"] = _extreme(min, group["priceMin"], row["priceMin"])
+                    group["priceMax"] = _extreme(max, group["priceMax"], row["priceMax"])
+        merged[suffix] = [groups[groupKey] for groupKey in sorted(groups)]
+    return merged
+
+
+def statsResponse(summary: dict) -> dict:
+    """
+    Everything GET /vehicle/stats returns, built from readSummaryRows() output.
+    """
+    total = summary["total"][0] if summary["total"] else None
+    totals = _priceGroup(total) if total else {
+        "count": 0, "avgPurchasePrice": None, "minPurchasePrice": None, "maxPurchasePrice": None,
+    }
+
+    def grouped(suffix: str, field: str) -> list[dict]:
+        return [{field: row["groupKey"], **_priceGroup(row)} for row in summary[suffix]]
+
+    histogram = [
+        {
+            "minHorsePower": row["groupKey"],
+            "maxHorsePower": row["groupKey"] + models.HP_BUCKET_WIDTH - 1,
+            "count": row["vehicleCount"],
+        }
+        for row in summary["horse_power"]
+    ]
+
+    return {
+        "total": totals,
+        "byManufacturer": grouped("manufacturer", "manuName"),
+        "byModelYear": grouped("model_year", "modelYear"),
+        "byFuelType": grouped("fuel_type", "fuelType"),
+        "horsePowerHistogram": histogram,
+    }
+
+
+def readStats(db) -> dict:
+    """
+    Everything GET /vehicle/stats returns; reads only the summary tables,
+    whose size depends on the number of groups, not on the number of vehicles.
+    """
+    return statsResponse(readSummaryRows(db))
@@ -0,0 +1,7 @@
+import os
+import tempfile
+
+# point the app at a throwaway database before main / database are imported,
+# so the tests never drop the tables in ./vehicles.db
+_database_dir = tempfile.TemporaryDirectory()
+os.environ["VEHICLE_DATABASE_URL"] = f"sqlite:///{os.path.join(_database_dir.name, 'test.db')}"
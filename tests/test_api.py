@@ -1,3 +1,5 @@
+import base64
+import json
 import os
 import sys
 
@@ -9,8 +11,9 @@ if PROJECT_ROOT not in sys.path:
 from fastapi.testclient import TestClient
 import pytest
 
-from main import app
+from main import app, parseSort, sortSpec, vehicle_cache
 from database import Base, engine
+from vindecoder import withCheckDigit
 
 
 client = TestClient(app)
@@ -23,6 +26,7 @@ def reset_db():
     """
     Base.metadata.drop_all(bind=engine)
     Base.metadata.create_all(bind=engine)
+    vehicle_cache.clear()
     yield
 
 
@@ -57,7 +61,7 @@ def test_create_vehicle_duplicate_vin_returns_422():
     Expected output: success, fail
     '''
     # valid 17-char VIN for duplicate test
-    dup_vin = "1HGCM82633A004353"
+    dup_vin = "1HGCM82653A004353"
     payload = get_sample_payload(dup_vin)
 
     res1 = client.post("/vehicle", json=payload)
@@ -72,7 +76,7 @@ def test_create_vehicle_duplicate_vin_returns_422():
 
 def test_get_vehicle_by_vin():
     # using lowercase valid VIN to show normalization
-    vin = "1hgcm82633a004354"
+    vin = "1hgcm82673a004354"
     payload = get_sample_payload(vin)
 
     # POST: 201 OK
@@ -80,12 +84,12 @@ def test_get_vehicle_by_vin():
     assert res_create.status_code == 201
 
     # GET: 200 OK
-    res_get = client.get("/vehicle/1hgcm82633a004354")
+    res_get = client.get("/vehicle/1hgcm82673a004354")
     assert res_get.status_code == 200
 
     data = res_get.json()
     # VIN should be normalized to uppercase, still 17 chars
-    assert data["vin"] == "1HGCM82633A004354"
+    assert data["vin"] == "1HGCM82673A004354"
     assert data["manuName"] == "Toyota"
 
 
@@ -95,7 +99,7 @@ def test_list_vehicles():
     assert res_empty.json() == []
 
     # add one vehicle with a valid 17 char VIN
-    vin = "1hgcm82633a004355"
+    vin = "1hgcm82693a004355"
     client.post("/vehicle", json=get_sample_payload(vin))
 
     res_list = client.get("/vehicle")
@@ -105,12 +109,12 @@ def test_list_vehicles():
     assert isinstance(data, list)
     assert len(data) == 1
     # normalized to uppercase
-    assert data[0]["vin"] == "1HGCM82633A004355"
+    assert data[0]["vin"] == "1HGCM82693A004355"
 
 
 def test_update_vehicle():
     # valid VIN for update test
-    vin = "1hgcm82633a004356"
+    vin = "1hgcm82603a004356"
     payload = get_sample_payload(vin)
     res_create = client.post("/vehicle", json=payload)
     assert res_create.status_code == 201
@@ -138,7 +142,7 @@ def test_update_vehicle():
 
 def test_delete_vehicle():
     # valid VIN for delete test
-    vin = "1hgcm82633a004357"
+    vin = "1hgcm82623a004357"
     payload = get_sample_payload(vin)
     res_create = client.post("/vehicle", json=payload)
     assert res_create.status_code == 201
@@ -184,3 +188,577 @@ def test_invalid_vin_inputs():
     del missing_vin_payload["vin"]
     res_missing = client.post("/vehicle", json=missing_vin_payload)
     assert res_missing.status_code == 422
+
+
+def test_list_vehicles_keyset_pagination():
+    vins = [withCheckDigit(f"1HGCM82633A10{i:04d}") for i in range(5)]
+    for vin in vins:
+        assert client.post("/vehicle", json=get_sample_payload(vin)).status_code == 201
+
+    seen = []
+    url = "/vehicle/?limit=2"
+    while url:
+        res = client.get(url)
+        assert res.status_code == 200
+        page = res.json()
+        assert len(page) <= 2
+        seen.extend(v["vin"] for v in page)
+
+        nextLink = res.links.get("next")
+        url = nextLink["url"] if nextLink else None
+
+    assert seen == vins
+
+    res_bad = client.get("/vehicle/?cursor=not-a-cursor")
+    assert res_bad.status_code == 422
+
+
+def test_list_vehicles_ndjson_stream():
+    vins = [withCheckDigit(f"1HGCM82633A20{i:04d}") for i in range(3)]
+    for vin in vins:
+        client.post("/vehicle", json=get_sample_payload(vin))
+
+    res = client.get("/vehicle/", headers={"Accept": "application/x-ndjson"})
+    assert res.status_code == 200
+    assert res.headers["content-type"].startswith("application/x-ndjson")
+
+    rows = [json.loads(line) for line in res.text.splitlines()]
+    assert [row["vin"] for row in rows] == vins
+    assert rows[0]["manuName"] == "Toyota"
+
+
+def test_bulk_create_json_array_reports_each_row():
+    client.post("/vehicle", json=get_sample_payload("1HGCM82663A300000"))
+
+    bad_price = get_sample_payload("1HGCM82613A300003")
+    bad_price["purchasePrice"] = -1
+    rows = [
+        get_sample_payload("1hgcm82683a300001"),
+        get_sample_payload("1HGCM82663A300000"),  # already in the DB
+        get_sample_payload("1HGCM8I633A300002"),  # contains I
+        bad_price,
+        get_sample_payload("1HGCM82683A300001"),  # repeated in the upload
+    ]
+
+    res = client.post("/vehicle/bulk", json=rows)
+    assert res.status_code == 200
+
+    data = res.json()
+    assert (data["created"], data["duplicate"], data["invalid"]) == (1, 2, 2)
+    assert [r["status"] for r in data["results"]] == [
+        "created", "duplicate", "invalid", "invalid", "duplicate",
+    ]
+    assert "cannot contain" in data["results"][2]["errors"][0].lower()
+
+    res_get = client.get("/vehicle/1HGCM82683A300001")
+    assert res_get.status_code == 200
+
+
+def test_bulk_create_ndjson_and_csv():
+    ndjson = "\n".join(
+        json.dumps(get_sample_payload(withCheckDigit(f"1HGCM82633A40000{i}"))) for i in range(3)
+    ) + "\nnot json\n"
+    res = client.post(
+        "/vehicle/bulk",
+        content=ndjson,
+        headers={"Content-Type": "application/x-ndjson"},
+    )
+    assert res.status_code == 200
+    assert (res.json()["created"], res.json()["invalid"]) == (3, 1)
+
+    csv_body = (
+        "vin,manuName,description,horsePower,modelName,modelYear,purchasePrice,fuelType\n"
+        '1HGCM82603A500001,Toyota,"Tow package,\nroof rack",150,Corolla,2020,20000,Gasoline\n'
+        "1HGCM82623A500002,Toyota,,abc,Corolla,2020,20000,Gasoline\n"
+    )
+    res = client.post("/vehicle/bulk", content=csv_body, headers={"Content-Type": "text/csv"})
+    assert res.status_code == 200
+    assert [r["status"] for r in res.json()["results"]] == ["created", "invalid"]
+
+    data = client.get("/vehicle/1HGCM82603A500001").json()
+    assert data["description"] == "Tow package,\nroof rack"
+
+
+def test_bulk_create_reports_non_string_vin_rows():
+    good = get_sample_payload("1HGCM82613A520001")
+    res = client.post("/vehicle/bulk", json=[good, {**good, "vin": 123}, {**good, "vin": ["x"]}])
+    assert res.status_code == 200
+    results = res.json()["results"]
+    assert [(r["status"], r["vin"]) for r in results] == [
+        ("created", "1HGCM82613A520001"), ("invalid", None), ("invalid", None),
+    ]
+
+
+def test_bulk_create_reports_out_of_range_integers(monkeypatch):
+    import main
+
+    # the bad row lands in the second chunk, after the first has committed
+    monkeypatch.setattr(main, "BULK_CHUNK_SIZE", 2)
+    rows = [get_sample_payload(withCheckDigit(f"1HGCM82603A53000{i}")) for i in range(4)]
+    rows[2]["horsePower"] = 10**30
+    res = client.post("/vehicle/bulk", json=rows)
+    assert res.status_code == 200
+    results = res.json()["results"]
+    assert [r["status"] for r in results] == ["created", "created", "invalid", "created"]
+    assert results[2]["errors"][0].startswith("horsePower:")
+
+
+def test_bulk_create_reports_rows_that_are_not_utf8():
+    # a Windows-1252 export: only the row with "Citro\xebn" is rejected
+    csv_body = (
+        "vin,manuName,description,horsePower,modelName,modelYear,purchasePrice,fuelType\n"
+        "1HGCM82663A510001,Toyota,clean,150,Corolla,2020,20000,Gasoline\n"
+        "1HGCM82683A510002,Citro\xebn,clean,150,C4,2020,20000,Gasoline\n"
+        "1HGCM826X3A510003,Toyota,clean,150,Corolla,2020,20000,Gasoline\n"
+    ).encode("cp1252")
+    res = client.post("/vehicle/bulk", content=csv_body, headers={"Content-Type": "text/csv"})
+    assert res.status_code == 200
+    results = res.json()["results"]
+    assert [r["status"] for r in results] == ["created", "invalid", "created"]
+    assert "not valid UTF-8" in results[1]["errors"][0]
+
+    ndjson = json.dumps(get_sample_payload("1HGCM82613A510004")).encode() + b"\n" + b'{"manuName": "Citro\xebn"}\n'
+    res = client.post("/vehicle/bulk", content=ndjson, headers={"Content-Type": "application/x-ndjson"})
+    assert res.status_code == 200
+    assert [r["status"] for r in res.json()["results"]] == ["created", "invalid"]
+
+
+def test_get_vehicle_etag_and_cache_invalidation():
+    vin = "1HGCM82673A600001"
+    client.post("/vehicle", json=get_sample_payload(vin))
+
+    res1 = client.get(f"/vehicle/{vin}")
+    assert res1.status_code == 200
+    etag = res1.headers["etag"]
+
+    res2 = client.get(f"/vehicle/{vin}", headers={"If-None-Match": etag})
+    assert res2.status_code == 304
+    assert res2.content == b""
+
+    stats = client.get("/cache/stats").json()
+    assert stats["hits"] >= 1
+    assert stats["misses"] >= 1
+
+    updated = get_sample_payload(vin)
+    updated["horsePower"] = 200
+    assert client.put(f"/vehicle/{vin}", json=updated).status_code == 200
+
+    # the update invalidated the cached entry and bumped the row version
+    res3 = client.get(f"/vehicle/{vin}", headers={"If-None-Match": etag})
+    assert res3.status_code == 200
+    assert res3.json()["horsePower"] == 200
+    assert res3.headers["etag"] != etag
+
+    assert client.delete(f"/vehicle/{vin}").status_code == 204
+    assert client.get(f"/vehicle/{vin}").status_code == 404
+
+
+def test_upgrade_schema_adds_version_column_and_indexes(tmp_path):
+    import sqlite3
+    from sqlalchemy import create_engine, inspect
+    import models
+
+    path = tmp_path / "legacy.db"
+    conn = sqlite3.connect(path)
+    conn.execute(
+        "CREATE TABLE vehicles (id INTEGER PRIMARY KEY, vin VARCHAR(32) NOT NULL UNIQUE, "
+        "manuName VARCHAR, description VARCHAR, horsePower INTEGER, modelName VARCHAR, "
+        "modelYear INTEGER, purchasePrice FLOAT, fuelType VARCHAR)"
+    )
+    conn.execute("INSERT INTO vehicles (vin, manuName) VALUES ('1HGCM82633A004352', 'Toyota')")
+    conn.commit()
+    conn.close()
+
+    legacy_engine = create_engine(f"sqlite:///{path}")
+    models.upgradeSchema(legacy_engine)
+
+    inspector = inspect(legacy_engine)
+    columns = {c["name"] for c in inspector.get_columns("vehicles")}
+    assert "version" in columns
+    indexes = {ix["name"] for ix in inspector.get_indexes("vehicles")}
+    assert "ix_vehicles_manu_model_year" in indexes
+    with legacy_engine.connect() as conn:
+        assert conn.exec_driver_sql("SELECT version FROM vehicles").scalar() == 1
+        # existing rows were indexed for search
+        match = "SELECT rowid FROM vehicles_fts WHERE vehicles_fts MATCH 'toyota'"
+        assert conn.exec_driver_sql(match).scalar() == 1
+    legacy_engine.dispose()
+
+
+def test_upgrade_schema_never_reuses_deleted_ids(tmp_path):
+    import sqlite3
+    from sqlalchemy import create_engine
+    import models
+
+    path = tmp_path / "legacy.db"
+    conn = sqlite3.connect(path)
+    conn.execute(
+        "CREATE TABLE vehicles (id INTEGER PRIMARY KEY, vin VARCHAR(32) NOT NULL UNIQUE, "
+        "manuName VARCHAR, description VARCHAR, horsePower INTEGER, modelName VARCHAR, "
+        "modelYear INTEGER, purchasePrice FLOAT, fuelType VARCHAR)"
+    )
+    conn.execute("INSERT INTO vehicles (id, vin, manuName) VALUES (7, '1HGCM82633A004352', 'Toyota')")
+    conn.commit()
+    conn.close()
+
+    legacy_engine = create_engine(f"sqlite:///{path}")
+    models.upgradeSchema(legacy_engine)
+    # a second upgrade leaves the rebuilt table alone
+    models.upgradeSchema(legacy_engine)
+
+    with legacy_engine.begin() as conn:
+        assert "AUTOINCREMENT" in conn.exec_driver_sql(
+            "SELECT sql FROM sqlite_master WHERE name = 'vehicles'"
+        ).scalar()
+        assert conn.exec_driver_sql("SELECT id FROM vehicles").scalar() == 7
+
+        # delete then recreate the same VIN: a new id, so a new "{id}-{version}" ETag
+        conn.exec_driver_sql("DELETE FROM vehicles WHERE id = 7")
+        new_id = conn.exec_driver_sql(
+            "INSERT INTO vehicles (vin, manuName) VALUES ('1HGCM82633A004352', 'Honda') RETURNING id"
+        ).scalar()
+        assert new_id == 8
+
+        # triggers were recreated on the rebuilt table
+        match = "SELECT rowid FROM vehicles_fts WHERE vehicles_fts MATCH 'honda'"
+        assert conn.exec_driver_sql(match).scalar() == 8
+        assert conn.exec_driver_sql("SELECT vehicleCount FROM vehicle_stats_total").scalar() == 1
+    legacy_engine.dispose()
+
+
+def test_patch_vehicle_updates_only_sent_fields():
+    vin = "1HGCM82633A700001"
+    client.post("/vehicle", json=get_sample_payload(vin))
+
+    res = client.patch(f"/vehicle/{vin.lower()}", json={"horsePower": 175})
+    assert res.status_code == 200
+    data = res.json()
+    assert data["horsePower"] == 175
+    assert data["description"] == "Test car"
+    assert data["fuelType"] == "Gasoline"
+
+    res_null = client.patch(f"/vehicle/{vin}", json={"manuName": None})
+    assert res_null.status_code == 422
+
+    res_mismatch = client.patch(f"/vehicle/{vin}", json={"vin": "1HGCM82653A700002"})
+    assert res_mismatch.status_code == 422
+
+    res_missing = client.patch("/vehicle/1HGCM82683A700009", json={"horsePower": 1})
+    assert res_missing.status_code == 404
+
+
+def test_update_and_delete_missing_vehicle_return_404():
+    vin = "1HGCM82673A700003"
+    assert client.put(f"/vehicle/{vin}", json=get_sample_payload(vin)).status_code == 404
+    assert client.delete(f"/vehicle/{vin}").status_code == 404
+
+
+def test_list_vehicles_filter_and_multi_key_sort():
+    fleet = [
+        ("1HGCM826X3A800001", "Toyota", "Corolla", 2018, 140, 18000, "Gasoline"),
+        ("1HGCM82613A800002", "Toyota", "Prius", 2021, 120, 26000, "Hybrid"),
+        ("1HGCM82633A800003", "Toyota", "Corolla", 2022, 169, 23000, "Hybrid"),
+        ("1HGCM82653A800004", "Honda", "Civic", 2020, 158, 22000, "Gasoline"),
+        ("1HGCM82673A800005", "Honda", "Accord", 2022, 192, 28000, "Hybrid"),
+    ]
+    for vin, manu, model, year, hp, price, fuel in fleet:
+        payload = get_sample_payload(vin)
+        payload.update(manuName=manu, modelName=model, modelYear=year,
+                       horsePower=hp, purchasePrice=price, fuelType=fuel)
+        assert client.post("/vehicle", json=payload).status_code == 201
+
+    res = client.get("/vehicle/?fuelType=Hybrid&minModelYear=2021&maxPurchasePrice=27000")
+    assert res.status_code == 200
+    assert [v["vin"][-1] for v in res.json()] == ["2", "3"]
+
+    res = client.get("/vehicle/?sort=manuName,-modelYear")
+    assert [v["vin"][-1] for v in res.json()] == ["5", "4", "3", "2", "1"]
+
+    # keyset pagination over a mixed-direction sort
+    seen = []
+    url = "/vehicle/?sort=-modelYear,horsePower&limit=2"
+    while url:
+        res = client.get(url)
+        seen.extend(v["vin"][-1] for v in res.json())
+        url = res.links.get("next", {}).get("url")
+    assert seen == ["3", "5", "2", "4", "1"]
+
+    assert client.get("/vehicle/?sort=description").status_code == 422
+
+    # a cursor only works with the sort order it was issued for
+    cursor = client.get("/vehicle/?sort=-modelYear&limit=1").headers["x-next-cursor"]
+    assert client.get(f"/vehicle/?sort=modelYear&cursor={cursor}").status_code == 422
+
+    # client-edited values that don't fit their sort column are rejected, not bound
+    for sort, after in [
+        ("id", [{"x": 1}]), ("id", [True]), ("id", [2**63]), ("id", ["1"]),
+        ("-modelYear", [2020.5, 1]), ("purchasePrice", [None, 1]), ("manuName", [7, 1]),
+    ]:
+        raw = json.dumps({"sort": sortSpec(parseSort(sort)), "after": after}).encode()
+        edited = base64.urlsafe_b64encode(raw).decode()
+        assert client.get("/vehicle/", params={"sort": sort, "cursor": edited}).status_code == 422
+
+
+def test_search_vehicles_ranked_with_snippets():
+    rows = [
+        ("1HGCM82663A900001", "Toyota", "Corolla", "Hybrid trim with tow package"),
+        ("1HGCM82683A900002", "Toyota", "Camry", "Leather seats, sunroof"),
+        ("1HGCM826X3A900003", "Honda", "Civic", "Towing hitch, hybrid battery replaced"),
+    ]
+    for vin, manu, model, description in rows:
+        payload = get_sample_payload(vin)
+        payload.update(manuName=manu, modelName=model, description=description)
+        client.post("/vehicle", json=payload)
+
+    res = client.get("/vehicle/search", params={"q": "hybrid corolla tow package"})
+    assert res.status_code == 200
+    hits = res.json()
+    assert [hit["vin"] for hit in hits] == ["1HGCM82663A900001"]
+    assert "<mark>" in hits[0]["snippet"]
+
+    # prefix matching: "tow" also finds "Towing"
+    res = client.get("/vehicle/search", params={"q": "hybrid tow", "limit": 1})
+    assert len(res.json()) == 1
+    assert "next" in res.links
+
+    # the index follows updates and deletes
+    client.patch("/vehicle/1HGCM82683A900002", json={"description": "Hybrid conversion"})
+    client.delete("/vehicle/1HGCM82663A900001")
+    vins = {hit["vin"] for hit in client.get("/vehicle/search?q=hybrid").json()}
+    assert vins == {"1HGCM82683A900002", "1HGCM826X3A900003"}
+
+    assert client.get("/vehicle/search", params={"q": "***"}).status_code == 422
+
+
+def test_vehicle_stats_follow_every_write_path():
+    fleet = [
+        ("1HGCM82653AA00001", "Toyota", 2020, 150, 20000, "Gasoline"),
+        ("1HGCM82673AA00002", "Toyota", 2021, 120, 26000, "Hybrid"),
+        ("1HGCM82693AA00003", "Honda", 2020, 190, 30000, "Gasoline"),
+    ]
+    for vin, manu, year, hp, price, fuel in fleet[:2]:
+        payload = get_sample_payload(vin)
+        payload.update(manuName=manu, modelYear=year, horsePower=hp, purchasePrice=price, fuelType=fuel)
+        client.post("/vehicle", json=payload)
+
+    vin, manu, year, hp, price, fuel = fleet[2]
+    payload = get_sample_payload(vin)
+    payload.update(manuName=manu, modelYear=year, horsePower=hp, purchasePrice=price, fuelType=fuel)
+    client.post("/vehicle/bulk", json=[payload])
+
+    data = client.get("/vehicle/stats").json()
+    assert data["total"]["count"] == 3
+    assert data["total"]["minPurchasePrice"] == 20000
+    toyota = next(g for g in data["byManufacturer"] if g["manuName"] == "Toyota")
+    assert (toyota["count"], toyota["avgPurchasePrice"]) == (2, 23000)
+    assert [g["count"] for g in data["byModelYear"]] == [2, 1]
+    assert [(b["minHorsePower"], b["count"]) for b in data["horsePowerHistogram"]] == [(100, 1), (150, 2)]
+
+    # removing the cheapest Toyota moves the group minimum
+    client.delete("/vehicle/1HGCM82653AA00001")
+    client.patch("/vehicle/1HGCM82693AA00003", json={"manuName": "Toyota"})
+    data = client.get("/vehicle/stats").json()
+    assert [(g["manuName"], g["count"], g["minPurchasePrice"]) for g in data["byManufacturer"]] == [
+        ("Toyota", 2, 26000),
+    ]
+    assert client.get("/vehicle/stats/consistency").json() == {"consistent": True, "mismatches": []}
+
+    # drift is detected and repaired by a full recompute
+    with engine.begin() as conn:
+        conn.exec_driver_sql("UPDATE vehicle_stats_total SET vehicleCount = 99")
+    assert client.get("/vehicle/stats/consistency").json()["consistent"] is False
+    assert client.post("/vehicle/stats/recompute").status_code == 204
+    assert client.get("/vehicle/stats").json()["total"]["count"] == 2
+
+
+def test_stats_min_max_reread_is_an_index_seek():
+    import models
+
+    # what the delete/update triggers run when the removed row held a group's min/max
+    with engine.connect() as conn:
+        for _, key, _, withPrice in models.STATS_DIMENSIONS:
+            if not withPrice:
+                continue
+            plan = conn.exec_driver_sql(
+                "EXPLAIN QUERY PLAN SELECT MIN(v.purchasePrice) FROM vehicles AS v "
+                f"WHERE {key.format(row='v')} = ?", ("x",)
+            ).fetchall()
+            assert "COVERING INDEX" in plan[0][3], (key, plan)
+
+
+def test_export_endpoint_streams_csv():
+    for i in range(3):
+        client.post("/vehicle", json=get_sample_payload(withCheckDigit(f"1HGCM82633AB0000{i}")))
+
+    res = client.get("/vehicle/export", params={"format": "csv", "fields": "vin,horsePower"})
+    assert res.status_code == 200
+    assert res.headers["content-type"].startswith("text/csv")
+    assert res.text.splitlines() == [
+        "vin,horsePower",
+        "1HGCM826X3AB00000,150",
+        "1HGCM82613AB00001,150",
+        "1HGCM82633AB00002,150",
+    ]
+
+    # Content-Encoding is decoded transparently by the client
+    res_gzip = client.get("/vehicle/export", params={"format": "ndjson", "compression": "gzip"})
+    assert res_gzip.headers["content-encoding"] == "gzip"
+    assert len(res_gzip.text.splitlines()) == 3
+
+    assert client.get("/vehicle/export", params={"fields": "nope"}).status_code == 422
+
+
+def test_change_feed_compacts_and_tombstones():
+    vins = ["1HGCM82683AC00001", "1HGCM826X3AC00002"]
+    for vin in vins:
+        client.post("/vehicle", json=get_sample_payload(vin))
+
+    feed = client.get("/vehicle/changes").json()
+    assert [(c["op"], c["vin"]) for c in feed["changes"]] == [("upsert", vins[0]), ("upsert", vins[1])]
+    assert feed["changes"][0]["vehicle"]["manuName"] == "Toyota"
+    cursor = feed["nextSince"]
+
+    # nothing new: an empty page that echoes the cursor
+    quiet = client.get("/vehicle/changes", params={"since": cursor}).json()
+    assert quiet == {"changes": [], "nextSince": cursor, "hasMore": False}
+
+    client.patch(f"/vehicle/{vins[0]}", json={"horsePower": 300})
+    client.delete(f"/vehicle/{vins[1]}")
+
+    feed = client.get("/vehicle/changes", params={"since": cursor, "limit": 1}).json()
+    assert feed["hasMore"] is True
+    assert feed["changes"][0]["vehicle"]["horsePower"] == 300
+
+    feed = client.get("/vehicle/changes", params={"since": feed["nextSince"]}).json()
+    assert [(c["op"], c["vin"], c["vehicle"]) for c in feed["changes"]] == [("delete", vins[1], None)]
+
+    # a fresh consumer sees only the latest state of each VIN
+    full = client.get("/vehicle/changes").json()["changes"]
+    assert [(c["op"], c["vin"]) for c in full] == [("upsert", vins[0]), ("delete", vins[1])]
+
+
+def test_change_feed_long_poll_and_sse():
+    # long-poll with nothing to report returns an empty page after the wait
+    res = client.get("/vehicle/changes", params={"wait": 0.2})
+    assert res.json()["changes"] == []
+
+    client.post("/vehicle", json=get_sample_payload("1HGCM82613AC00003"))
+    res = client.get("/vehicle/changes/stream", params={"timeout": 0.3})
+    assert res.headers["content-type"].startswith("text/event-stream")
+    assert "event: upsert" in res.text
+    assert "1HGCM82613AC00003" in res.text
+
+    # Last-Event-ID resumes after the last seen change
+    seq = client.get("/vehicle/changes").json()["nextSince"]
+    res = client.get(
+        "/vehicle/changes/stream",
+        params={"timeout": 0.3},
+        headers={"Last-Event-ID": str(seq)},
+    )
+    assert "event: upsert" not in res.text
+
+
+def test_pruned_tombstones_expire_old_cursors():
+    import changes
+
+    client.post("/vehicle", json=get_sample_payload("1HGCM82633AC00004"))
+    client.post("/vehicle", json=get_sample_payload("1HGCM82653AC00005"))
+    client.delete("/vehicle/1HGCM82633AC00004")
+
+    assert changes.pruneTombstones(engine, olderThanSeconds=-1) == 1
+    assert client.get("/vehicle/changes", params={"since": 1}).status_code == 410
+    assert client.get("/vehicle/changes", params={"since": 0}).status_code == 200
+
+
+def test_trusted_reads_match_vehicle_read():
+    from sqlalchemy.orm import Session
+
+    import models
+    from schemas import VehicleRead
+
+    first = get_sample_payload("1HGCM82643AD00001")
+    second = get_sample_payload("1HGCM82663AD00002") | {"description": None, "purchasePrice": 18999.99}
+    for payload in (first, second):
+        assert client.post("/vehicle", json=payload).status_code == 201
+
+    # what the validated ORM path would have produced
+    with Session(engine) as db:
+        expected = [
+            VehicleRead.model_validate(vehicle).model_dump(mode="json")
+            for vehicle in db.query(models.Vehicle).order_by(models.Vehicle.id)
+        ]
+
+    listed = client.get("/vehicle/").json()
+    assert listed == expected
+    for item in listed:
+        VehicleRead.model_validate(item)
+
+    assert client.get("/vehicle/1HGCM82663AD00002").json() == expected[1]
+    ndjson = client.get("/vehicle/", params={"format": "ndjson"}).text.splitlines()
+    assert [json.loads(line) for line in ndjson] == expected
+
+
+def test_fields_projection():
+    for i, price in enumerate((30000, 10000, 20000)):
+        client.post("/vehicle", json=get_sample_payload(withCheckDigit(f"1HGCM82633AD1000{i}")) | {"purchasePrice": price})
+
+    # the sort key isn't projected, but the cursor still works
+    res = client.get("/vehicle/", params={"fields": "vin", "sort": "-purchasePrice", "limit": 2})
+    assert res.json() == [{"vin": "1HGCM82683AD10000"}, {"vin": "1HGCM82613AD10002"}]
+    res = client.get(
+        "/vehicle/",
+        params={"fields": "vin", "sort": "-purchasePrice", "limit": 2, "cursor": res.headers["x-next-cursor"]},
+    )
+    assert res.json() == [{"vin": "1HGCM826X3AD10001"}]
+
+    full = client.get("/vehicle/1HGCM826X3AD10001")
+    projected = client.get("/vehicle/1HGCM826X3AD10001", params={"fields": "modelYear,vin"})
+    assert projected.json() == {"modelYear": 2020, "vin": "1HGCM826X3AD10001"}
+    assert projected.headers["etag"] != full.headers["etag"]
+
+    res = client.get("/vehicle/1HGCM826X3AD10001", params={"fields": "vin,version"})
+    assert res.status_code == 422
+    assert "fields" in res.json()["detail"]
+
+
+def test_new_vins_need_a_valid_check_digit():
+    res = client.post("/vehicle", json=get_sample_payload("1HGCM82633A004353"))
+    assert res.status_code == 422
+    assert res.json()["detail"] == {"vin": ["VIN check digit (position 9) should be 5"]}
+
+    rows = [get_sample_payload("1HGCM82633A004352"), get_sample_payload("1HGCM82633A004353")]
+    data = client.post("/vehicle/bulk", json=rows).json()
+    assert [r["status"] for r in data["results"]] == ["created", "invalid"]
+
+    # lookups only check the format, so stored VINs with a bad digit stay reachable
+    assert client.get("/vehicle/1HGCM82633A004353").status_code == 404
+
+
+
+def test_vin_cross_check(monkeypatch):
+    import main
+
+    monkeypatch.setattr(main, "VIN_CROSS_CHECK", True)
+
+    # 1HG is Honda and year code 3 is 2003 / 2033
+    res = client.post("/vehicle", json=get_sample_payload("1HGCM82633A004352"))
+    assert res.status_code == 422
+    assert set(res.json()["detail"]) == {"manuName", "modelYear"}
+
+    payload = get_sample_payload("1HGCM82633A004352") | {"manuName": "Honda", "modelYear": 2003}
+    assert client.post("/vehicle", json=payload).status_code == 201
+    assert client.patch("/vehicle/1HGCM82633A004352", json={"modelYear": 2004}).status_code == 422
+
+
+def test_metrics_endpoint_reports_routes_and_cache():
+    client.post("/vehicle", json=get_sample_payload("1HGCM82633A004352"))
+    client.get("/vehicle/1HGCM82633A004352")
+
+    res = client.get("/metrics")
+    assert res.status_code == 200
+    assert res.headers["content-type"].startswith("text/plain")
+    text = res.text
+    assert 'http_request_duration_seconds_count{method="GET",route="/vehicle/{vin}",status="200"}' in text
+    assert 'http_request_db_statements_count{method="POST",route="/vehicle/"}' in text
+    assert "db_statement_duration_seconds_count" in text
+    assert "vehicle_cache_misses_total" in text
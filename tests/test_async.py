@@ -0,0 +1,111 @@
+import os
+import sys
+
+# making sure project root is on sys.path so we can import main, database, models
+PROJECT_ROOT = os.path.dirname(os.path.dirname(__file__))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+import pytest
+
+pytest.importorskip("aiosqlite")
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from database import AsyncBackingSession, Base, DATABASE_URL, engine, get_async_db, makeAsyncEngine
+import main
+from vindecoder import withCheckDigit
+
+
+# the async CRUD routes on their own app, whatever VEHICLE_ASYNC_DB is set to
+async_app = FastAPI()
+async_app.include_router(main.async_routes)
+
+AsyncTestSession = async_sessionmaker(
+    makeAsyncEngine(DATABASE_URL), autoflush=False, expire_on_commit=False, sync_session_class=AsyncBackingSession
+)
+
+async def override_get_async_db():
+    async with AsyncTestSession() as db:
+        yield db
+
+async_app.dependency_overrides[get_async_db] = override_get_async_db
+
+client = TestClient(async_app)
+
+
+@pytest.fixture(autouse=True)
+def reset_db():
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    main.vehicle_cache.clear()
+    yield
+
+
+def get_sample_payload(vin: str = "1HGCM82633A004352"):
+    return {
+        "vin": vin,
+        "manuName": "Toyota",
+        "description": "Test car",
+        "horsePower": 150,
+        "modelName": "Corolla",
+        "modelYear": 2020,
+        "purchasePrice": 20000,
+        "fuelType": "Gasoline",
+    }
+
+
+def test_async_crud_round_trip():
+    vin = "1HGCM82633A004352"
+
+    res = client.post("/vehicle", json=get_sample_payload(vin))
+    assert res.status_code == 201
+
+    res = client.get(f"/vehicle/{vin.lower()}")
+    assert res.status_code == 200
+    etag = res.headers["etag"]
+    assert client.get(f"/vehicle/{vin}", headers={"If-None-Match": etag}).status_code == 304
+
+    res = client.patch(f"/vehicle/{vin}", json={"horsePower": 200})
+    assert res.status_code == 200
+    assert res.json()["horsePower"] == 200
+
+    # the write invalidated the cached body
+    assert client.get(f"/vehicle/{vin}").json()["horsePower"] == 200
+
+    updated = get_sample_payload(vin) | {"manuName": "Honda"}
+    assert client.put(f"/vehicle/{vin}", json=updated).json()["manuName"] == "Honda"
+
+    assert client.delete(f"/vehicle/{vin}").status_code == 204
+    assert client.get(f"/vehicle/{vin}").status_code == 404
+
+
+def test_async_errors_match_sync_routes():
+    vin = "1HGCM82633A004352"
+    assert client.post("/vehicle", json=get_sample_payload(vin)).status_code == 201
+
+    res = client.post("/vehicle", json=get_sample_payload(vin))
+    assert res.status_code == 422
+    assert res.json()["detail"] == {"vin": ["VIN already exists"]}
+
+    assert client.get("/vehicle/SHORTVIN").status_code == 422
+    assert client.delete("/vehicle/1HGCM82653A004353").status_code == 404
+    assert client.patch("/vehicle/1HGCM82653A004353", json={"horsePower": 1}).status_code == 404
+
+
+def test_async_list_pages_with_cursor():
+    for i in range(5):
+        client.post("/vehicle", json=get_sample_payload(withCheckDigit(f"1HGCM82633A00435{i}")))
+
+    res = client.get("/vehicle", params={"limit": 2})
+    assert res.status_code == 200
+    assert len(res.json()) == 2
+
+    seen = [v["vin"] for v in res.json()]
+    while "x-next-cursor" in res.headers:
+        res = client.get("/vehicle", params={"limit": 2, "cursor": res.headers["x-next-cursor"]})
+        seen += [v["vin"] for v in res.json()]
+
+    assert seen == [withCheckDigit(f"1HGCM82633A00435{i}") for i in range(5)]
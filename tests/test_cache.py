@@ -0,0 +1,44 @@
+import os
+import sys
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(__file__))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from cache import LRUCache
+
+
+def test_lru_eviction_and_counters():
+    cache = LRUCache(maxSize=2, ttl=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1  # "b" is now least recently used
+
+    cache.set("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("c") == 3
+
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["evictions"]) == (2, 1, 1)
+    assert stats["size"] == 2
+
+
+def test_ttl_expiry():
+    cache = LRUCache(maxSize=10, ttl=0)
+    cache.set("a", 1)
+    assert cache.get("a") is None
+    assert cache.stats()["expirations"] == 1
+
+
+def test_set_after_invalidation_is_dropped():
+    cache = LRUCache(maxSize=10, ttl=60)
+
+    # a reader takes a token, then a writer invalidates before the reader fills
+    token = cache.token()
+    cache.invalidate("a")
+    assert cache.set("a", "stale", token) is False
+    assert cache.get("a") is None
+
+    # a token taken after the invalidation is fine
+    assert cache.set("a", "fresh", cache.token()) is True
+    assert cache.get("a") == "fresh"
@@ -0,0 +1,83 @@
+import csv
+import gzip
+import io
+import json
+import os
+import sys
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(__file__))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+import pytest
+from sqlalchemy import create_engine, insert
+
+from database import Base
+import export
+import models
+
+
+@pytest.fixture
+def export_engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'export.db'}")
+    Base.metadata.create_all(engine)
+    with engine.begin() as conn:
+        conn.execute(insert(models.Vehicle.__table__), [
+            {
+                "vin": f"1HGCM82633A00{i:04d}",
+                "manuName": "Toyota",
+                "description": "line one,\nline two" if i == 0 else None,
+                "horsePower": 100 + i,
+                "modelName": "Corolla",
+                "modelYear": 2020,
+                "purchasePrice": 20000.5,
+                "fuelType": "Gasoline",
+            }
+            for i in range(7)
+        ])
+    yield engine
+    engine.dispose()
+
+
+def collect(engine, format, columns, compression=None, batchSize=3):
+    batches = export.iterRowBatches(engine, columns, batchSize=batchSize)
+    return b"".join(export.encodeBatches(batches, format, columns, compression))
+
+
+def test_csv_export_round_trips_in_id_order(export_engine):
+    columns = export.parseFields(None)
+    rows = list(csv.DictReader(io.StringIO(collect(export_engine, "csv", columns).decode())))
+
+    assert len(rows) == 7
+    assert [row["horsePower"] for row in rows] == [str(100 + i) for i in range(7)]
+    assert rows[0]["description"] == "line one,\nline two"
+
+
+def test_ndjson_export_with_projection_and_gzip(export_engine):
+    columns = export.parseFields("vin,modelYear")
+    body = gzip.decompress(collect(export_engine, "ndjson", columns, "gzip"))
+    rows = [json.loads(line) for line in body.decode().splitlines()]
+
+    assert len(rows) == 7
+    assert rows[0] == {"vin": "1HGCM82633A000000", "modelYear": 2020}
+
+
+def test_parse_fields_rejects_unknown_columns():
+    with pytest.raises(export.ExportError):
+        export.parseFields("vin,version")
+
+
+def test_arrow_and_parquet_exports(export_engine, tmp_path):
+    pa = pytest.importorskip("pyarrow")
+    import pyarrow.ipc
+    import pyarrow.parquet
+
+    columns = export.parseFields(None)
+    table = pyarrow.ipc.open_stream(collect(export_engine, "arrow", columns)).read_all()
+    assert table.num_rows == 7
+    assert table.schema.field("horsePower").type == pa.int64()
+
+    path = tmp_path / "vehicles.parquet"
+    export.exportToFile(export_engine, str(path), "parquet", columns)
+    table = pyarrow.parquet.read_table(path)
+    assert table.column("vin").to_pylist()[-1] == "1HGCM82633A000006"
@@ -0,0 +1,54 @@
+import os
+import sys
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(__file__))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+import metrics
+
+
+def test_histogram_renders_cumulative_buckets():
+    histogram = metrics.Histogram("t_seconds", "test", ("route",), buckets=(0.1, 1.0))
+    histogram.observe(0.05, "/a")
+    histogram.observe(0.5, "/a")
+    histogram.observe(5, "/a")
+
+    lines = histogram.render()
+    assert 't_seconds_bucket{route="/a",le="0.1"} 1' in lines
+    assert 't_seconds_bucket{route="/a",le="1.0"} 2' in lines
+    assert 't_seconds_bucket{route="/a",le="+Inf"} 3' in lines
+    assert 't_seconds_count{route="/a"} 3' in lines
+    assert 't_seconds_sum{route="/a"} 5.55' in lines
+
+
+def test_middleware_labels_route_template_and_adds_server_timing():
+    app = FastAPI()
+    app.add_middleware(metrics.TimingMiddleware, serverTiming=True)
+
+    @app.get("/items/{item}")
+    def read_item(item: str):
+        # stands in for the cursor hook in database.py
+        metrics.recordStatement("SELECT 1", 0.002, slowSeconds=1.0)
+        return {"item": item}
+
+    metrics.reset()
+    res = TestClient(app).get("/items/abc")
+    assert res.status_code == 200
+    assert res.headers["server-timing"].startswith('db;dur=2.00;desc="1 statements"')
+
+    text = metrics.render()
+    assert 'http_request_duration_seconds_count{method="GET",route="/items/{item}",status="200"} 1' in text
+    assert 'http_request_db_statements_bucket{method="GET",route="/items/{item}",le="1"} 1' in text
+    assert 'db_statement_duration_seconds_count{operation="SELECT"} 1' in text
+
+
+def test_slow_statements_are_counted_and_logged(caplog):
+    metrics.reset()
+    metrics.recordStatement("UPDATE vehicles\n   SET x = 1", 0.5, slowSeconds=0.1)
+
+    assert 'db_slow_queries_total{operation="UPDATE"} 1' in metrics.render()
+    assert "UPDATE vehicles SET x = 1" in caplog.text
@@ -0,0 +1,270 @@
+import json
+import os
+import sqlite3
+import subprocess
+import sys
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(__file__))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from collections import namedtuple
+
+from fastapi.testclient import TestClient
+import pytest
+from sqlalchemy import insert, text
+
+from database import get_db, makeEngine
+import main
+import models
+import shards
+from vindecoder import withCheckDigit
+
+SHARD_COUNT = 3
+
+Row = namedtuple("Row", "modelYear manuName id")
+
+
+def vehicle_payload(i: int, make: str = "Toyota") -> dict:
+    return {
+        "vin": withCheckDigit(f"1HGCM82603A{i:06d}"),
+        "manuName": make,
+        "description": "tow package" if i % 2 else "clean",
+        "horsePower": 100 + i,
+        "modelName": "Corolla",
+        "modelYear": 2000 + i % 7,
+        "purchasePrice": 1000.0 * (i % 5 + 1),
+        "fuelType": "Gasoline",
+    }
+
+
+@pytest.fixture
+def sharded(tmp_path, monkeypatch):
+    """
+    main.app with get_db yielding shards.ShardSessions over SHARD_COUNT temp files.
+    """
+    if main.ASYNC_DB or main.group_writer is not None:
+        pytest.skip("sharding can't be combined with VEHICLE_ASYNC_DB or VEHICLE_GROUP_COMMIT")
+
+    urls = shards.shardUrls(f"sqlite:///{tmp_path / 'vehicles.db'}", SHARD_COUNT)
+    shardSet = shards.ShardSet([makeEngine(url) for url in urls])
+    for index, engine in enumerate(shardSet.engines):
+        models.upgradeSchema(engine)
+        with engine.begin() as conn:
+            shards.seedIdSequences(conn, index)
+
+    def get_sharded_db():
+        db = shards.ShardSessions(shardSet)
+        try:
+            yield db
+        finally:
+            db.close()
+
+    monkeypatch.setattr(main, "shard_set", shardSet)
+    main.app.dependency_overrides[get_db] = get_sharded_db
+    main.vehicle_cache.clear()
+    yield TestClient(main.app), shardSet
+
+    main.app.dependency_overrides.pop(get_db)
+    main.vehicle_cache.clear()
+    shardSet.close()
+
+
+def shard_counts(shardSet) -> list[int]:
+    counts = []
+    for engine in shardSet.engines:
+        with engine.connect() as conn:
+            counts.append(conn.execute(text("SELECT COUNT(*) FROM vehicles")).scalar())
+    return counts
+
+
+def run_manage(database_url: str, *args, shard_count: int = 1):
+    # sharding refuses to start alongside these modes
+    env = {key: value for key, value in os.environ.items() if key not in ("VEHICLE_ASYNC_DB", "VEHICLE_GROUP_COMMIT")}
+    env["VEHICLE_SHARDS"] = str(shard_count)
+    return subprocess.run(
+        [sys.executable, os.path.join(PROJECT_ROOT, "manage.py"), "--database-url", database_url, *args],
+        capture_output=True, text=True, env=env,
+    )
+
+
+def test_shard_index_and_merge():
+    vin = withCheckDigit("1HGCM82603A000001")
+    assert shards.shardIndex(vin, 8) == shards.shardIndex(vin, 8)
+    # with the wmi key every VIN of a manufacturer lands together
+    assert shards.shardIndex(vin, 8, "wmi") == shards.shardIndex("1HG" + "0" * 14, 8, "wmi")
+
+    # each input sorted by modelYear desc, manuName asc, id desc
+    a = [Row(2020, "Ford", 5), Row(2019, "Honda", 2)]
+    b = [Row(2020, "Ford", 3), Row(2020, "Honda", 9), Row(2018, "Audi", 1)]
+    merged = list(shards.mergeSorted([a, b], [("modelYear", True), ("manuName", False), ("id", True)]))
+    assert [row.id for row in merged] == [5, 3, 9, 2, 1]
+
+
+def test_sharded_crud_routes_to_one_shard(sharded):
+    client, shardSet = sharded
+
+    vins = []
+    for i in range(30):
+        res = client.post("/vehicle", json=vehicle_payload(i))
+        assert res.status_code == 201
+        vins.append(res.json()["vin"])
+
+    counts = shard_counts(shardSet)
+    assert sum(counts) == 30 and all(counts)
+
+    # ids come from each shard's own block, so they never collide
+    ids = [client.get(f"/vehicle/{vin}").json()["id"] for vin in vins]
+    assert len(set(ids)) == 30
+    assert {vehicleId >> shards.ID_SHARD_BITS for vehicleId in ids} == set(range(SHARD_COUNT))
+
+    assert client.post("/vehicle", json=vehicle_payload(0)).status_code == 422
+    assert client.patch(f"/vehicle/{vins[1]}", json={"horsePower": 999}).json()["horsePower"] == 999
+    assert client.delete(f"/vehicle/{vins[2]}").status_code == 204
+    assert client.get(f"/vehicle/{vins[2]}").status_code == 404
+    assert sum(shard_counts(shardSet)) == 29
+
+
+def test_sharded_list_export_and_stats_merge_across_shards(sharded):
+    client, _ = sharded
+
+    res = client.post("/vehicle/bulk", json=[vehicle_payload(i, "Honda" if i % 3 else "Ford") for i in range(40)])
+    assert res.json()["created"] == 40
+
+    # keyset pages over a mixed-direction sort come back in global order
+    seen = []
+    params = {"sort": "manuName,-modelYear", "limit": 7}
+    while True:
+        res = client.get("/vehicle/", params=params)
+        seen += res.json()
+        if "X-Next-Cursor" not in res.headers:
+            break
+        params["cursor"] = res.headers["X-Next-Cursor"]
+    assert seen == sorted(seen, key=lambda v: (v["manuName"], -v["modelYear"], -v["id"]))
+    assert len(seen) == 40
+
+    lines = client.get("/vehicle/", params={"format": "ndjson", "sort": "-purchasePrice", "limit": 5}).text.splitlines()
+    assert [json.loads(line)["purchasePrice"] for line in lines] == [5000.0] * 5
+
+    exported = [json.loads(line) for line in client.get("/vehicle/export?format=ndjson").text.splitlines()]
+    assert [v["id"] for v in exported] == sorted(v["id"] for v in exported)
+    assert len(exported) == 40
+
+    stats = client.get("/vehicle/stats").json()
+    assert stats["total"]["count"] == 40
+    assert {g["manuName"]: g["count"] for g in stats["byManufacturer"]} == {"Ford": 14, "Honda": 26}
+    assert stats["total"]["minPurchasePrice"] == 1000.0
+    assert client.get("/vehicle/stats/consistency").json()["consistent"] is True
+
+    hits = client.get("/vehicle/search", params={"q": "tow", "limit": 50}).json()
+    assert len(hits) == 20
+    assert [hit["rank"] for hit in hits] == sorted(hit["rank"] for hit in hits)
+
+    assert client.get("/vehicle/changes").status_code == 501
+
+
+def test_reshard_copies_rows_and_keeps_ids(tmp_path):
+    source = makeEngine(f"sqlite:///{tmp_path / 'single.db'}")
+    models.upgradeSchema(source)
+    with source.begin() as conn:
+        conn.execute(insert(models.Vehicle), [vehicle_payload(i) for i in range(25)])
+
+    targets = [makeEngine(url) for url in shards.shardUrls(f"sqlite:///{tmp_path / 'split.db'}", SHARD_COUNT)]
+    counts = shards.reshard([source], targets)
+    assert sum(counts) == 25
+
+    ids = set()
+    for index, engine in enumerate(targets):
+        with engine.connect() as conn:
+            for vehicleId, vin in conn.execute(text("SELECT id, vin FROM vehicles")):
+                assert shards.shardIndex(vin, SHARD_COUNT) == index
+                ids.add(vehicleId)
+            # new ids start in a block of their own, above every copied id
+            seq = conn.execute(text("SELECT seq FROM sqlite_sequence WHERE name = 'vehicles'")).scalar()
+            assert seq == (1 + index) << shards.ID_SHARD_BITS
+    assert ids == set(range(1, 26))
+
+    with pytest.raises(ValueError):
+        shards.reshard([source], targets)
+
+
+def test_reshard_command_upgrades_a_baseline_database(tmp_path):
+    # vehicles.db as the original schema created it: no version column
+    path = tmp_path / "vehicles.db"
+    conn = sqlite3.connect(path)
+    conn.execute(
+        "CREATE TABLE vehicles (id INTEGER NOT NULL, vin VARCHAR(32) NOT NULL, manuName VARCHAR, "
+        "description VARCHAR, horsePower INTEGER, modelName VARCHAR, modelYear INTEGER, "
+        "purchasePrice FLOAT, fuelType VARCHAR, PRIMARY KEY (id))"
+    )
+    conn.execute("CREATE UNIQUE INDEX ix_vehicles_vin ON vehicles (vin)")
+    conn.execute('CREATE INDEX "ix_vehicles_purchasePrice" ON vehicles ("purchasePrice")')
+    conn.executemany(
+        "INSERT INTO vehicles (vin, manuName, modelYear, purchasePrice) VALUES (?, 'Toyota', 2020, 1000.0)",
+        [(vehicle_payload(i)["vin"],) for i in range(10)],
+    )
+    conn.commit()
+    conn.close()
+
+    def manage(*args):
+        return run_manage(f"sqlite:///{path}", *args)
+
+    res = manage("reshard", "--shards", "2")
+    assert res.returncode == 0, res.stderr
+    assert "Copied 10 vehicles into 2 shards" in res.stdout
+
+    versions = []
+    for url in shards.shardUrls(f"sqlite:///{path}", 2):
+        engine = makeEngine(url)
+        with engine.connect() as conn:
+            versions += conn.execute(text("SELECT version FROM vehicles")).scalars().all()
+        engine.dispose()
+    assert versions == [1] * 10
+
+    # the shards already hold vehicles: a clean error, no traceback
+    res = manage("reshard", "--shards", "2")
+    assert res.returncode == 1
+    assert res.stderr.startswith("reshard failed:")
+
+    res = manage("--database-url", f"sqlite:///{tmp_path / 'missing.db'}", "reshard", "--shards", "2")
+    assert res.returncode == 1
+    assert not list(tmp_path.glob("missing*"))
+
+    # a source SQLite can't read fails cleanly and leaves no shard files behind
+    (tmp_path / "broken.db").write_bytes(b"not a database" * 100)
+    res = manage("--database-url", f"sqlite:///{tmp_path / 'broken.db'}", "reshard", "--shards", "2")
+    assert res.returncode == 1
+    assert res.stderr.startswith("reshard failed:")
+    assert not list(tmp_path.glob("broken.shard*"))
+
+
+def test_manage_commands_use_the_shard_files(tmp_path):
+    url = f"sqlite:///{tmp_path / 'vehicles.db'}"
+    source = makeEngine(url)
+    models.upgradeSchema(source)
+    with source.begin() as conn:
+        conn.execute(insert(models.Vehicle), [vehicle_payload(i) for i in range(12)])
+
+    targets = [makeEngine(shardUrl) for shardUrl in shards.shardUrls(url, SHARD_COUNT)]
+    shards.reshard([source], targets)
+    # written after the reshard, so the old vehicles.db is now stale
+    with targets[0].begin() as conn:
+        conn.execute(text("DELETE FROM vehicles WHERE id = (SELECT MIN(id) FROM vehicles)"))
+    for engine in targets + [source]:
+        engine.dispose()
+
+    out = tmp_path / "export.ndjson"
+    res = run_manage(url, "export", "--format", "ndjson", "--out", str(out), shard_count=SHARD_COUNT)
+    assert res.returncode == 0, res.stderr
+    ids = [json.loads(line)["id"] for line in out.read_text().splitlines()]
+    assert len(ids) == 11 and ids == sorted(ids)
+
+    res = run_manage(url, "check-stats", shard_count=SHARD_COUNT)
+    assert res.returncode == 0, res.stdout + res.stderr
+
+    # a missing shard is a clean error, and no empty file is created for it
+    os.remove(tmp_path / "vehicles.shard1.db")
+    res = run_manage(url, "export", "--format", "ndjson", "--out", str(out), shard_count=SHARD_COUNT)
+    assert res.returncode == 1
+    assert res.stderr.startswith("export failed: no database at")
+    assert not (tmp_path / "vehicles.shard1.db").exists()
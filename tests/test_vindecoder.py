@@ -0,0 +1,52 @@
+import os
+import sys
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(__file__))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+import pytest
+
+import vindecoder
+
+
+def test_check_digit():
+    # well-known valid VINs, including an X check digit
+    for vin in ("1HGCM82633A004352", "1M8GDM9AXKP042788", "11111111111111111"):
+        assert vindecoder.vinError(vin) is None
+
+    assert vindecoder.vinError("1HGCM82633A004353") == "VIN check digit (position 9) should be 5"
+    assert vindecoder.vinError("1HGCM82633A004353", verifyCheckDigit=False) is None
+    assert vindecoder.withCheckDigit("1HGCM82633A004353") == "1HGCM82653A004353"
+
+
+def test_format_errors_keep_rule_order():
+    assert vindecoder.vinError("") == "VIN cannot be empty"
+    assert vindecoder.vinError("1HGCM82633A00435") == "VIN must be exactly 17 characters"
+    # I/O/Q is reported before other bad characters
+    assert vindecoder.vinError("1HGCM8I633A00!352") == "VIN cannot contain the letters I, O, or Q"
+    assert vindecoder.vinError("1HGCM82633A00!352") == "VIN must contain only A-Z and 0-9 characters"
+    assert vindecoder.vinError("1HGCM82633A00É352") == "VIN must contain only A-Z and 0-9 characters"
+
+
+def test_validate_many_matches_vin_error():
+    vins = ["1HGCM82633A004352", "1HGCM82633A004353", "SHORT", "1HGCM8I633A004352", "1M8GDM9AXKP042788"]
+    assert vindecoder.validateMany(vins) == [vindecoder.vinError(vin) for vin in vins]
+    assert vindecoder.validateMany(vins, verifyCheckDigit=False)[1] is None
+
+
+def test_decode_and_cross_check():
+    info = vindecoder.decode("1HGCM82633A004352")
+    assert (info.wmi, info.manufacturer, info.modelYears) == ("1HG", "Honda", (2003, 2033))
+    assert (info.plant, info.serial) == ("A", "004352")
+    assert vindecoder.decode("1HGCM82633A004352") is info
+
+    assert vindecoder.crossCheck("1HGCM82633A004352", "honda", 2003) == {}
+    errors = vindecoder.crossCheck("1HGCM82633A004352", "Toyota", 2020)
+    assert set(errors) == {"manuName", "modelYear"}
+
+    # unknown WMI: only the year is checked
+    assert vindecoder.crossCheck("11111111111111111", "Anything", 2001) == {}
+
+    with pytest.raises(ValueError):
+        vindecoder.decode("1HGCM8I633A004352")
@@ -0,0 +1,87 @@
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(__file__))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+import pytest
+from sqlalchemy import func, insert, select
+from sqlalchemy.exc import OperationalError
+
+from database import Base, makeEngine
+from writer import GroupCommitWriter
+import models
+
+
+@pytest.fixture
+def writer_engine(tmp_path):
+    engine = makeEngine(f"sqlite:///{tmp_path / 'writer.db'}", profile="performance")
+    Base.metadata.create_all(engine)
+    yield engine
+    engine.dispose()
+
+
+def insert_job(vin):
+    def work(conn):
+        conn.execute(insert(models.Vehicle.__table__).values(vin=vin, manuName="Toyota"))
+        return vin
+    return work
+
+
+def count_vehicles(engine):
+    with engine.connect() as conn:
+        return conn.scalar(select(func.count()).select_from(models.Vehicle.__table__))
+
+
+def test_performance_profile_pragmas(writer_engine):
+    with writer_engine.connect() as conn:
+        assert conn.exec_driver_sql("PRAGMA journal_mode").scalar() == "wal"
+        assert conn.exec_driver_sql("PRAGMA synchronous").scalar() == 1  # NORMAL
+        assert conn.exec_driver_sql("PRAGMA busy_timeout").scalar() == 5000
+
+
+def test_concurrent_writes_share_transactions(writer_engine):
+    writer = GroupCommitWriter(writer_engine, windowSeconds=0.01)
+    vins = [f"1HGCM82633A{i:06d}" for i in range(100)]
+
+    with ThreadPoolExecutor(max_workers=20) as pool:
+        results = list(pool.map(lambda vin: writer.submit(insert_job(vin)).result(), vins))
+    writer.close()
+
+    assert results == vins
+    assert count_vehicles(writer_engine) == 100
+    assert writer.jobs == 100
+    assert writer.batches < 100
+
+
+def test_failed_job_is_rolled_back_alone(writer_engine):
+    writer = GroupCommitWriter(writer_engine, windowSeconds=0.05)
+
+    ok = writer.submit(insert_job("1HGCM82633A000001"))
+    duplicate = writer.submit(insert_job("1HGCM82633A000001"))
+    other = writer.submit(insert_job("1HGCM82633A000002"))
+
+    assert ok.result() == "1HGCM82633A000001"
+    with pytest.raises(Exception, match="UNIQUE"):
+        duplicate.result()
+    assert other.result() == "1HGCM82633A000002"
+    writer.close()
+
+    assert count_vehicles(writer_engine) == 2
+
+
+def test_failed_connect_fails_queued_jobs_instead_of_hanging(tmp_path):
+    engine = makeEngine(f"sqlite:///{tmp_path / 'missing-dir' / 'writer.db'}")
+    writer = GroupCommitWriter(engine)
+
+    for vin in ("1HGCM82633A004352", "1HGCM82633A004353"):
+        future = writer.submit(insert_job(vin))
+        with pytest.raises(OperationalError):
+            future.result(timeout=5)
+
+    # the dead thread is cleared before its jobs fail; each submit retries
+    assert writer._thread is None
+    writer.close()
+    engine.dispose()
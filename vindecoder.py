@@ -0,0 +1,194 @@
+"""
+VIN validation and decoding (FMVSS 115 / 49 CFR 565) from precomputed tables.
+
+Everything per-character is worked out at import time: which characters
+are legal, each character's transliteration value multiplied by each
+position's weight, the WMI -> manufacturer table and the position-10
+model-year codes. Validating a VIN is then one C-level regex match plus
+one weighted sum for the position-9 check digit.
+
+Functions take VINs already normalized (stripped, uppercased).
+"""
+import re
+from functools import lru_cache
+from typing import NamedTuple
+
+VIN_LENGTH = 17
+
+# 49 CFR 565.15: letter -> number for the check digit (I, O and Q never appear)
+TRANSLITERATION = {
+    **{str(digit): digit for digit in range(10)},
+    "A": 1, "B": 2, "C": 3, "D": 4, "E": 5, "F": 6, "G": 7, "H": 8,
+    "J": 1, "K": 2, "L": 3, "M": 4, "N": 5, "P": 7, "R": 9,
+    "S": 2, "T": 3, "U": 4, "V": 5, "W": 6, "X": 7, "Y": 8, "Z": 9,
+}
+
+# weight of each position; position 9 (the check digit itself) weighs 0
+WEIGHTS = (8, 7, 6, 5, 4, 3, 2, 10, 0, 9, 8, 7, 6, 5, 4, 3, 2)
+
+# weighted sum % 11 -> check digit
+CHECK_DIGITS = "0123456789X"
+
+# per position: character -> transliteration value * weight
+_WEIGHTED = tuple({ch: value * weight for ch, value in TRANSLITERATION.items()} for weight in WEIGHTS)
+
+_VALID_VIN = re.compile(f"[{''.join(TRANSLITERATION)}]{{{VIN_LENGTH}}}")
+_ILLEGAL_LETTERS = re.compile("[IOQ]")
+
+# position 10: the code repeats every 30 years (A = 1980 or 2010, ... 9 = 2009 or 2039);
+# 0, I, O, Q, U and Z are never year codes
+YEAR_CODES = "ABCDEFGHJKLMNPRSTVWXY123456789"
+MODEL_YEARS = {code: (1980 + offset, 2010 + offset) for offset, code in enumerate(YEAR_CODES)}
+
+# world manufacturer identifier (positions 1-3) -> make, for the common makes
+WMI_MANUFACTURERS = {
+    # Honda / Acura
+    "1HG": "Honda", "2HG": "Honda", "5FN": "Honda", "5J6": "Honda", "JHM": "Honda", "SHH": "Honda",
+    "19U": "Acura", "JH4": "Acura",
+    # Toyota / Lexus
+    "4T1": "Toyota", "4T3": "Toyota", "5TD": "Toyota", "5TF": "Toyota", "2T1": "Toyota", "2T3": "Toyota",
+    "JT2": "Toyota", "JT3": "Toyota", "JTD": "Toyota", "JTE": "Toyota", "JTM": "Toyota", "JTN": "Toyota",
+    "JTH": "Lexus", "2T2": "Lexus",
+    # Nissan / Infiniti
+    "1N4": "Nissan", "1N6": "Nissan", "3N1": "Nissan", "5N1": "Nissan", "JN1": "Nissan", "JN8": "Nissan",
+    "JNK": "Infiniti", "5N3": "Infiniti",
+    # Ford / Lincoln
+    "1FA": "Ford", "1FD": "Ford", "1FM": "Ford", "1FT": "Ford", "2FA": "Ford", "2FM": "Ford", "3FA": "Ford",
+    "1LN": "Lincoln", "5LM": "Lincoln",
+    # GM
+    "1G1": "Chevrolet", "1GC": "Chevrolet", "1GN": "Chevrolet", "2G1": "Chevrolet", "3GN": "Chevrolet",
+    "KL8": "Chevrolet", "1GT": "GMC", "1GK": "GMC", "3GT": "GMC", "1G6": "Cadillac", "1GY": "Cadillac",
+    "1G4": "Buick", "5GA": "Buick",
+    # Stellantis
+    "1C3": "Chrysler", "2C3": "Chrysler", "1C4": "Jeep", "1J4": "Jeep", "1J8": "Jeep",
+    "1B3": "Dodge", "2B3": "Dodge", "1D7": "Dodge", "1C6": "Ram", "3C6": "Ram",
+    # Korea
+    "5NP": "Hyundai", "KMH": "Hyundai", "KM8": "Hyundai", "KNA": "Kia", "KND": "Kia", "5XY": "Kia",
+    # Subaru / Mazda / Mitsubishi
+    "4S3": "Subaru", "4S4": "Subaru", "JF1": "Subaru", "JF2": "Subaru",
+    "JM1": "Mazda", "JM3": "Mazda", "4F2": "Mazda", "JA3": "Mitsubishi", "JA4": "Mitsubishi",
+    # Tesla
+    "5YJ": "Tesla", "7SA": "Tesla", "LRW": "Tesla",
+    # Germany
+    "WBA": "BMW", "WBS": "BMW", "5UX": "BMW", "4US": "BMW", "WMW": "MINI",
+    "WDB": "Mercedes-Benz", "WDD": "Mercedes-Benz", "WDC": "Mercedes-Benz", "4JG": "Mercedes-Benz",
+    "W1K": "Mercedes-Benz", "WAU": "Audi", "WA1": "Audi", "WP0": "Porsche", "WP1": "Porsche",
+    "WVW": "Volkswagen", "WVG": "Volkswagen", "1VW": "Volkswagen", "3VW": "Volkswagen",
+    # Sweden / UK / Italy
+    "YV1": "Volvo", "YV4": "Volvo", "SAL": "Land Rover", "SAJ": "Jaguar", "ZFF": "Ferrari", "ZAR": "Alfa Romeo",
+}
+
+
+class VinInfo(NamedTuple):
+    wmi: str
+    manufacturer: str | None
+    # both years position 10 can stand for, earlier first; () if it isn't a year code
+    modelYears: tuple[int, ...]
+    plant: str
+    serial: str
+
+
+def checkDigit(vinNorm: str) -> str:
+    """
+    The position-9 check digit a well-formed VIN should carry.
+    """
+    return CHECK_DIGITS[sum(map(dict.__getitem__, _WEIGHTED, vinNorm)) % 11]
+
+
+def withCheckDigit(vinNorm: str) -> str:
+    """
+    The same VIN with position 9 replaced by its correct check digit.
+    """
+    return vinNorm[:8] + checkDigit(vinNorm) + vinNorm[9:]
+
+
+def _formatError(vinNorm: str) -> str:
+    # only reached when the regex failed; same rule order as the original validateVin
+    if not vinNorm:
+        return "VIN cannot be empty"
+    if len(vinNorm) != VIN_LENGTH:
+        return "VIN must be exactly 17 characters"
+    if _ILLEGAL_LETTERS.search(vinNorm):
+        return "VIN cannot contain the letters I, O, or Q"
+    return "VIN must contain only A-Z and 0-9 characters"
+
+
+def vinError(vinNorm: str, verifyCheckDigit: bool = True) -> str | None:
+    """
+    Return the first VIN rule a normalized VIN breaks, or None if it is valid.
+    """
+    if _VALID_VIN.fullmatch(vinNorm) is None:
+        return _formatError(vinNorm)
+
+    if verifyCheckDigit:
+        expected = checkDigit(vinNorm)
+        if vinNorm[8] != expected:
+            return f"VIN check digit (position 9) should be {expected}"
+
+    return None
+
+
+def validateMany(vinNorms, verifyCheckDigit: bool = True) -> list[str | None]:
+    """
+    vinError() for a whole batch (e.g. a bulk-ingest chunk), with the lookups
+    bound once for the loop. Returns one error or None per VIN, in order.
+    """
+    fullmatch = _VALID_VIN.fullmatch
+    getitem = dict.__getitem__
+    weighted = _WEIGHTED
+
+    errors = []
+    for vinNorm in vinNorms:
+        if fullmatch(vinNorm) is None:
+            errors.append(_formatError(vinNorm))
+            continue
+
+        if verifyCheckDigit:
+            expected = CHECK_DIGITS[sum(map(getitem, weighted, vinNorm)) % 11]
+            if vinNorm[8] != expected:
+                errors.append(f"VIN check digit (position 9) should be {expected}")
+                continue
+
+        errors.append(None)
+
+    return errors
+
+
+@lru_cache(maxsize=65536)
+def decode(vinNorm: str) -> VinInfo:
+    """
+    Split a well-formed VIN into its WMI, make, candidate model years, plant
+    code and serial. Raises ValueError if the VIN isn't well-formed (the
+    check digit is not required).
+    """
+    error = vinError(vinNorm, verifyCheckDigit=False)
+    if error:
+        raise ValueError(error)
+
+    wmi = vinNorm[:3]
+    return VinInfo(
+        wmi=wmi,
+        manufacturer=WMI_MANUFACTURERS.get(wmi),
+        modelYears=MODEL_YEARS.get(vinNorm[9], ()),
+        plant=vinNorm[10],
+        serial=vinNorm[11:],
+    )
+
+
+def crossCheck(vinNorm: str, manuName: str | None, modelYear: int | None) -> dict[str, list[str]]:
+    """
+    Compare manuName / modelYear with what the VIN encodes. Returns
+    {field: [error]} for each mismatch; an unknown WMI or year code isn't a mismatch.
+    """
+    info = decode(vinNorm)
+    errors = {}
+
+    if info.manufacturer is not None and manuName is not None:
+        if manuName.strip().casefold() != info.manufacturer.casefold():
+            errors["manuName"] = [f"VIN {info.wmi} belongs to {info.manufacturer}, not {manuName}"]
+
+    if modelYear is not None and info.modelYears and modelYear not in info.modelYears:
+        years = " or ".join(str(year) for year in info.modelYears)
+        errors["modelYear"] = [f"VIN model year code {vinNorm[9]} means {years}, not {modelYear}"]
+
+    return errors
@@ -0,0 +1,150 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+
+class GroupCommitWriter:
+    """
+    Group commit: a single thread that drains queued write jobs and runs
+    every job that arrives within `windowSeconds` (up to `maxBatch`) in one
+    transaction, so N concurrent writes cost one COMMIT (one fsync) instead
+    of N and never contend for SQLite's write lock.
+
+    Each job runs inside its own SAVEPOINT: a job that raises is rolled back
+    alone and its exception is delivered through its Future, while the rest
+    of the batch commits. Results are only delivered after the COMMIT.
+    """
+
+    def __init__(self, engine, windowSeconds: float = 0.002, maxBatch: int = 256):
+        self.engine = engine
+        self.windowSeconds = windowSeconds
+        self.maxBatch = maxBatch
+
+        # called (in the writer thread) after each successful COMMIT
+        self.listeners = []
+
+        self.batches = 0
+        self.jobs = 0
+
+        self._queue = queue.Queue()
+        self._thread = None
+        self._closing = False
+        self._startLock = threading.Lock()
+
+    def submit(self, work) -> Future:
+        """
+        Queue work(conn); the Future resolves to its return value once committed.
+        """
+        future = Future()
+        # under the lock so a dying thread (see _run) can't miss the job
+        with self._startLock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="group-commit-writer", daemon=True)
+                self._thread.start()
+            self._queue.put((work, future))
+        return future
+
+    def close(self) -> None:
+        """
+        Finish queued jobs and stop the thread (a later submit restarts it).
+        """
+        with self._startLock:
+            if self._thread is not None:
+                self._closing = True
+                self._queue.put(None)
+                self._thread.join()
+                self._thread = None
+                self._closing = False
+
+    def _collectBatch(self):
+        first = self._queue.get()
+        if first is None:
+            return None
+
+        batch = [first]
+        deadline = time.monotonic() + self.windowSeconds
+        while len(batch) < self.maxBatch:
+            remaining = deadline - time.monotonic()
+            try:
+                job = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if job is None:
+                self._queue.put(None)
+                break
+            batch.append(job)
+
+        return batch
+
+    def _run(self) -> None:
+        try:
+            self._serve()
+        except BaseException as exc:
+            # e.g. connect() failed: fail every queued job instead of leaving
+            # it waiting on a thread that is gone; the next submit restarts it
+            while not self._startLock.acquire(timeout=0.01):
+                if self._closing:
+                    # close() holds the lock while it joins this thread, so
+                    # nothing new can be queued
+                    self._failQueued(exc)
+                    return
+            try:
+                self._thread = None
+                self._failQueued(exc)
+            finally:
+                self._startLock.release()
+
+    def _failQueued(self, exc: BaseException) -> None:
+        while True:
+            try:
+                job = self._queue.get_nowait()
+            except queue.Empty:
+                return
+            if job is not None and job[1].set_running_or_notify_cancel():
+                job[1].set_exception(exc)
+
+    def _serve(self) -> None:
+        with self.engine.connect() as conn:
+            # take the write lock at BEGIN (see database.beginImmediate)
+            conn.execution_options(sqlite_begin="BEGIN IMMEDIATE")
+            while True:
+                batch = self._collectBatch()
+                if batch is None:
+                    return
+                self._runBatch(conn, batch)
+
+    def _runBatch(self, conn, batch) -> None:
+        outcomes = []
+        try:
+            with conn.begin():
+                for work, future in batch:
+                    if not future.set_running_or_notify_cancel():
+                        continue
+                    savepoint = conn.begin_nested()
+                    try:
+                        result = work(conn)
+                    except BaseException as exc:
+                        savepoint.rollback()
+                        outcomes.append((future, None, exc))
+                    else:
+                        savepoint.commit()
+                        outcomes.append((future, result, None))
+        except BaseException as exc:
+            # BEGIN or COMMIT failed: nothing in the batch was written
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(exc)
+            return
+
+        self.batches += 1
+        self.jobs += len(outcomes)
+
+        for listener in self.listeners:
+            listener()
+
+        for future, result, exc in outcomes:
+            if exc is not None:
+                future.set_exception(exc)
+            else:
+                future.set_result(result)